@@ -0,0 +1,60 @@
+"""Add full text search to Book model
+
+Revision ID: 3c9e5b7a1d42
+Revises: 5d1a8c3f0e72
+Create Date: 2026-10-18 08:40:12.381924
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "3c9e5b7a1d42"
+down_revision: Union[str, None] = "5d1a8c3f0e72"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+search_vector = (
+    "setweight(to_tsvector('english', coalesce(title, '')), 'A') || "
+    "setweight(to_tsvector('english', coalesce(author, '')), 'B') || "
+    "setweight(to_tsvector('english', coalesce(description, '')), 'C')"
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    op.add_column(
+        "books",
+        sa.Column("search_vector", postgresql.TSVECTOR(), sa.Computed(search_vector, persisted=True), nullable=True),
+    )
+    op.create_index("ix_books_search_vector", "books", ["search_vector"], unique=False, postgresql_using="gin")
+    op.create_index(
+        "ix_books_title_trgm",
+        "books",
+        ["title"],
+        unique=False,
+        postgresql_using="gin",
+        postgresql_ops={"title": "gin_trgm_ops"},
+    )
+    op.create_index(
+        "ix_books_author_trgm",
+        "books",
+        ["author"],
+        unique=False,
+        postgresql_using="gin",
+        postgresql_ops={"author": "gin_trgm_ops"},
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_books_author_trgm", table_name="books", postgresql_using="gin")
+    op.drop_index("ix_books_title_trgm", table_name="books", postgresql_using="gin")
+    op.drop_index("ix_books_search_vector", table_name="books", postgresql_using="gin")
+    op.drop_column("books", "search_vector")
@@ -0,0 +1,44 @@
+"""Fix book_categories primary key
+
+Revision ID: 5d1a8c3f0e72
+Revises: 91f295d53227
+Create Date: 2026-10-18 07:58:21.640183
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "5d1a8c3f0e72"
+down_revision: Union[str, None] = "91f295d53227"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # the id was part of a composite primary key and never got a sequence, so category links of new books failed
+    op.drop_constraint("book_categories_pkey", "book_categories", type_="primary")
+    op.create_primary_key("book_categories_pkey", "book_categories", ["id"])
+    op.execute("CREATE SEQUENCE IF NOT EXISTS book_categories_id_seq OWNED BY book_categories.id")
+    op.execute("ALTER TABLE book_categories ALTER COLUMN id SET DEFAULT nextval('book_categories_id_seq')")
+    op.execute("SELECT setval('book_categories_id_seq', COALESCE(MAX(id), 0) + 1, false) FROM book_categories")
+
+    # category links and images are written in the transaction of the book and go with it
+    for table in ("book_categories", "book_images"):
+        op.drop_constraint(f"{table}_book_id_fkey", table, type_="foreignkey")
+        op.create_foreign_key(f"{table}_book_id_fkey", table, "books", ["book_id"], ["id"], ondelete="CASCADE")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table in ("book_images", "book_categories"):
+        op.drop_constraint(f"{table}_book_id_fkey", table, type_="foreignkey")
+        op.create_foreign_key(f"{table}_book_id_fkey", table, "books", ["book_id"], ["id"])
+
+    op.execute("ALTER TABLE book_categories ALTER COLUMN id DROP DEFAULT")
+    op.execute("DROP SEQUENCE IF EXISTS book_categories_id_seq")
+    op.drop_constraint("book_categories_pkey", "book_categories", type_="primary")
+    op.create_primary_key("book_categories_pkey", "book_categories", ["book_id", "category_id", "id"])
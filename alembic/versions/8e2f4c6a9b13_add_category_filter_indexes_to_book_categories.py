@@ -0,0 +1,28 @@
+"""Add category filter indexes to book categories
+
+Revision ID: 8e2f4c6a9b13
+Revises: 3c9e5b7a1d42
+Create Date: 2026-10-18 11:02:47.915306
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "8e2f4c6a9b13"
+down_revision: Union[str, None] = "3c9e5b7a1d42"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # uix_book_category (category_id, book_id) serves the category filter, this one the joins from books
+    op.create_index("ix_book_categories_book_id", "book_categories", ["book_id", "category_id"], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_book_categories_book_id", table_name="book_categories")
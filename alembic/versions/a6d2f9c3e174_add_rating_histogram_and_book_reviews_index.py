@@ -0,0 +1,122 @@
+"""Add rating histogram to Book and book reviews index
+
+Revision ID: a6d2f9c3e174
+Revises: f4a1c8e3d926
+Create Date: 2026-10-18 17:42:31.605218
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "a6d2f9c3e174"
+down_revision: Union[str, None] = "f4a1c8e3d926"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# the rating buckets of the book are moved together with its count and sum
+update_rating_aggregates = """
+CREATE OR REPLACE FUNCTION update_rating_aggregates() RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+    IF TG_OP <> 'INSERT' THEN
+        WITH book AS (
+            UPDATE books SET
+                rating_count = rating_count - 1,
+                rating_sum = rating_sum - OLD.rating,
+                rating_histogram[OLD.rating] = rating_histogram[OLD.rating] - 1
+            WHERE id = OLD.book_id
+            RETURNING seller_id
+        )
+        UPDATE users SET rating_count = rating_count - 1, rating_sum = rating_sum - OLD.rating
+        WHERE id = (SELECT seller_id FROM book);
+    END IF;
+    IF TG_OP <> 'DELETE' THEN
+        WITH book AS (
+            UPDATE books SET
+                rating_count = rating_count + 1,
+                rating_sum = rating_sum + NEW.rating,
+                rating_histogram[NEW.rating] = rating_histogram[NEW.rating] + 1
+            WHERE id = NEW.book_id
+            RETURNING seller_id
+        )
+        UPDATE users SET rating_count = rating_count + 1, rating_sum = rating_sum + NEW.rating
+        WHERE id = (SELECT seller_id FROM book);
+    END IF;
+    RETURN NULL;
+END
+$$
+"""
+
+previous_update_rating_aggregates = """
+CREATE OR REPLACE FUNCTION update_rating_aggregates() RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+    IF TG_OP <> 'INSERT' THEN
+        WITH book AS (
+            UPDATE books SET rating_count = rating_count - 1, rating_sum = rating_sum - OLD.rating
+            WHERE id = OLD.book_id
+            RETURNING seller_id
+        )
+        UPDATE users SET rating_count = rating_count - 1, rating_sum = rating_sum - OLD.rating
+        WHERE id = (SELECT seller_id FROM book);
+    END IF;
+    IF TG_OP <> 'DELETE' THEN
+        WITH book AS (
+            UPDATE books SET rating_count = rating_count + 1, rating_sum = rating_sum + NEW.rating
+            WHERE id = NEW.book_id
+            RETURNING seller_id
+        )
+        UPDATE users SET rating_count = rating_count + 1, rating_sum = rating_sum + NEW.rating
+        WHERE id = (SELECT seller_id FROM book);
+    END IF;
+    RETURN NULL;
+END
+$$
+"""
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column(
+        "books",
+        sa.Column("rating_histogram", postgresql.ARRAY(sa.Integer()), server_default="{0,0,0,0,0}", nullable=False),
+    )
+
+    # same as for the count and the sum, reviews written during the backfill wait for the lock of the table
+    op.execute("LOCK TABLE reviews IN SHARE MODE")
+    op.execute(update_rating_aggregates)
+    op.execute(
+        """
+        UPDATE books SET rating_histogram = ratings.histogram
+        FROM (
+            SELECT book_id, ARRAY[
+                count(*) FILTER (WHERE rating = 1),
+                count(*) FILTER (WHERE rating = 2),
+                count(*) FILTER (WHERE rating = 3),
+                count(*) FILTER (WHERE rating = 4),
+                count(*) FILTER (WHERE rating = 5)
+            ] AS histogram
+            FROM reviews
+            GROUP BY book_id
+        ) AS ratings
+        WHERE books.id = ratings.book_id
+        """
+    )
+
+    op.create_index(
+        "ix_reviews_book_id_created_at_id",
+        "reviews",
+        ["book_id", sa.text("created_at DESC"), sa.text("id DESC")],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_reviews_book_id_created_at_id", table_name="reviews")
+    op.execute(previous_update_rating_aggregates)
+    op.drop_column("books", "rating_histogram")
@@ -0,0 +1,128 @@
+"""Add variants to BookImage
+
+Revision ID: b7e4c2a9f315
+Revises: a6d2f9c3e174
+Create Date: 2026-10-18 19:03:47.216390
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "b7e4c2a9f315"
+down_revision: Union[str, None] = "a6d2f9c3e174"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# the main image of a card is its thumbnail once the variants task has written it
+refresh_book_cards = """
+CREATE OR REPLACE FUNCTION refresh_book_cards(book_ids integer[]) RETURNS void LANGUAGE sql AS $$
+    INSERT INTO book_cards (
+        id, seller_id, title, author, price, publication_year, created_at, updated_at, search_vector, seller_name,
+        main_image_url, categories, category_slugs, rating, rating_count, refreshed_at
+    )
+    SELECT
+        books.id, books.seller_id, books.title, books.author, books.price, books.publication_year, books.created_at,
+        books.updated_at, books.search_vector, concat_ws(' ', users.first_name, users.last_name),
+        (SELECT coalesce(variants ->> 'thumbnail', url) FROM book_images WHERE book_id = books.id AND is_main LIMIT 1),
+        book_categories.names, book_categories.slugs, book_reviews.rating, book_reviews.rating_count,
+        clock_timestamp()
+    FROM books
+    JOIN users ON users.id = books.seller_id
+    CROSS JOIN LATERAL (
+        SELECT
+            coalesce(array_agg(categories.name ORDER BY book_categories.id), '{}') AS names,
+            coalesce(array_agg(categories.slug ORDER BY book_categories.id), '{}') AS slugs
+        FROM book_categories
+        JOIN categories ON categories.id = book_categories.category_id
+        WHERE book_categories.book_id = books.id
+    ) AS book_categories
+    CROSS JOIN LATERAL (
+        SELECT round(avg(rating), 2) AS rating, count(*) AS rating_count FROM reviews WHERE book_id = books.id
+    ) AS book_reviews
+    WHERE books.id = ANY(book_ids)
+    ON CONFLICT (id) DO UPDATE SET
+        seller_id = excluded.seller_id,
+        title = excluded.title,
+        author = excluded.author,
+        price = excluded.price,
+        publication_year = excluded.publication_year,
+        created_at = excluded.created_at,
+        updated_at = excluded.updated_at,
+        search_vector = excluded.search_vector,
+        seller_name = excluded.seller_name,
+        main_image_url = excluded.main_image_url,
+        categories = excluded.categories,
+        category_slugs = excluded.category_slugs,
+        rating = excluded.rating,
+        rating_count = excluded.rating_count,
+        refreshed_at = excluded.refreshed_at
+$$
+"""
+
+previous_refresh_book_cards = """
+CREATE OR REPLACE FUNCTION refresh_book_cards(book_ids integer[]) RETURNS void LANGUAGE sql AS $$
+    INSERT INTO book_cards (
+        id, seller_id, title, author, price, publication_year, created_at, updated_at, search_vector, seller_name,
+        main_image_url, categories, category_slugs, rating, rating_count, refreshed_at
+    )
+    SELECT
+        books.id, books.seller_id, books.title, books.author, books.price, books.publication_year, books.created_at,
+        books.updated_at, books.search_vector, concat_ws(' ', users.first_name, users.last_name),
+        (SELECT url FROM book_images WHERE book_id = books.id AND is_main LIMIT 1),
+        book_categories.names, book_categories.slugs, book_reviews.rating, book_reviews.rating_count,
+        clock_timestamp()
+    FROM books
+    JOIN users ON users.id = books.seller_id
+    CROSS JOIN LATERAL (
+        SELECT
+            coalesce(array_agg(categories.name ORDER BY book_categories.id), '{}') AS names,
+            coalesce(array_agg(categories.slug ORDER BY book_categories.id), '{}') AS slugs
+        FROM book_categories
+        JOIN categories ON categories.id = book_categories.category_id
+        WHERE book_categories.book_id = books.id
+    ) AS book_categories
+    CROSS JOIN LATERAL (
+        SELECT round(avg(rating), 2) AS rating, count(*) AS rating_count FROM reviews WHERE book_id = books.id
+    ) AS book_reviews
+    WHERE books.id = ANY(book_ids)
+    ON CONFLICT (id) DO UPDATE SET
+        seller_id = excluded.seller_id,
+        title = excluded.title,
+        author = excluded.author,
+        price = excluded.price,
+        publication_year = excluded.publication_year,
+        created_at = excluded.created_at,
+        updated_at = excluded.updated_at,
+        search_vector = excluded.search_vector,
+        seller_name = excluded.seller_name,
+        main_image_url = excluded.main_image_url,
+        categories = excluded.categories,
+        category_slugs = excluded.category_slugs,
+        rating = excluded.rating,
+        rating_count = excluded.rating_count,
+        refreshed_at = excluded.refreshed_at
+$$
+"""
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column(
+        "book_images",
+        sa.Column("variants", postgresql.JSONB(astext_type=sa.Text()), server_default="{}", nullable=False),
+    )
+    op.create_index("ix_book_images_url", "book_images", ["url"], unique=False)
+    op.execute(refresh_book_cards)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute(previous_refresh_book_cards)
+    op.drop_index("ix_book_images_url", table_name="book_images")
+    op.drop_column("book_images", "variants")
@@ -0,0 +1,31 @@
+"""Add sort indexes to Book model
+
+Revision ID: c41d7e2a6f58
+Revises: 8e2f4c6a9b13
+Create Date: 2026-10-18 12:15:33.204817
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "c41d7e2a6f58"
+down_revision: Union[str, None] = "8e2f4c6a9b13"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index("ix_books_price_id", "books", ["price", "id"], unique=False)
+    op.create_index("ix_books_publication_year_id", "books", ["publication_year", "id"], unique=False)
+    op.create_index("ix_books_created_at_id", "books", ["created_at", "id"], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_books_created_at_id", table_name="books")
+    op.drop_index("ix_books_publication_year_id", table_name="books")
+    op.drop_index("ix_books_price_id", table_name="books")
@@ -0,0 +1,29 @@
+"""Add variants_error to BookImage
+
+Revision ID: c9f3b1e7d482
+Revises: b7e4c2a9f315
+Create Date: 2026-10-19 10:12:05.384172
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "c9f3b1e7d482"
+down_revision: Union[str, None] = "b7e4c2a9f315"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column("book_images", sa.Column("variants_error", sa.Text(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column("book_images", "variants_error")
@@ -0,0 +1,183 @@
+"""Add book cards read model
+
+Revision ID: d8b3e5f2a710
+Revises: c41d7e2a6f58
+Create Date: 2026-10-18 14:02:47.615390
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "d8b3e5f2a710"
+down_revision: Union[str, None] = "c41d7e2a6f58"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+refresh_book_cards = """
+CREATE FUNCTION refresh_book_cards(book_ids integer[]) RETURNS void LANGUAGE sql AS $$
+    INSERT INTO book_cards (
+        id, seller_id, title, author, price, publication_year, created_at, updated_at, search_vector, seller_name,
+        main_image_url, categories, category_slugs, rating, rating_count, refreshed_at
+    )
+    SELECT
+        books.id, books.seller_id, books.title, books.author, books.price, books.publication_year, books.created_at,
+        books.updated_at, books.search_vector, concat_ws(' ', users.first_name, users.last_name),
+        (SELECT url FROM book_images WHERE book_id = books.id AND is_main LIMIT 1),
+        book_categories.names, book_categories.slugs, book_reviews.rating, book_reviews.rating_count,
+        clock_timestamp()
+    FROM books
+    JOIN users ON users.id = books.seller_id
+    CROSS JOIN LATERAL (
+        SELECT
+            coalesce(array_agg(categories.name ORDER BY book_categories.id), '{}') AS names,
+            coalesce(array_agg(categories.slug ORDER BY book_categories.id), '{}') AS slugs
+        FROM book_categories
+        JOIN categories ON categories.id = book_categories.category_id
+        WHERE book_categories.book_id = books.id
+    ) AS book_categories
+    CROSS JOIN LATERAL (
+        SELECT round(avg(rating), 2) AS rating, count(*) AS rating_count FROM reviews WHERE book_id = books.id
+    ) AS book_reviews
+    WHERE books.id = ANY(book_ids)
+    ON CONFLICT (id) DO UPDATE SET
+        seller_id = excluded.seller_id,
+        title = excluded.title,
+        author = excluded.author,
+        price = excluded.price,
+        publication_year = excluded.publication_year,
+        created_at = excluded.created_at,
+        updated_at = excluded.updated_at,
+        search_vector = excluded.search_vector,
+        seller_name = excluded.seller_name,
+        main_image_url = excluded.main_image_url,
+        categories = excluded.categories,
+        category_slugs = excluded.category_slugs,
+        rating = excluded.rating,
+        rating_count = excluded.rating_count,
+        refreshed_at = excluded.refreshed_at
+$$
+"""
+
+# triggers only queue the ids of the cards to refresh, the first change of a book keeps its queued_at
+queue_book_card_refresh = """
+CREATE FUNCTION queue_book_card_refresh() RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+    IF TG_TABLE_NAME = 'books' THEN
+        INSERT INTO book_card_refreshes (id) VALUES (NEW.id) ON CONFLICT DO NOTHING;
+    ELSIF TG_TABLE_NAME = 'users' THEN
+        INSERT INTO book_card_refreshes (id)
+        SELECT id FROM book_cards WHERE seller_id = NEW.id
+        ON CONFLICT DO NOTHING;
+    ELSIF TG_TABLE_NAME = 'categories' THEN
+        INSERT INTO book_card_refreshes (id)
+        SELECT book_id FROM book_categories WHERE category_id = NEW.id
+        ON CONFLICT DO NOTHING;
+    ELSE
+        IF TG_OP <> 'INSERT' THEN
+            INSERT INTO book_card_refreshes (id) VALUES (OLD.book_id) ON CONFLICT DO NOTHING;
+        END IF;
+        IF TG_OP <> 'DELETE' THEN
+            INSERT INTO book_card_refreshes (id) VALUES (NEW.book_id) ON CONFLICT DO NOTHING;
+        END IF;
+    END IF;
+    RETURN NULL;
+END
+$$
+"""
+
+triggers = {
+    "books": "AFTER INSERT OR UPDATE",
+    "users": "AFTER UPDATE OF first_name, last_name",
+    "categories": "AFTER UPDATE OF name, slug",
+    "book_categories": "AFTER INSERT OR UPDATE OR DELETE",
+    "book_images": "AFTER INSERT OR UPDATE OR DELETE",
+    "reviews": "AFTER INSERT OR UPDATE OR DELETE",
+}
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "book_cards",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("seller_id", sa.Integer(), nullable=False),
+        sa.Column("title", sa.String(length=200), nullable=False),
+        sa.Column("author", sa.String(length=100), nullable=False),
+        sa.Column("price", sa.Numeric(precision=10, scale=2), nullable=False),
+        sa.Column("publication_year", sa.Integer(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(), nullable=False),
+        sa.Column("search_vector", postgresql.TSVECTOR(), nullable=True),
+        sa.Column("seller_name", sa.String(length=101), nullable=False),
+        sa.Column("main_image_url", sa.String(length=255), nullable=True),
+        sa.Column("categories", postgresql.ARRAY(sa.String(length=100)), server_default="{}", nullable=False),
+        sa.Column("category_slugs", postgresql.ARRAY(sa.String(length=100)), server_default="{}", nullable=False),
+        sa.Column("rating", sa.Numeric(precision=3, scale=2), nullable=True),
+        sa.Column("rating_count", sa.Integer(), server_default="0", nullable=False),
+        sa.Column("refreshed_at", sa.DateTime(), server_default=sa.text("now()"), nullable=False),
+        sa.ForeignKeyConstraint(["id"], ["books.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_table(
+        "book_card_refreshes",
+        sa.Column("id", sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column("queued_at", sa.DateTime(), server_default=sa.text("now()"), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_book_card_refreshes_queued_at", "book_card_refreshes", ["queued_at"], unique=False)
+
+    op.execute(refresh_book_cards)
+    op.execute(queue_book_card_refresh)
+    for table, events in triggers.items():
+        op.execute(
+            f"CREATE TRIGGER {table}_queue_book_card_refresh {events} ON {table} "
+            "FOR EACH ROW EXECUTE FUNCTION queue_book_card_refresh()"
+        )
+
+    # cards of existing books, built before the indexes
+    op.execute("SELECT refresh_book_cards(array_agg(id)) FROM books")
+
+    op.create_index(
+        "ix_book_cards_search_vector", "book_cards", ["search_vector"], unique=False, postgresql_using="gin"
+    )
+    op.create_index(
+        "ix_book_cards_title_trgm",
+        "book_cards",
+        ["title"],
+        unique=False,
+        postgresql_using="gin",
+        postgresql_ops={"title": "gin_trgm_ops"},
+    )
+    op.create_index(
+        "ix_book_cards_author_trgm",
+        "book_cards",
+        ["author"],
+        unique=False,
+        postgresql_using="gin",
+        postgresql_ops={"author": "gin_trgm_ops"},
+    )
+    op.create_index(
+        "ix_book_cards_category_slugs", "book_cards", ["category_slugs"], unique=False, postgresql_using="gin"
+    )
+    op.create_index("ix_book_cards_seller_id_id", "book_cards", ["seller_id", "id"], unique=False)
+    op.create_index("ix_book_cards_price_id", "book_cards", ["price", "id"], unique=False)
+    op.create_index("ix_book_cards_publication_year_id", "book_cards", ["publication_year", "id"], unique=False)
+    op.create_index("ix_book_cards_created_at_id", "book_cards", ["created_at", "id"], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table in triggers:
+        op.execute(f"DROP TRIGGER {table}_queue_book_card_refresh ON {table}")
+    op.execute("DROP FUNCTION queue_book_card_refresh()")
+    op.execute("DROP FUNCTION refresh_book_cards(integer[])")
+
+    op.drop_index("ix_book_card_refreshes_queued_at", table_name="book_card_refreshes")
+    op.drop_table("book_card_refreshes")
+    op.drop_table("book_cards")
@@ -0,0 +1,90 @@
+"""Add rating aggregates to Book and User
+
+Revision ID: e2c7a9d4b581
+Revises: d8b3e5f2a710
+Create Date: 2026-10-18 15:21:09.482736
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "e2c7a9d4b581"
+down_revision: Union[str, None] = "d8b3e5f2a710"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# the old rating leaves the book and its seller, the new one is added, in the transaction of the review write
+update_rating_aggregates = """
+CREATE FUNCTION update_rating_aggregates() RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+    IF TG_OP <> 'INSERT' THEN
+        WITH book AS (
+            UPDATE books SET rating_count = rating_count - 1, rating_sum = rating_sum - OLD.rating
+            WHERE id = OLD.book_id
+            RETURNING seller_id
+        )
+        UPDATE users SET rating_count = rating_count - 1, rating_sum = rating_sum - OLD.rating
+        WHERE id = (SELECT seller_id FROM book);
+    END IF;
+    IF TG_OP <> 'DELETE' THEN
+        WITH book AS (
+            UPDATE books SET rating_count = rating_count + 1, rating_sum = rating_sum + NEW.rating
+            WHERE id = NEW.book_id
+            RETURNING seller_id
+        )
+        UPDATE users SET rating_count = rating_count + 1, rating_sum = rating_sum + NEW.rating
+        WHERE id = (SELECT seller_id FROM book);
+    END IF;
+    RETURN NULL;
+END
+$$
+"""
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for table in ("books", "users"):
+        op.add_column(table, sa.Column("rating_count", sa.Integer(), server_default="0", nullable=False))
+        op.add_column(table, sa.Column("rating_sum", sa.Integer(), server_default="0", nullable=False))
+
+    # the trigger is in place before the backfill, reviews written meanwhile wait for the lock of the table
+    op.execute("LOCK TABLE reviews IN SHARE MODE")
+    op.execute(update_rating_aggregates)
+    op.execute(
+        "CREATE TRIGGER reviews_update_rating_aggregates AFTER INSERT OR DELETE OR UPDATE OF rating, book_id "
+        "ON reviews FOR EACH ROW EXECUTE FUNCTION update_rating_aggregates()"
+    )
+    op.execute(
+        """
+        UPDATE books SET rating_count = ratings.count, rating_sum = ratings.sum
+        FROM (SELECT book_id, count(*) AS count, sum(rating) AS sum FROM reviews GROUP BY book_id) AS ratings
+        WHERE books.id = ratings.book_id
+        """
+    )
+    op.execute(
+        """
+        UPDATE users SET rating_count = ratings.count, rating_sum = ratings.sum
+        FROM (
+            SELECT books.seller_id, sum(books.rating_count) AS count, sum(books.rating_sum) AS sum
+            FROM books
+            WHERE books.rating_count > 0
+            GROUP BY books.seller_id
+        ) AS ratings
+        WHERE users.id = ratings.seller_id
+        """
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DROP TRIGGER reviews_update_rating_aggregates ON reviews")
+    op.execute("DROP FUNCTION update_rating_aggregates()")
+
+    for table in ("users", "books"):
+        op.drop_column(table, "rating_sum")
+        op.drop_column(table, "rating_count")
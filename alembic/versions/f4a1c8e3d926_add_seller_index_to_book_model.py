@@ -0,0 +1,27 @@
+"""Add seller index to Book model
+
+Revision ID: f4a1c8e3d926
+Revises: e2c7a9d4b581
+Create Date: 2026-10-18 16:07:52.918364
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "f4a1c8e3d926"
+down_revision: Union[str, None] = "e2c7a9d4b581"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index("ix_books_seller_id_id", "books", ["seller_id", "id"], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_books_seller_id_id", table_name="books")
@@ -0,0 +1,109 @@
+# storefront listing: pages read from the book_cards read model against the normalized tables the cards are built from
+# usage: python -m benchmarks.bench_book_cards [--books N] [--loops N]
+# rows go to temporary tables that shadow the real ones for this connection only, the cards are built from them by the
+# refresh_book_cards() function of the migration
+import argparse
+import asyncio
+import functools
+import random
+import time
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncSession, create_async_engine
+
+from benchmarks.bench_book_read_path import create_relations, measure
+from benchmarks.bench_book_search import create_books, make_words
+from benchmarks.bench_book_search import create_indexes as create_search_indexes
+from benchmarks.bench_book_sorts import _describe_plan, create_indexes
+from core.api.books.services import BookCardsCRUDService, BooksCRUDService
+from core.config import settings
+
+
+async def create_cards(conn: AsyncConnection, count: int) -> float:
+    # 0 to 4 reviews per book
+    await conn.execute(text("CREATE TEMPORARY TABLE reviews (LIKE public.reviews INCLUDING DEFAULTS) ON COMMIT DROP"))
+    await conn.execute(
+        text(
+            """
+            INSERT INTO reviews (id, user_id, book_id, rating, created_at)
+            SELECT (b - 1) * 4 + k, 1, b, 1 + (b + k) % 5, now()
+            FROM generate_series(1, :count) AS b, generate_series(1, 4) AS k
+            WHERE k <= b % 5
+            """
+        ),
+        {"count": count},
+    )
+    await conn.execute(text("CREATE INDEX ON reviews (book_id)"))
+    await conn.execute(text("ANALYZE reviews"))
+
+    await conn.execute(text("CREATE TEMPORARY TABLE book_cards (LIKE public.book_cards INCLUDING ALL) ON COMMIT DROP"))
+    started = time.perf_counter()
+    await conn.execute(text("SELECT refresh_book_cards(array_agg(id)) FROM books"))
+    await conn.execute(text("ANALYZE book_cards"))
+
+    return time.perf_counter() - started
+
+
+async def explain(conn: AsyncConnection, service: BooksCRUDService, query: dict) -> str:
+    stmt = service._get_entities_list_statement(query).limit(settings.pagination_page_size)
+    compiled = stmt.compile(dialect=conn.dialect, compile_kwargs={"render_postcompile": True})
+    params = tuple(compiled.params[name] for name in compiled.positiontup)
+    plan = (await conn.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {compiled}", params)).scalar()[0]["Plan"]
+
+    return _describe_plan(plan)
+
+
+async def run(count: int, loops: int) -> None:
+    random.seed(42)
+    words = make_words(2000)
+    json_service = BooksCRUDService()
+    json_service.use_json_read_path = True
+    services = {
+        "normalized, orm": BooksCRUDService(),
+        "normalized, json": json_service,
+        "book_cards": BookCardsCRUDService(),
+    }
+    queries = {
+        "first page": {"cursor": "", "count": "none"},
+        "sort=-price": {"cursor": "", "sort": "-price", "count": "none"},
+        "category": {"cursor": "", "category": "category-3", "count": "none"},
+        "search": {"cursor": "", "q": words[7], "count": "none"},
+    }
+
+    engine = create_async_engine(settings.database_url)
+    async with engine.connect() as conn:
+        started = time.perf_counter()
+        await create_books(conn, count, words)
+        await create_indexes(conn)
+        await create_search_indexes(conn)
+        await create_relations(conn, count)
+        print(f"{count:,d} books generated in {time.perf_counter() - started:.1f} s")
+        print(f"cards built in {await create_cards(conn, count):.1f} s")
+
+        session = AsyncSession(bind=conn)
+        for name, query in queries.items():
+            print(name)
+            for path, service in services.items():
+                load = functools.partial(service._get_entities_list_response, session, query)  # noqa
+                seconds, statements, size = await measure(session, load, loops)
+                print(
+                    f"  {path:<18} {seconds * 1e3:8.2f} ms  {statements} statement(s)  {size:,d} bytes  "
+                    f"{await explain(conn, service, query)}"
+                )
+
+        await conn.rollback()
+
+    await engine.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--books", type=int, default=100_000)
+    parser.add_argument("--loops", type=int, default=50)
+    args = parser.parse_args()
+
+    asyncio.run(run(args.books, args.loops))
+
+
+if __name__ == "__main__":
+    main()
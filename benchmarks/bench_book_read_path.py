@@ -0,0 +1,146 @@
+# book list and retrieve: ORM objects + pydantic against json built by postgres in one statement
+# usage: python -m benchmarks.bench_book_read_path [--books N] [--loops N]
+# rows go to temporary books, users, categories, book_categories and book_images tables of this connection only
+import argparse
+import asyncio
+import random
+import statistics
+import time
+
+from sqlalchemy import event, text
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncSession, create_async_engine
+
+from benchmarks.bench_book_search import create_books, make_words
+from benchmarks.bench_book_sorts import create_indexes
+from core.api.books.services import BooksCRUDService
+from core.config import settings
+
+QUERIES = {
+    "first page": {"page": "1", "count": "none"},
+    "sort=-price cursor": {"cursor": "", "sort": "-price", "count": "none"},
+    "fields=id,title,price": {"page": "1", "count": "none", "fields": "id,title,price"},
+}
+
+
+async def create_relations(conn: AsyncConnection, count: int) -> None:
+    for table in ("users", "categories", "book_categories", "book_images"):
+        await conn.execute(
+            text(f"CREATE TEMPORARY TABLE {table} (LIKE public.{table} INCLUDING DEFAULTS) ON COMMIT DROP")
+        )
+
+    await conn.execute(
+        text(
+            """
+            INSERT INTO users (id, email, hashed_password, is_active, is_superuser, is_verified, first_name,
+                phone, role, registration_date)
+            VALUES (1, 'bench@example.com', '', true, false, true, 'Bench', '0', 'SELLER', now())
+            """
+        )
+    )
+    await conn.execute(
+        text(
+            """
+            INSERT INTO categories (id, name, slug)
+            SELECT i, 'Category ' || i, 'category-' || i FROM generate_series(1, 20) AS i
+            """
+        )
+    )
+    # 3 categories and 2 images per book
+    await conn.execute(
+        text(
+            """
+            INSERT INTO book_categories (id, book_id, category_id)
+            SELECT (b - 1) * 3 + k, b, 1 + (b + k * 7) % 20
+            FROM generate_series(1, :count) AS b, generate_series(1, 3) AS k
+            """
+        ),
+        {"count": count},
+    )
+    await conn.execute(
+        text(
+            """
+            INSERT INTO book_images (id, book_id, url, is_main)
+            SELECT (b - 1) * 2 + k, b, '/uploads/books/' || b || '/' || k || '.jpg', k = 1
+            FROM generate_series(1, :count) AS b, generate_series(1, 2) AS k
+            """
+        ),
+        {"count": count},
+    )
+
+    await conn.execute(text("ALTER TABLE users ADD PRIMARY KEY (id)"))
+    await conn.execute(text("ALTER TABLE categories ADD PRIMARY KEY (id)"))
+    await conn.execute(text("CREATE INDEX ON book_categories (book_id, category_id)"))
+    await conn.execute(text("CREATE INDEX ON book_images (book_id)"))
+    for table in ("users", "categories", "book_categories", "book_images"):
+        await conn.execute(text(f"ANALYZE {table}"))
+
+
+async def measure(session: AsyncSession, load: object, loops: int) -> tuple[float, int, int]:
+    statements = 0
+
+    def count_statement(*_: object) -> None:
+        nonlocal statements
+        statements += 1
+
+    await load()  # warms the statement caches of both paths
+    sync_engine = session.bind.engine.sync_engine
+    event.listen(sync_engine, "before_cursor_execute", count_statement)
+
+    timings = []
+    for _ in range(loops):
+        started = time.perf_counter()
+        size = len(await load())
+        timings.append(time.perf_counter() - started)
+
+    event.remove(sync_engine, "before_cursor_execute", count_statement)
+    return statistics.median(timings), statements // loops, size
+
+
+async def run(count: int, loops: int) -> None:
+    random.seed(42)
+    orm_service, json_service = BooksCRUDService(), BooksCRUDService()
+    orm_service.use_json_read_path, json_service.use_json_read_path = False, True
+    book_ids = random.sample(range(1, count + 1), 50)
+
+    engine = create_async_engine(settings.database_url)
+    async with engine.connect() as conn:
+        started = time.perf_counter()
+        await create_books(conn, count, make_words(2000))
+        await create_indexes(conn)
+        await create_relations(conn, count)
+        print(f"{count:,d} books generated in {time.perf_counter() - started:.1f} s")
+
+        session = AsyncSession(bind=conn)
+        loads = {
+            **{
+                name: (
+                    lambda service, query=query: service._get_entities_list_response(session, query)  # noqa
+                )
+                for name, query in QUERIES.items()
+            },
+            "retrieve 1 book": lambda service: service._load_cached_entities(book_ids[:1], session),
+            "retrieve 50 books": lambda service: service._load_cached_entities(book_ids, session),
+        }
+
+        for name, load in loads.items():
+            print(name)
+            for path, service in (("orm + pydantic", orm_service), ("postgres json", json_service)):
+                seconds, statements, size = await measure(session, lambda: load(service), loops)
+                print(f"  {path:<16} {seconds * 1e3:8.2f} ms  {statements} statement(s)  {size:,d} bytes/items")
+
+        await conn.rollback()
+
+    await engine.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--books", type=int, default=100_000)
+    parser.add_argument("--loops", type=int, default=50)
+    args = parser.parse_args()
+
+    asyncio.run(run(args.books, args.loops))
+
+
+if __name__ == "__main__":
+    main()
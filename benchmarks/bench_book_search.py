@@ -0,0 +1,156 @@
+# book search latency: ILIKE '%term%' scans before, full text and trigram index searches after
+# usage: python -m benchmarks.bench_book_search [--books N] [--loops N]
+# rows go to a temporary "books" table that shadows the real one for this connection only
+import argparse
+import asyncio
+import random
+import statistics
+import time
+
+from sqlalchemy import Select, func, select, text
+from sqlalchemy.ext.asyncio import AsyncConnection, create_async_engine
+
+from core.api.books.services import BooksCRUDService
+from core.config import settings
+from core.database.models import Book
+
+SYLLABLES = ["ka", "lo", "mi", "ren", "sa", "tor", "vel", "di", "gra", "phon", "us", "mar", "en", "qui", "bel", "ost"]
+
+
+def make_words(count: int) -> list[str]:
+    words = set()
+    while len(words) < count:
+        words.add("".join(random.choices(SYLLABLES, k=random.randint(2, 4))))
+
+    return sorted(words)
+
+
+async def create_books(conn: AsyncConnection, count: int, words: list[str]) -> None:
+    await conn.execute(
+        text("CREATE TEMPORARY TABLE books (LIKE public.books INCLUDING DEFAULTS INCLUDING GENERATED) ON COMMIT DROP")
+    )
+    await conn.execute(text("CREATE TEMPORARY TABLE bench_words (id int PRIMARY KEY, word text) ON COMMIT DROP"))
+    await conn.execute(
+        text("INSERT INTO bench_words SELECT * FROM unnest(CAST(:ids AS int[]), CAST(:words AS text[]))"),
+        {"ids": list(range(1, len(words) + 1)), "words": words},
+    )
+
+    # 3 title words, 2 author words and a 30 word description per book, every 20th book has no year;
+    # ids are generated here, the default would draw from the real sequence
+    await conn.execute(
+        text(
+            """
+            INSERT INTO books (id, seller_id, title, author, description, price, publication_year, pages, created_at)
+            SELECT s.i, 1,
+                initcap(array_to_string(picked.w[1:3], ' ')),
+                initcap(array_to_string(picked.w[4:5], ' ')),
+                array_to_string(picked.w[6:35], ' '),
+                10 + random() * 90, CASE WHEN s.i % 20 != 0 THEN 1950 + s.i % 75 END,
+                100 + s.i % 900, now() - s.i * interval '1 minute'
+            FROM generate_series(1, :count) AS s(i)
+            CROSS JOIN LATERAL (
+                SELECT array_agg(bench_words.word ORDER BY r.k) AS w
+                FROM (SELECT k, 1 + floor(random() * :words_count)::int AS id FROM generate_series(1, 35) AS k
+                      WHERE s.i > 0) AS r
+                JOIN bench_words USING (id)
+            ) AS picked
+            """
+        ),
+        {"count": count, "words_count": len(words)},
+    )
+    await conn.execute(text("ANALYZE books"))
+
+
+async def create_indexes(conn: AsyncConnection) -> float:
+    started = time.perf_counter()
+    for index in Book.__table__.indexes:
+        if index.dialect_options["postgresql"]["using"] == "gin":
+            await conn.execute(text(f"CREATE INDEX ON books USING gin ({_get_index_expression(index)})"))
+    await conn.execute(text("ANALYZE books"))
+
+    return time.perf_counter() - started
+
+
+def _get_index_expression(index: object) -> str:
+    (column,) = index.columns
+    ops = index.dialect_options["postgresql"]["ops"].get(column.name, "")
+    return f"{column.name} {ops}"
+
+
+def _get_scan(plan: dict) -> str:
+    if "Scan" in plan["Node Type"]:
+        return plan["Node Type"]
+    return next((_get_scan(child) for child in plan.get("Plans", ()) if _get_scan(child)), "")
+
+
+async def measure(conn: AsyncConnection, stmt: Select, loops: int) -> tuple[float, float, str]:
+    page_stmt = stmt.with_only_columns(Book.id).limit(settings.pagination_page_size)
+    count_stmt = stmt.order_by(None).with_only_columns(func.count(Book.id))
+
+    compiled = page_stmt.compile(dialect=conn.dialect)
+    params = tuple(compiled.params[name] for name in compiled.positiontup)
+    plan = (await conn.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {compiled}", params)).scalar()[0]["Plan"]
+
+    page_timings, count_timings = [], []
+    for _ in range(loops):
+        started = time.perf_counter()
+        await conn.execute(page_stmt)
+        page_timings.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        await conn.execute(count_stmt)
+        count_timings.append(time.perf_counter() - started)
+
+    return statistics.median(page_timings), statistics.median(count_timings), _get_scan(plan)
+
+
+def print_results(title: str, results: dict[str, tuple[float, float, str]]) -> None:
+    print(title)
+    for name, (page_seconds, count_seconds, scan) in results.items():
+        print(f"  {name:<34} page {page_seconds * 1e3:9.2f} ms  count {count_seconds * 1e3:9.2f} ms  {scan}")
+
+
+async def run(count: int, loops: int) -> None:
+    random.seed(42)
+    words = make_words(20000)
+    term = random.choice(words)
+    typo = term[:-1] + term[-1] * 2
+
+    service = BooksCRUDService()
+    searches = {
+        f"title ILIKE '%{term}%'": select(Book).where(Book.title.ilike(f"%{term}%")).order_by(Book.id.desc()),
+        f"q={term}": service.get_entities_default_query({"q": term}),
+        f"q={typo}, fuzzy": service.get_entities_default_query({"q": typo, "fuzzy": "true"}),
+    }
+
+    engine = create_async_engine(settings.database_url)
+    async with engine.connect() as conn:
+        started = time.perf_counter()
+        await create_books(conn, count, words)
+        print(f"{count:,d} books generated in {time.perf_counter() - started:.1f} s")
+
+        # the previous search, measured before the indexes exist
+        before = {name: await measure(conn, stmt, loops) for name, stmt in list(searches.items())[:1]}
+        print_results("before: no search indexes", before)
+
+        print(f"search indexes built in {await create_indexes(conn):.1f} s")
+        print_results(
+            "after: tsvector and trigram GIN indexes", {n: await measure(conn, s, loops) for n, s in searches.items()}
+        )
+
+        await conn.rollback()
+
+    await engine.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--books", type=int, default=2_000_000)
+    parser.add_argument("--loops", type=int, default=20)
+    args = parser.parse_args()
+
+    asyncio.run(run(args.books, args.loops))
+
+
+if __name__ == "__main__":
+    main()
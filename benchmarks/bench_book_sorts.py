@@ -0,0 +1,123 @@
+# book list sorts and range filters: plan and latency of the first page and of a deep cursor page
+# usage: python -m benchmarks.bench_book_sorts [--books N] [--loops N]
+# rows go to a temporary "books" table that shadows the real one for this connection only
+import argparse
+import asyncio
+import random
+import statistics
+import time
+
+from sqlalchemy import Select, func, text
+from sqlalchemy.ext.asyncio import AsyncConnection, create_async_engine
+
+from benchmarks.bench_book_search import create_books, make_words
+from core.api.books.services import BooksCRUDService
+from core.api.cursors import get_ordering_fields, get_seek_predicate
+from core.config import settings
+from core.database.models import Book
+
+SORTS = ["", "price", "-price", "publication_year", "-publication_year", "created_at", "-created_at"]
+FILTERS = {
+    "no filter": {},
+    "price 40-45": {"min_price": "40", "max_price": "45"},
+    "year 1990-1994": {"year_from": "1990", "year_to": "1994"},
+}
+
+
+async def create_indexes(conn: AsyncConnection) -> None:
+    # indexes built after an UPDATE in the same transaction would be unusable by it (pg_index.indcheckxmin)
+    await conn.execute(text("ALTER TABLE books ADD PRIMARY KEY (id)"))
+
+    for index in Book.__table__.indexes:
+        if not index.dialect_options["postgresql"]["using"]:
+            columns = ", ".join(column.name for column in index.columns)
+            await conn.execute(text(f"CREATE INDEX ON books ({columns})"))
+    await conn.execute(text("ANALYZE books"))
+
+
+def _describe_plan(plan: dict) -> str:
+    nodes, pending = [], [plan]
+    while pending:
+        node = pending.pop(0)
+        nodes.append(node)
+        pending.extend(node.get("Plans", ()))
+
+    scans = [
+        f"{node['Node Type']}{' Backward' if node.get('Scan Direction') == 'Backward' else ''}"
+        f"{' ' + node['Index Name'] if 'Index Name' in node else ''}"
+        for node in nodes
+        if "Scan" in node["Node Type"]
+    ]
+    sorted_ = any(node["Node Type"] in ("Sort", "Incremental Sort") for node in nodes)
+
+    return ", ".join(scans) + (" + Sort" if sorted_ else "")
+
+
+async def measure(conn: AsyncConnection, stmt: Select, loops: int) -> tuple[float, str]:
+    compiled = stmt.compile(dialect=conn.dialect)
+    params = tuple(compiled.params[name] for name in compiled.positiontup)
+    plan = (await conn.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {compiled}", params)).scalar()[0]["Plan"]
+
+    timings = []
+    for _ in range(loops):
+        started = time.perf_counter()
+        await conn.execute(stmt)
+        timings.append(time.perf_counter() - started)
+
+    return statistics.median(timings), _describe_plan(plan)
+
+
+async def measure_pages(
+    conn: AsyncConnection, service: BooksCRUDService, query: dict, loops: int
+) -> tuple[tuple[float, str], tuple[float, str]]:
+    fields = get_ordering_fields(Book, service.get_list_ordering(query))
+    stmt = service._get_entities_list_statement(query).with_only_columns(Book.id)
+    first_page = await measure(conn, stmt.limit(settings.pagination_page_size), loops)
+
+    # the cursor of a page in the middle of the list
+    count = await conn.scalar(stmt.order_by(None).with_only_columns(func.count(Book.id)))
+    values = (
+        await conn.execute(stmt.with_only_columns(*[field.column for field in fields]).offset(count // 2))
+    ).first()
+    cursor_stmt = stmt.where(get_seek_predicate(fields, tuple(values))).limit(settings.pagination_page_size)
+
+    return first_page, await measure(conn, cursor_stmt, loops)
+
+
+async def run(count: int, loops: int) -> None:
+    random.seed(42)
+    service = BooksCRUDService()
+
+    engine = create_async_engine(settings.database_url)
+    async with engine.connect() as conn:
+        started = time.perf_counter()
+        await create_books(conn, count, make_words(2000))
+        await create_indexes(conn)
+        print(f"{count:,d} books generated and indexed in {time.perf_counter() - started:.1f} s")
+
+        for filter_name, filters in FILTERS.items():
+            print(filter_name)
+            for sort in SORTS:
+                query = {**filters, "sort": sort}
+                (first_seconds, first_plan), (cursor_seconds, cursor_plan) = await measure_pages(
+                    conn, service, query, loops
+                )
+                print(f"  sort={sort or '-id':<18} first page {first_seconds * 1e3:8.2f} ms  {first_plan}")
+                print(f"  {'':<23} cursor page {cursor_seconds * 1e3:7.2f} ms  {cursor_plan}")
+
+        await conn.rollback()
+
+    await engine.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--books", type=int, default=1_000_000)
+    parser.add_argument("--loops", type=int, default=20)
+    args = parser.parse_args()
+
+    asyncio.run(run(args.books, args.loops))
+
+
+if __name__ == "__main__":
+    main()
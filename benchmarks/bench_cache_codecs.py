@@ -0,0 +1,113 @@
+# encode/decode time and size of a cached per-user order list for every available cache codec
+# usage: python -m benchmarks.bench_cache_codecs [--orders N] [--loops N] [--redis]
+import argparse
+import asyncio
+import json
+import timeit
+from datetime import datetime
+from decimal import Decimal
+
+from fastapi.encoders import jsonable_encoder
+
+from core.api.orders.schemas import OrderSchema
+from core.api.serializers import get_response_serializer
+from core.database.models import Address, Order, OrderItem, Payment
+from core.database.models.order import OrderStatus
+from core.database.models.payment import PaymentStatus
+from core.redis.codecs import CODECS, COMPRESSIONS, CacheCodec
+
+
+def make_orders(count: int) -> list[Order]:
+    address = Address(
+        id=1, user_id=1, city="Tokyo", street="Shibuya", house="683A", postal_code="456753", is_primary=True
+    )
+    orders = []
+
+    for i in range(1, count + 1):
+        orders.append(
+            Order(
+                id=i,
+                user_id=1,
+                address_id=address.id,
+                address=address,
+                status=OrderStatus.PAID,
+                created_at=datetime(2024, 1, 1),
+                updated_at=datetime(2024, 1, 2),
+                items=[
+                    OrderItem(id=i * 10 + j, order_id=i, book_id=j + 1, quantity=1, price=Decimal("30"))
+                    for j in range(5)
+                ],
+                payments=[
+                    Payment(
+                        id=i,
+                        order_id=i,
+                        amount=Decimal("149.95"),
+                        currency="usd",
+                        transaction_id=f"pi_{i:024d}",
+                        created_at=datetime(2024, 1, 1),
+                        status=PaymentStatus.PAID,
+                    )
+                ],
+            )
+        )
+
+    return orders
+
+
+def measure(loops: int, encode: callable, decode: callable) -> tuple[float, float, int]:
+    data = encode()
+    encode_seconds = min(timeit.repeat(encode, number=loops, repeat=3)) / loops
+    decode_seconds = min(timeit.repeat(lambda: decode(data), number=loops, repeat=3)) / loops
+    return encode_seconds, decode_seconds, len(data)
+
+
+async def get_redis_memory_usage(payloads: dict[str, bytes]) -> dict[str, int]:
+    from core.redis import redis
+
+    usage = {}
+    for name, payload in payloads.items():
+        key = f"bench:codecs:{name}"
+        await redis.set(key, payload)
+        usage[name] = await redis.memory_usage(key)
+        await redis.delete(key)
+
+    return usage
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--orders", type=int, default=200)
+    parser.add_argument("--loops", type=int, default=200)
+    parser.add_argument("--redis", action="store_true", help="also report MEMORY USAGE from the configured Redis")
+    args = parser.parse_args()
+
+    serializer = get_response_serializer(OrderSchema)
+    orders = serializer.validate_entities(make_orders(args.orders))
+    value = {"t": [1], "e": 0.0, "v": serializer.dump_entities_python(orders)}
+
+    # previous format: jsonable_encoder walk in python, stdlib json text
+    results = {
+        "jsonable_encoder + json": measure(
+            args.loops, lambda: json.dumps(jsonable_encoder(orders)).encode(), lambda data: json.loads(data)
+        )
+    }
+    payloads = {"jsonable_encoder + json": json.dumps(jsonable_encoder(orders)).encode()}
+
+    for codec_name in CODECS:
+        for compression_name in COMPRESSIONS:
+            codec = CacheCodec(codec_name, compression_name)
+            name = f"{codec_name} + {compression_name}"
+            results[name] = measure(args.loops, lambda: codec.encode(value), codec.decode)
+            payloads[name] = codec.encode(value)
+
+    memory_usage = asyncio.run(get_redis_memory_usage(payloads)) if args.redis else {}
+
+    print(f"{args.orders} orders per list")
+    for name, (encode_seconds, decode_seconds, size) in results.items():
+        memory = f"{memory_usage[name]:10,d} B in redis" if name in memory_usage else ""
+        timings = f"encode {encode_seconds * 1e3:7.3f} ms  decode {decode_seconds * 1e3:7.3f} ms"
+        print(f"{name:<24} {timings}  {size:10,d} B {memory}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+# per-item cost of serializing a 50-book list page
+# usage: python -m benchmarks.bench_response_serialization [--pages N]
+import argparse
+import timeit
+from datetime import datetime
+from decimal import Decimal
+
+import orjson
+
+from core.api.books.schemas import BookSchema
+from core.api.schemas import ListPaginatedResponse
+from core.api.serializers import get_response_serializer
+from core.database.models import Book, BookCategory, BookImage, Category, User
+
+PAGE_SIZE = 50
+
+
+def make_page() -> list[Book]:
+    seller = User(id=1, first_name="Robert", last_name="Martin", registration_date=datetime(2024, 1, 1))
+    categories = [Category(id=i, name=f"Category {i}", slug=f"category-{i}") for i in range(1, 4)]
+
+    books = []
+    for i in range(1, PAGE_SIZE + 1):
+        books.append(
+            Book(
+                id=i,
+                seller_id=seller.id,
+                seller=seller,
+                title=f"Clean Code vol. {i}",
+                author="Robert Martin",
+                description="A book about writing maintainable code " * 5,
+                price=Decimal("29.99"),
+                publication_year=2008,
+                pages=464,
+                created_at=datetime(2024, 1, 1),
+                updated_at=datetime(2024, 1, 2),
+                images=[
+                    BookImage(id=i * 10 + j, book_id=i, url=f"/media/{i}-{j}.jpg", is_main=j == 0) for j in range(2)
+                ],
+                categories=[BookCategory(id=i * 10 + j, category=category) for j, category in enumerate(categories)],
+            )
+        )
+
+    return books
+
+
+def serialize_with_dicts(books: list[Book]) -> bytes:
+    # previous path: per-entity model_validate, model_dump into dicts, then ORJSONResponse re-encodes them
+    content = ListPaginatedResponse[BookSchema](
+        items=[BookSchema.model_validate(book) for book in books], total=1000, pages=20
+    ).model_dump()
+    return orjson.dumps(content)
+
+
+def serialize_to_bytes(books: list[Book]) -> bytes:
+    return get_response_serializer(BookSchema).dump_entities_list(books, total=1000, pages=20)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pages", type=int, default=2000)
+    args = parser.parse_args()
+
+    books = make_page()
+    assert orjson.loads(serialize_with_dicts(books)) == orjson.loads(serialize_to_bytes(books))
+
+    for name, func in (("model_dump + orjson", serialize_with_dicts), ("dump_json bytes", serialize_to_bytes)):
+        seconds = min(timeit.repeat(lambda: func(books), number=args.pages, repeat=3))
+        per_item = seconds / args.pages / PAGE_SIZE * 1e6
+        print(f"{name:<22} {seconds / args.pages * 1e3:8.3f} ms/page {per_item:8.2f} us/item")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,10 @@
+import typing
+
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from core.api.addresses.schemas import AddressCreateSchema, AddressSchema, AddressUpdateSchema
+from core.api.orders.services import OrdersCRUDService, touch_address_orders
 from core.api.services import C, CRUDService, M, U
 from core.database.models import Address, User
 
@@ -21,6 +24,18 @@ class AddressesCRUDService(CRUDService):
 
     list_pagination = False
     use_cache = True
+    use_local_cache = True
+    use_retrieve_cache = True
+
+    async def get_invalidated_cache_tags(self, entities: typing.Iterable[M], session: AsyncSession) -> list[str]:
+        tags = await super().get_invalidated_cache_tags(entities, session)
+        # orders embed their delivery address
+        return tags + [OrdersCRUDService.get_owner_cache_tag(entity.user_id) for entity in entities]
+
+    async def _update_owned_entity(self, entity_id: int, update_entity_data: U, session: AsyncSession, user: User) -> M:
+        # same transaction as the update, a rejected edit rolls the orders back with it
+        await touch_address_orders(entity_id, session)
+        return await super()._update_owned_entity(entity_id, update_entity_data, session, user)
 
     async def _check_primary_field_constraint(self, schema: C | U, user: User, session: AsyncSession) -> None:  # noqa
         if schema.is_primary:
@@ -36,6 +51,8 @@ class AddressesCRUDService(CRUDService):
         await self._check_primary_field_constraint(create_entity, user, session)
         return entity
 
-    async def before_entity_update(self, entity: M, update_entity: U, user: User, session: AsyncSession) -> M:
+    async def before_entity_update(
+        self, entity: typing.Optional[M], update_entity: U, user: User, session: AsyncSession
+    ) -> typing.Optional[M]:
         await self._check_primary_field_constraint(update_entity, user, session)
         return entity
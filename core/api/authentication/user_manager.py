@@ -1,13 +1,18 @@
 import logging
-from typing import Optional
+from typing import Any, Optional
 
 from fastapi import Request
 from fastapi_users import BaseUserManager, IntegerIDMixin
 from jinja2 import Environment, FileSystemLoader
 
+from core.api.services import get_model_cache_tag
+from core.api.users.sellers.schemas import SellerSimplyfiedSchema
+from core.api.users.sellers.services import get_seller_cache_tag
 from core.celery import send_email_task
 from core.config import settings
-from core.database.models import User
+from core.database.models import Book, User
+from core.database.models.user import UserRole
+from core.redis import RedisCache
 
 logger = logging.getLogger(__name__)
 
@@ -21,6 +26,13 @@ class UserManager(IntegerIDMixin, BaseUserManager[User, int]):
     async def on_after_register(self, user: User, request: Optional[Request] = None):
         logger.warning("User %r has registered.", user.id)
 
+    async def on_after_update(self, user: User, update_dict: dict[str, Any], request: Optional[Request] = None) -> None:
+        # sellers are embedded in the cached book responses
+        if user.role == UserRole.SELLER and update_dict.keys() & SellerSimplyfiedSchema.model_fields.keys():
+            await RedisCache.invalidate_tags(
+                get_model_cache_tag(Book), get_model_cache_tag(User), get_seller_cache_tag(user.id)
+            )
+
     async def on_after_forgot_password(self, user: User, token: str, request: Optional[Request] = None):
         template = env.get_template(settings.jinja_password_reset_template)
         html_content = template.render(
@@ -0,0 +1,22 @@
+# queues the variants of the images uploaded before they existed, or whose task was lost
+# usage: python -m core.api.book_images.create_variants
+import asyncio
+
+from core.api.book_images.tasks import create_book_image_variants_task
+from core.api.book_images.variants import get_images_without_variants
+from core.database import engine, session
+
+
+async def main() -> None:
+    async with session() as db_session:
+        filenames = await get_images_without_variants(db_session)
+    await engine.dispose()
+
+    for filename in filenames:
+        create_book_image_variants_task.delay(filename)
+
+    print(f"{len(filenames)} book images queued")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,7 +1,7 @@
 import typing
 
 from fastapi import UploadFile
-from pydantic import BaseModel, ConfigDict, Field
+from pydantic import BaseModel, ConfigDict, Field, model_validator
 
 
 class BookImageSimplyfiedCreateSchema(BaseModel):
@@ -20,6 +20,24 @@ class BookImageSchema(BaseModel):
     book_id: int
     url: str = Field(examples=["https://example.com/book1.jpg"])
     is_main: bool = Field(examples=[True, False])
+    variants: dict[str, str] = Field(
+        default_factory=dict,
+        examples=[
+            {
+                "thumbnail": "book1.thumbnail.jpg",
+                "thumbnail_webp": "book1.thumbnail.webp",
+                "large_webp": "book1.large.webp",
+            }
+        ],
+    )
+
+
+class BookImageListSchema(BookImageSchema):
+    @model_validator(mode="after")
+    def use_thumbnail_url(self) -> "BookImageListSchema":
+        # listings link the thumbnail, the original until its variants are created
+        self.url = self.variants.get("thumbnail", self.url)
+        return self
 
 
 class BookImageUpdateSchema(BaseModel):
@@ -1,37 +1,131 @@
+import asyncio
+import hashlib
+import logging
+import os
+import typing
 import uuid
 from pathlib import Path
 
 import aiofiles
+import aiofiles.os
 from fastapi import UploadFile, status
 from fastapi.exceptions import HTTPException
-from sqlalchemy import select
+from kombu.exceptions import OperationalError
+from sqlalchemy import event, select
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, SessionTransaction
 
 from core.api.book_images.schemas import BookImageCreateSchema, BookImageSchema, BookImageUpdateSchema
-from core.api.services import C, CRUDService, M
+from core.api.book_images.tasks import create_book_image_variants_task
+from core.api.services import C, CRUDService, M, get_entity_cache_tag, get_model_cache_tag
 from core.config import settings
 from core.database.models import Book, BookImage, User
 from core.database.models.user import UserRole
 
+logger = logging.getLogger(__name__)
+
 UPLOAD_DIR = Path(settings.upload_book_images_dir)
+STAGED_UPLOADS_KEY = "staged_book_images"
+
+image_too_large_error = HTTPException(
+    status_code=status.HTTP_413_CONTENT_TOO_LARGE,
+    detail=f"Image is larger than {settings.upload_book_images_max_size} bytes.",
+)
+
+
+class StagedUpload(typing.NamedTuple):
+    temp_path: Path
+    filename: str
+
+
+def _get_upload_extension(filename: str | None) -> str:
+    # the client file name only gives the extension, anything but a short alphanumeric one is dropped
+    extension = Path(filename or "").suffix.lower().removeprefix(".")
+    return f".{extension}" if extension.isalnum() and len(extension) <= 10 else ""
+
+
+async def _save_uploaded_file(file: UploadFile, session: AsyncSession) -> str:
+    if file.size is not None and file.size > settings.upload_book_images_max_size:
+        raise image_too_large_error
+
+    # next to the images, so the rename into place is atomic
+    temp_dir = UPLOAD_DIR / ".tmp"
+    await aiofiles.os.makedirs(temp_dir, exist_ok=True)
+    temp_path = temp_dir / f"{uuid.uuid4()}.part"
+
+    digest, size = hashlib.sha256(), 0
+    try:
+        async with aiofiles.open(temp_path, "wb") as f:
+            while chunk := await file.read(settings.upload_book_images_chunk_size):
+                size += len(chunk)
+                if size > settings.upload_book_images_max_size:
+                    raise image_too_large_error
 
+                digest.update(chunk)
+                await f.write(chunk)
+    except BaseException:
+        await aiofiles.os.remove(temp_path)
+        raise
 
-async def _save_uploaded_file(file: UploadFile) -> str:  # noqa
-    file_ext = file.filename.split(".")[-1]
-    filename = f"{uuid.uuid4()}.{file_ext}"
+    # the same image uploaded for any book is stored once, under the hash of its content
+    name = digest.hexdigest()
+    filename = f"{name[:2]}/{name[2:4]}/{name}{_get_upload_extension(file.filename)}"
 
-    UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
+    # the upload is published or discarded together with the transaction of the image rows
+    if not session.in_transaction():
+        await session.begin()
+    session.info.setdefault(STAGED_UPLOADS_KEY, []).append(StagedUpload(temp_path, filename))
 
-    file_path = UPLOAD_DIR / filename
-    async with aiofiles.open(file_path, "wb") as f:
-        while chunk := await file.read(1024):
-            await f.write(chunk)
+    return filename
 
-    return str(filename)
 
+def _queue_image_variants(filenames: list[str]) -> None:
+    for filename in filenames:
+        # a broker that is down fails the publish at once instead of retrying, the backfill queues the image later
+        try:
+            create_book_image_variants_task.apply_async((filename,), retry=False)
+        except OperationalError:
+            logger.exception("Variants of the book image %r were not queued.", filename)
 
-async def save_uploaded_book_image(file: UploadFile, book_id: int, is_main: bool) -> BookImage:
-    filename = await _save_uploaded_file(file)
+
+@event.listens_for(Session, "after_commit")
+def _publish_staged_uploads(session: Session) -> None:
+    # renames and unlinks only, the content was written before the commit
+    filenames = []
+    for upload in session.info.pop(STAGED_UPLOADS_KEY, []):
+        path = UPLOAD_DIR / upload.filename
+        if path.exists():
+            upload.temp_path.unlink(missing_ok=True)
+        else:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            os.replace(upload.temp_path, path)
+
+        # the rows of an already stored image get its variants too, the task skips the existing files
+        if upload.filename not in filenames:
+            filenames.append(upload.filename)
+
+    if not filenames:
+        return
+
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        _queue_image_variants(filenames)
+    else:
+        # the broker publish blocks, so it runs in a thread of the loop once the commit has returned
+        loop.run_in_executor(None, _queue_image_variants, filenames)
+
+
+@event.listens_for(Session, "after_transaction_end")
+def _discard_staged_uploads(session: Session, transaction: SessionTransaction) -> None:
+    # uploads of rolled back or abandoned transactions never reach the images directory
+    if transaction.parent is None:
+        for upload in session.info.pop(STAGED_UPLOADS_KEY, []):
+            upload.temp_path.unlink(missing_ok=True)
+
+
+async def save_uploaded_book_image(file: UploadFile, book_id: int, is_main: bool, session: AsyncSession) -> BookImage:
+    filename = await _save_uploaded_file(file, session)
 
     return BookImage(
         book_id=book_id,
@@ -59,6 +153,11 @@ class BookImagesCRUDService(CRUDService):
 
         return book  # noqa
 
+    async def get_invalidated_cache_tags(self, entities: typing.Iterable[M], session: AsyncSession) -> list[str]:
+        tags = await super().get_invalidated_cache_tags(entities, session)
+        # images are part of the book responses
+        return tags + [get_model_cache_tag(Book)] + [get_entity_cache_tag(Book, entity.book_id) for entity in entities]
+
     async def validate_is_main_field(self, entity: M, session: AsyncSession) -> None:  # noqa
         stmt = select(BookImage).where(BookImage.book_id == entity.book_id, BookImage.is_main == True)
         active_main_image = await session.scalar(stmt)
@@ -76,7 +175,7 @@ class BookImagesCRUDService(CRUDService):
         if create_entity.is_main:
             await self.validate_is_main_field(entity, session)
 
-        filename = await _save_uploaded_file(create_entity.file)
+        filename = await _save_uploaded_file(create_entity.file, session)
         entity.url = filename
 
         return entity
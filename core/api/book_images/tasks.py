@@ -0,0 +1,46 @@
+import asyncio
+import logging
+from pathlib import Path
+
+from PIL import Image, UnidentifiedImageError
+
+from core.api.book_images.variants import (
+    create_image_variants,
+    save_book_image_variants,
+    save_book_image_variants_error,
+)
+from core.celery import celery
+from core.config import settings
+from core.database import engine, session
+from core.redis import redis
+
+logger = logging.getLogger(__name__)
+
+
+async def _save_variants(filename: str, variants: dict[str, str] | None, error: str | None = None) -> None:
+    async with session() as db_session:
+        if error is None:
+            await save_book_image_variants(filename, variants, db_session)
+        else:
+            await save_book_image_variants_error(filename, error, db_session)
+
+    # every task runs in its own event loop, connections of the previous one cannot be reused
+    await engine.dispose()
+    await redis.connection_pool.disconnect()
+
+
+@celery.task
+def create_book_image_variants_task(filename: str) -> None:
+    try:
+        variants = create_image_variants(Path(settings.upload_book_images_dir), filename)
+    except FileNotFoundError as e:
+        # the original stays the only url of the image
+        logger.warning("No variants of the book image %r: %s", filename, e)
+        return
+    except (UnidentifiedImageError, Image.DecompressionBombError) as e:
+        # the file will not decode on the next run either, the recorded error keeps it out of the backfill
+        logger.warning("No variants of the book image %r: %s", filename, e)
+        asyncio.run(_save_variants(filename, None, f"{type(e).__name__}: {e}"))
+        return
+
+    asyncio.run(_save_variants(filename, variants))
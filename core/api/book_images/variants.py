@@ -0,0 +1,102 @@
+import os
+import typing
+import uuid
+from pathlib import Path
+
+from PIL import Image, ImageOps
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.api.services import get_entity_cache_tag, get_model_cache_tag
+from core.config import settings
+from core.database.models import Book, BookImage
+from core.redis import RedisCache
+
+
+class ImageVariant(typing.NamedTuple):
+    name: str
+    suffix: str
+    format: str
+    size: tuple[int, int]
+    crop: bool
+
+
+# thumbnails are cropped to one size for the listings, the large copy keeps the proportions of the original
+BOOK_IMAGE_VARIANTS = (
+    ImageVariant("thumbnail", ".thumbnail.jpg", "JPEG", settings.book_image_thumbnail_size, True),
+    ImageVariant("thumbnail_webp", ".thumbnail.webp", "WEBP", settings.book_image_thumbnail_size, True),
+    ImageVariant("large_webp", ".large.webp", "WEBP", settings.book_image_large_size, False),
+)
+
+
+def get_variant_filename(filename: str, variant: ImageVariant) -> str:
+    # next to the original, under its content hash
+    directory, _, name = filename.rpartition("/")
+    return f"{directory}/{name.split('.')[0]}{variant.suffix}".removeprefix("/")
+
+
+def _save_variant(image: Image.Image, variant: ImageVariant, path: Path) -> None:
+    if variant.crop:
+        image = ImageOps.fit(image, variant.size, Image.Resampling.LANCZOS)
+    else:
+        image = image.copy()
+        image.thumbnail(variant.size, Image.Resampling.LANCZOS)
+
+    if variant.format == "JPEG" and image.mode != "RGB":
+        image = image.convert("RGB")
+
+    quality = settings.book_image_jpeg_quality if variant.format == "JPEG" else settings.book_image_webp_quality
+    temp_path = path.with_name(f".{uuid.uuid4()}{variant.suffix}")
+    try:
+        image.save(temp_path, variant.format, quality=quality)
+        os.replace(temp_path, path)
+    finally:
+        temp_path.unlink(missing_ok=True)
+
+
+def create_image_variants(upload_dir: Path, filename: str) -> dict[str, str]:
+    # files of the same content are shared by the images of every book, so existing variants are kept
+    with Image.open(upload_dir / filename) as image:
+        image = ImageOps.exif_transpose(image)
+        variants = {}
+
+        for variant in BOOK_IMAGE_VARIANTS:
+            variant_filename = get_variant_filename(filename, variant)
+            if not (upload_dir / variant_filename).exists():
+                _save_variant(image, variant, upload_dir / variant_filename)
+            variants[variant.name] = variant_filename
+
+    return variants
+
+
+async def save_book_image_variants(filename: str, variants: dict[str, str], session: AsyncSession) -> int:
+    stmt = (
+        update(BookImage)
+        .where(BookImage.url == filename, BookImage.variants != variants)
+        .values(variants=variants, variants_error=None)
+        .returning(BookImage.book_id)
+    )
+    book_ids = set(await session.scalars(stmt))
+    await session.commit()
+
+    # images are part of the book responses, the cards are refreshed by the book_images trigger
+    if book_ids:
+        await RedisCache.invalidate_tags(
+            get_model_cache_tag(BookImage),
+            get_model_cache_tag(Book),
+            *[get_entity_cache_tag(Book, book_id) for book_id in book_ids],
+        )
+
+    return len(book_ids)
+
+
+async def save_book_image_variants_error(filename: str, error: str, session: AsyncSession) -> None:
+    # the variants stay empty, so the responses keep the original url
+    await session.execute(update(BookImage).where(BookImage.url == filename).values(variants_error=error))
+    await session.commit()
+
+
+async def get_images_without_variants(session: AsyncSession) -> list[str]:
+    # files that failed to decode are not queued again
+    stmt = select(BookImage.url).where(BookImage.variants == {}, BookImage.variants_error.is_(None)).distinct()
+    return list(await session.scalars(stmt))
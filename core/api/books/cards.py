@@ -0,0 +1,78 @@
+import asyncio
+import typing
+
+from redis.exceptions import RedisError
+from sqlalchemy import Integer, bindparam, delete, func, select
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.api.services import get_model_cache_tag
+from core.config import settings
+from core.database import session as session_maker
+from core.database.models import Book, BookCard, BookCardRefresh
+from core.prometheus import BOOK_CARDS_PENDING_REFRESHES, BOOK_CARDS_STALENESS
+from core.redis import RedisCache
+
+
+async def _build_book_cards(book_ids: list[int], session: AsyncSession) -> None:
+    # the cards are built from the normalized tables by the refresh_book_cards() function of the migration
+    await session.execute(select(func.refresh_book_cards(bindparam("book_ids", book_ids, type_=ARRAY(Integer)))))
+
+
+async def refresh_book_cards(
+    session: AsyncSession, book_ids: typing.Optional[typing.Iterable[int]] = None
+) -> list[int]:
+    # claims queued refreshes, of the given books or the oldest ones, skipping those another worker is refreshing
+    claimed = (
+        select(BookCardRefresh.id)
+        .order_by(BookCardRefresh.queued_at)
+        .limit(settings.book_cards_refresh_batch_size)
+        .with_for_update(skip_locked=True)
+    )
+    if book_ids is not None:
+        claimed = claimed.where(BookCardRefresh.id.in_(list(book_ids)))
+
+    stmt = delete(BookCardRefresh).where(BookCardRefresh.id.in_(claimed)).returning(BookCardRefresh.id)
+    ids = list(await session.scalars(stmt))
+    if ids:
+        await _build_book_cards(ids, session)
+
+    await session.commit()
+    return ids
+
+
+async def observe_book_cards_staleness(session: AsyncSession) -> None:
+    age = func.coalesce(func.extract("epoch", func.now() - func.min(BookCardRefresh.queued_at)), 0)
+    pending, staleness = (await session.execute(select(func.count(BookCardRefresh.id), age))).one()
+
+    BOOK_CARDS_PENDING_REFRESHES.set(pending)
+    BOOK_CARDS_STALENESS.set(staleness)
+
+
+async def process_book_card_refreshes() -> None:
+    # writes through the books API refresh their cards at once, this picks up reviews, images, seller and category names
+    while True:
+        try:
+            async with session_maker() as session:
+                while await refresh_book_cards(session):
+                    await RedisCache.invalidate_tags(get_model_cache_tag(BookCard))
+                await observe_book_cards_staleness(session)
+        except (OSError, RedisError, SQLAlchemyError):
+            pass
+
+        await asyncio.sleep(settings.book_cards_refresh_interval)
+
+
+async def rebuild_book_cards(session: AsyncSession) -> int:
+    # every card again in id batches, the queued refreshes are left to the refresher
+    last_id, count = 0, 0
+    stmt = select(Book.id).order_by(Book.id).limit(settings.book_cards_rebuild_batch_size)
+
+    while ids := list(await session.scalars(stmt.where(Book.id > last_id))):
+        await _build_book_cards(ids, session)
+        await session.commit()
+        last_id, count = ids[-1], count + len(ids)
+
+    await RedisCache.invalidate_tags(get_model_cache_tag(BookCard))
+    return count
@@ -0,0 +1,90 @@
+import typing
+
+from sqlalchemy import ColumnElement, Float, FromClause, Text, case, cast, func, literal_column, select, true
+from sqlalchemy.dialects.postgresql import aggregate_order_by
+from sqlalchemy.sql.selectable import Select
+
+from core.database.models import Book, BookCategory, BookImage, Category, User
+
+
+def _json_datetime(column: ColumnElement) -> ColumnElement[str]:
+    # the format pydantic dumps naive datetimes in: microseconds only when set, always six digits
+    return func.concat(
+        func.to_char(column, 'YYYY-MM-DD"T"HH24:MI:SS'),
+        case((func.date_trunc("second", column) != column, func.to_char(column, ".US")), else_=""),
+    )
+
+
+def _json_object(fields: dict[str, ColumnElement]) -> ColumnElement:
+    # json keeps the keys in the order of the schema, jsonb would sort them; the keys are schema field names
+    return func.json_build_object(
+        *[item for name, value in fields.items() for item in (literal_column(f"'{name}'"), value)]
+    )
+
+
+def _get_images_json(thumbnails: bool = False) -> FromClause:
+    # the same url as BookImageListSchema in lists
+    url = func.coalesce(BookImage.variants["thumbnail"].astext, BookImage.url) if thumbnails else BookImage.url
+    image = _json_object(
+        {
+            "id": BookImage.id,
+            "book_id": BookImage.book_id,
+            "url": url,
+            "is_main": BookImage.is_main,
+            "variants": BookImage.variants,
+        }
+    )
+    images = func.coalesce(func.json_agg(aggregate_order_by(image, BookImage.id)), func.json_build_array())
+    return select(images.label("images")).where(BookImage.book_id == Book.id).lateral("book_images_json")
+
+
+def _get_categories_json() -> FromClause:
+    names = func.json_agg(aggregate_order_by(Category.name, BookCategory.id))
+    stmt = select(func.coalesce(names, func.json_build_array()).label("categories"))
+    stmt = stmt.select_from(BookCategory).join(Category, Category.id == BookCategory.category_id)
+    return stmt.where(BookCategory.book_id == Book.id).lateral("book_categories_json")
+
+
+def get_book_documents_statement(
+    stmt: Select, columns: typing.Iterable[ColumnElement], fields: typing.Iterable[str], thumbnails: bool = False
+) -> Select:
+    # the rows of the statement as BookSchema json built by postgres: one query for the seller, images and categories
+    # and no ORM objects or pydantic models on the way out
+    fields = list(fields)
+    from_clause = Book.__table__
+
+    values: dict[str, ColumnElement] = {
+        "title": Book.title,
+        "author": Book.author,
+        "description": Book.description,
+        "price": cast(Book.price, Float),
+        "publication_year": Book.publication_year,
+        "pages": Book.pages,
+        "id": Book.id,
+        "created_at": _json_datetime(Book.created_at),
+        "updated_at": _json_datetime(Book.updated_at),
+        "rating": Book.rating,
+        "rating_count": Book.rating_count,
+    }
+
+    if "seller" in fields:
+        values["seller"] = _json_object(
+            {
+                "id": User.id,
+                "first_name": User.first_name,
+                "last_name": User.last_name,
+                "registration_date": _json_datetime(User.registration_date),
+            }
+        )
+        from_clause = from_clause.join(User.__table__, User.id == Book.seller_id)
+    if "images" in fields:
+        images = _get_images_json(thumbnails)
+        values["images"] = images.c.images
+        from_clause = from_clause.join(images, true())
+    if "categories" in fields:
+        categories = _get_categories_json()
+        values["categories"] = categories.c.categories
+        from_clause = from_clause.join(categories, true())
+
+    document = cast(_json_object({name: values[name] for name in fields}), Text).label("document")
+    return stmt.with_only_columns(*dict.fromkeys(columns), document).select_from(from_clause)
@@ -0,0 +1,18 @@
+# rebuilds every book card, e.g. after a restore or a bulk load with the triggers disabled
+# usage: python -m core.api.books.rebuild_cards
+import asyncio
+
+from core.api.books.cards import rebuild_book_cards
+from core.database import engine, session
+
+
+async def main() -> None:
+    async with session() as db_session:
+        count = await rebuild_book_cards(db_session)
+    await engine.dispose()
+
+    print(f"{count} book cards rebuilt")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
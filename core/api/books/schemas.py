@@ -1,12 +1,16 @@
 from datetime import datetime
-from typing import Annotated, Any, Optional, Self
+from typing import Annotated, Optional
 
-from pydantic import BaseModel, ConfigDict, Field
+from pydantic import BaseModel, BeforeValidator, ConfigDict, Field
 
-from core.api.book_images.schemas import BookImageSchema, BookImageSimplyfiedCreateSchema
+from core.api.book_images.schemas import BookImageListSchema, BookImageSchema, BookImageSimplyfiedCreateSchema
 from core.api.users.sellers.schemas import SellerSimplyfiedSchema
 
 
+def _get_categories_names(categories: list) -> list:
+    return [link.category.name if hasattr(link, "category") else link for link in categories]
+
+
 class BookBaseSchema(BaseModel):
     title: str = Field(examples=["Clean Code"], max_length=100)
     author: str = Field(examples=["Robert Martin"], max_length=50)
@@ -24,24 +28,32 @@ class BookSchema(BookBaseSchema):
     id: int
     created_at: datetime
     updated_at: datetime
+    rating: Optional[float] = None
+    rating_count: int = 0
     seller: SellerSimplyfiedSchema
     images: list[BookImageSchema] = Field(default_factory=list)
-    categories: Any
-
-    @classmethod
-    def model_validate(
-        cls,
-        obj: Any,
-        *,
-        strict: bool | None = None,
-        from_attributes: bool | None = None,
-        context: Any | None = None,
-        by_alias: bool | None = None,
-        by_name: bool | None = None,
-    ) -> Self:
-        validated = super().model_validate(obj)
-        validated.categories = [link.category.name for link in obj.categories if hasattr(link, "category")]
-        return validated
+    categories: Annotated[list[str], BeforeValidator(_get_categories_names)] = Field(default_factory=list)
+
+
+class BookListSchema(BookSchema):
+    images: list[BookImageListSchema] = Field(default_factory=list)
+
+
+class BookCardSchema(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    title: str
+    author: str
+    price: float
+    publication_year: Optional[int] = None
+    created_at: datetime
+    seller_id: int
+    seller_name: str
+    main_image_url: Optional[str] = None
+    categories: list[str] = Field(default_factory=list)
+    rating: Optional[float] = None
+    rating_count: int = 0
 
 
 class BookCreateSchema(BookBaseSchema):
@@ -1,40 +1,189 @@
 import typing
+from decimal import Decimal
 from typing import NoReturn
 
-from sqlalchemy import select
+import orjson
+from fastapi import HTTPException
+from sqlalchemy import ColumnElement, Float, func, or_, select
+from sqlalchemy.dialects.postgresql import websearch_to_tsquery
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import joinedload, selectinload
+from sqlalchemy.orm import joinedload, selectinload, with_expression
+from sqlalchemy.orm.attributes import set_committed_value
+from sqlalchemy.orm.interfaces import LoaderOption
 from sqlalchemy.sql.selectable import Select
 
 from core.api.book_images.services import save_uploaded_book_image
-from core.api.books.schemas import BookCreateSchema, BookSchema, BookUpdateSchema
-from core.api.services import C, CRUDService, M
-from core.database.models import Book, BookCategory, Category, User
+from core.api.books.cards import refresh_book_cards
+from core.api.books.documents import get_book_documents_statement
+from core.api.books.schemas import BookCardSchema, BookCreateSchema, BookListSchema, BookSchema, BookUpdateSchema
+from core.api.books.suggestions import sync_book_suggestions
+from core.api.cursors import OrderingField
+from core.api.services import C, CRUDService, EntitiesListData, M, get_model_cache_tag
+from core.api.users.sellers.services import get_seller_cache_tag
+from core.config import settings
+from core.database.models import Book, BookCard, BookCategory, Category, User
+from core.database.models.book import BOOK_SEARCH_CONFIG
+
+T = typing.TypeVar("T")
 
 
 class BooksCRUDService(CRUDService):
     model = Book
     schema_class = BookSchema
+    list_schema_class = BookListSchema
     create_schema_class = BookCreateSchema
     update_schema_class = BookUpdateSchema
 
     user_field = "seller_id"
 
     admin_or_owner_to_edit = True
-    commit_before_after_create_hook = False
     save_user_id_before_create = True
+    list_cursor_pagination = True
+    list_filter_params = (
+        "q",
+        "fuzzy",
+        "author",
+        "title",
+        "seller_id",
+        "category",
+        "min_price",
+        "max_price",
+        "year_from",
+        "year_to",
+    )
+    list_sort_fields = ("price", "publication_year", "created_at")
+    list_search_params = ("q", "author", "title")
+    use_count_cache = True
+    use_list_response_cache = True
+    use_retrieve_cache = True
+    list_facets = ("categories",)
+    use_json_read_path = settings.books_json_read_path
 
-    def get_entities_default_query(self, query: typing.Optional[dict] = None) -> Select:
-        stmt = (
-            select(self.model)
-            .options(
-                joinedload(self.model.seller),
-                selectinload(self.model.images),
-                selectinload(self.model.categories).joinedload(BookCategory.category),
-            )
-            .order_by(self.model.id.desc())  # noqa
+    def get_retrieve_cache_tags(self, entity_id: int) -> list[str]:
+        # categories and the seller are embedded in the response
+        return [*super().get_retrieve_cache_tags(entity_id), get_model_cache_tag(Category), get_model_cache_tag(User)]
+
+    async def get_invalidated_cache_tags(self, entities: typing.Iterable[M], session: AsyncSession) -> list[str]:
+        entities = list(entities)
+        tags = await super().get_invalidated_cache_tags(entities, session)
+        # the books count of the seller profiles
+        return tags + [get_model_cache_tag(BookCard)] + [get_seller_cache_tag(entity.seller_id) for entity in entities]
+
+    async def _invalidate_cache(self, entities: typing.Iterable[M], session: AsyncSession) -> None:
+        entities = list(entities)
+        # cards are rebuilt before the cached lists are dropped, or those could be cached again from the old cards
+        await refresh_book_cards(session, [entity.id for entity in entities])
+        await super()._invalidate_cache(entities, session)
+        await sync_book_suggestions([entity.id for entity in entities], session)
+
+    def get_entities_load_options(self, query: typing.Optional[dict] = None) -> list[LoaderOption]:
+        fields = self.get_requested_fields(query)
+        loaders = {
+            "seller": joinedload(self.model.seller),
+            "images": selectinload(self.model.images),
+            "categories": selectinload(self.model.categories).joinedload(BookCategory.category),
+        }
+
+        return [loader for field, loader in loaders.items() if fields is None or field in fields]
+
+    def get_entity_returning_load_options(self) -> list[LoaderOption]:
+        return [
+            selectinload(self.model.seller),
+            selectinload(self.model.images),
+            selectinload(self.model.categories).joinedload(BookCategory.category),
+        ]
+
+    def _get_documents_statement(self, stmt: Select, query: dict, listing: bool = False) -> Select:
+        fields = self.get_response_schema_class(self.get_requested_fields(query), listing).model_fields
+        ordering = [field.column.label(field.name) for field in self.get_list_ordering_fields(query)]
+
+        return get_book_documents_statement(stmt, [*ordering, self.model.seller_id], fields, thumbnails=listing)
+
+    async def _get_page_entities(self, stmt: Select, query: dict, session: AsyncSession) -> list[M]:
+        if not self.use_json_read_path:
+            rank = self._get_search_rank(query)
+            if rank is not None:
+                stmt = stmt.options(with_expression(self.model.search_rank, rank))
+            return await super()._get_page_entities(stmt, query, session)
+
+        # rows with the ordering columns for cursors and the book as json text
+        return list(await session.execute(self._get_documents_statement(stmt, query, listing=True)))
+
+    def _dump_entities_list(self, data: EntitiesListData, query: dict) -> bytes:
+        if not self.use_json_read_path:
+            return super()._dump_entities_list(data, query)
+
+        items = b"[" + b",".join(row.document.encode() for row in data.entities) + b"]"
+        return self.get_response_serializer(listing=True).dump_entities_list_json(
+            items, data.total, data.pages, data.next_cursor, data.prev_cursor, data.facets
         )
 
+    async def _load_cached_entities(self, entity_ids: typing.Iterable[int], session: AsyncSession) -> dict[int, dict]:
+        if not self.use_json_read_path:
+            return await super()._load_cached_entities(entity_ids, session)
+
+        stmt = self.get_entities_default_query().filter(self.model.id.in_(entity_ids))
+        return {
+            row.id: {"owner": row.seller_id, "data": orjson.loads(row.document)}
+            for row in await session.execute(self._get_documents_statement(stmt, {}))
+        }
+
+    @staticmethod
+    def _get_search_term(query: typing.Optional[dict] = None) -> str:
+        return query.get("q", "").strip() if query else ""
+
+    def _get_search_rank(self, query: typing.Optional[dict] = None) -> ColumnElement[float] | None:
+        term = self._get_search_term(query)
+
+        if not term:
+            return None
+
+        if query.get("fuzzy") == "true":
+            return func.greatest(
+                func.word_similarity(term, self.model.title), func.word_similarity(term, self.model.author), type_=Float
+            )
+
+        ts_query = websearch_to_tsquery(BOOK_SEARCH_CONFIG, term)
+        return func.ts_rank_cd(self.model.search_vector, ts_query, type_=Float)
+
+    def _apply_search(self, stmt: Select, query: typing.Optional[dict] = None) -> Select:
+        term = self._get_search_term(query)
+
+        if not term:
+            return stmt.order_by(self.model.id.desc())
+
+        if query.get("fuzzy") == "true":
+            # trigram word similarity tolerates typos, served by the title and author trigram indexes
+            stmt = stmt.where(or_(self.model.title.op("%>")(term), self.model.author.op("%>")(term)))
+        else:
+            ts_query = websearch_to_tsquery(BOOK_SEARCH_CONFIG, term)
+            stmt = stmt.where(self.model.search_vector.bool_op("@@")(ts_query))
+
+        return stmt.order_by(self._get_search_rank(query).desc(), self.model.id.desc())
+
+    def get_list_ordering_fields(self, query: dict) -> list[OrderingField]:
+        rank = self._get_search_rank(query)
+        if rank is None or query.get("sort", "").strip():
+            return super().get_list_ordering_fields(query)
+
+        # search results are paged in the order of their rank, the cursors carry it
+        return [OrderingField("search_rank", rank, True), OrderingField("id", self.model.id, True)]
+
+    @staticmethod
+    def _get_category_slugs(query: typing.Optional[dict] = None) -> list[str]:
+        slugs = query.get("category", "").split(",") if query else []
+        return list(dict.fromkeys(slug.strip() for slug in slugs if slug.strip()))
+
+    @staticmethod
+    def _get_range_bound(query: typing.Optional[dict], param: str, type_: typing.Callable[[str], T]) -> T | None:
+        try:
+            return type_(query[param]) if query and query.get(param) else None
+        except (ArithmeticError, ValueError):
+            return None
+
+    def get_entities_default_query(self, query: typing.Optional[dict] = None) -> Select:
+        stmt = self._apply_search(select(self.model).options(*self.get_entities_load_options(query)), query)
+
         if query and query.get("author"):
             stmt = stmt.filter(self.model.author.ilike(f"%{query['author']}%"))  # noqa
         if query and query.get("title"):
@@ -42,38 +191,116 @@ class BooksCRUDService(CRUDService):
         if query and query.get("seller_id") and query["seller_id"].isnumeric():
             stmt = stmt.where(self.model.seller_id == int(query["seller_id"]))
 
-        return stmt
+        for column, lower_param, upper_param, type_ in (
+            (self.model.price, "min_price", "max_price", Decimal),
+            (self.model.publication_year, "year_from", "year_to", int),
+        ):
+            lower, upper = (
+                self._get_range_bound(query, lower_param, type_),
+                self._get_range_bound(query, upper_param, type_),
+            )
+            if lower is not None:
+                stmt = stmt.where(column >= lower)
+            if upper is not None:
+                stmt = stmt.where(column <= upper)
+
+        slugs = self._get_category_slugs(query)
+        return self._filter_categories(stmt, slugs) if slugs else stmt
+
+    def _filter_categories(self, stmt: Select, slugs: list[str]) -> Select:
+        # a semi-join served by the (category_id, book_id) index, books in several of the categories are listed once
+        category_books = select(BookCategory.book_id).join(BookCategory.category).where(Category.slug.in_(slugs))
+        return stmt.where(self.model.id.in_(category_books))
+
+    def get_facet_query(self, facet: str, query: dict) -> dict:
+        # categories are counted without the category filter, so the other categories of a selection keep their counts
+        return {param: value for param, value in query.items() if param != "category"}
+
+    async def count_facet(self, facet: str, stmt: Select, session: AsyncSession) -> list[dict[str, typing.Any]]:
+        count = func.count(BookCategory.book_id)
+        facet_stmt = (
+            select(Category.id, Category.name, Category.slug, count.label("count"))
+            .join(Category.books)
+            .group_by(Category.id)
+            .order_by(count.desc(), Category.name)
+        )
+        if stmt.whereclause is not None:
+            facet_stmt = facet_stmt.where(BookCategory.book_id.in_(stmt))
+
+        return [dict(row._mapping) for row in await session.execute(facet_stmt)]
+
+    async def _get_entities_list_actual_data(
+        self, session: AsyncSession, query: dict, user: typing.Optional[User] = None
+    ) -> EntitiesListData:
+        data = await super()._get_entities_list_actual_data(session, query, user)
+
+        # a search without full text matches, e.g. a misspelled word, is retried by similarity
+        first_page = not query.get("cursor") and query.get("page", "1") in ("", "1")
+        if not data.entities and first_page and self._get_search_term(query) and query.get("fuzzy") != "true":
+            data = await super()._get_entities_list_actual_data(session, {**query, "fuzzy": "true"}, user)
+
+        return data
 
-    async def rollback(self, session: AsyncSession) -> NoReturn:
+    async def rollback(self, session: AsyncSession, error: HTTPException | None = None) -> NoReturn:
+        # staged image uploads are discarded with the transaction
         await session.rollback()
-        raise self.create_entity_error
+        raise error or self.create_entity_error
 
-    async def after_entity_create(self, entity: M, create_entity: C, user: User, session: AsyncSession) -> M:
-        if create_entity.categories:
-            try:
-                stmt = select(Category).where(Category.name.in_(create_entity.categories))  # noqa
-                existing_categories = await session.scalars(stmt)
+    async def before_entity_create(self, entity: M, create_entity: C, user: User, session: AsyncSession) -> M:
+        if create_entity.images and len(list(filter(lambda x: x.is_main, create_entity.images))) != 1:
+            raise self.create_entity_error
 
-                for category in existing_categories:
-                    book_category = BookCategory(book_id=entity.id, category_id=category.id)  # noqa
-                    session.add(book_category)
+        return await super().before_entity_create(entity, create_entity, user, session)
 
-                await session.commit()
-            except Exception:
-                await session.rollback()
-                raise self.create_entity_error
+    async def after_entities_bulk_create(
+        self, entities: list[M], create_entities: list[C], user: User, session: AsyncSession
+    ) -> list[M]:
+        names = {name for create_entity in create_entities for name in create_entity.categories}
+        stmt = select(Category).where(Category.name.in_(names))  # noqa
+        categories = {category.name: category for category in await session.scalars(stmt)} if names else {}
 
-        if create_entity.images:
-            if len(list(filter(lambda x: x.is_main, create_entity.images))) != 1:
-                await self.rollback(session)
+        for entity, create_entity in zip(entities, create_entities):
+            book_categories = []
+            for name in [name for name in dict.fromkeys(create_entity.categories) if name in categories]:
+                book_category = BookCategory(book_id=entity.id, category_id=categories[name].id)  # noqa
+                set_committed_value(book_category, "category", categories[name])
+                book_categories.append(book_category)
 
             try:
-                for img_data in create_entity.images:
-                    book_image = await save_uploaded_book_image(img_data.file, entity.id, img_data.is_main)  # noqa
-                    session.add(book_image)
-
-                await session.commit()
+                book_images = [
+                    await save_uploaded_book_image(img_data.file, entity.id, img_data.is_main, session)  # noqa
+                    for img_data in create_entity.images
+                ]
+            except HTTPException as e:
+                await self.rollback(session, e)
             except Exception:  # noqa
                 await self.rollback(session)
 
-        return entity
+            session.add_all(book_categories + book_images)
+
+            # the response is built from these in-memory rows instead of re-selecting the book
+            set_committed_value(entity, "seller", user)
+            set_committed_value(entity, "categories", book_categories)
+            set_committed_value(entity, "images", book_images)
+
+        return entities
+
+    async def after_entity_create(self, entity: M, create_entity: C, user: User, session: AsyncSession) -> M:
+        entities = await self.after_entities_bulk_create([entity], [create_entity], user, session)
+        return entities[0]
+
+
+class BookCardsCRUDService(BooksCRUDService):
+    # the storefront listing read from the book_cards table: the filters, sorts and search of books on one table
+    model = BookCard
+    schema_class = BookCardSchema
+    list_schema_class = None
+
+    use_retrieve_cache = False
+    use_json_read_path = False
+
+    def get_entities_load_options(self, query: typing.Optional[dict] = None) -> list[LoaderOption]:
+        return []
+
+    def _filter_categories(self, stmt: Select, slugs: list[str]) -> Select:
+        return stmt.where(self.model.category_slugs.overlap(slugs))
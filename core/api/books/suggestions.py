@@ -0,0 +1,152 @@
+import typing
+
+import orjson
+from redis.asyncio.client import Pipeline
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.config import settings
+from core.database import session as session_maker
+from core.database.models import Book, Category
+from core.redis import get_cache_key, redis
+
+BOOK_SUGGESTIONS_KEY = get_cache_key("suggest", "books")
+BOOK_SUGGESTIONS_MEMBERS_KEY = get_cache_key("suggest", "books", "members")
+CATEGORY_SUGGESTIONS_KEY = get_cache_key("suggest", "categories")
+SUGGESTIONS_BUILT_KEY = get_cache_key("suggest", "built")
+SUGGESTIONS_REBUILD_LOCK_KEY = get_cache_key("lock", "suggest")
+
+EMPTY_SUGGESTIONS = b'{"books":[],"categories":[]}'
+
+
+def _normalize(text: str | None) -> str:
+    return " ".join((text or "").casefold().split())
+
+
+def _get_members(payload: list, *texts: str | None) -> list[str]:
+    # every word starts a phrase, so "code" suggests "Clean Code"; members sort by phrase, ties by payload
+    data = orjson.dumps(payload).decode()
+    phrases = []
+
+    for text in texts:
+        words = _normalize(text).split()
+        phrases += [" ".join(words[i:]) for i in range(len(words))]
+
+    return [f"{phrase}\0{data}" for phrase in dict.fromkeys(phrases)]
+
+
+def _get_book_members(book_id: int, title: str, author: str) -> list[str]:
+    return _get_members([book_id, title, author], title, author)
+
+
+def _get_payloads(members: list[bytes], limit: int) -> list[bytes]:
+    return list(dict.fromkeys(member.split(b"\0", 1)[1] for member in members))[:limit]
+
+
+async def get_suggestions(prefix: str, limit: int) -> bytes:
+    prefix = _normalize(prefix).encode()
+    if not prefix:
+        # a blank prefix would match every member
+        return EMPTY_SUGGESTIONS
+
+    # a book matches once per phrase that starts with the prefix, so more members than suggestions are read
+    async with redis.pipeline(transaction=False) as pipe:
+        for key in (BOOK_SUGGESTIONS_KEY, CATEGORY_SUGGESTIONS_KEY):
+            pipe.zrange(key, b"[" + prefix, b"[" + prefix + b"\xff", bylex=True, offset=0, num=limit * 4)
+        books, categories = await pipe.execute()
+
+    return b'{"books":[%s],"categories":[%s]}' % (
+        b",".join(_get_payloads(books, limit)),
+        b",".join(_get_payloads(categories, limit)),
+    )
+
+
+async def sync_book_suggestions(book_ids: typing.Iterable[int], session: AsyncSession) -> None:
+    book_ids = list(dict.fromkeys(book_ids))
+    if not book_ids:
+        return
+
+    # deleted books are missing here and only lose their members
+    rows = await session.execute(select(Book.id, Book.title, Book.author).where(Book.id.in_(book_ids)))
+    members = {book_id: _get_book_members(book_id, title, author) for book_id, title, author in rows}
+
+    async def replace_members(pipe: Pipeline) -> None:
+        previous = await pipe.hmget(BOOK_SUGGESTIONS_MEMBERS_KEY, book_ids)
+        pipe.multi()
+
+        for book_id, previous_members in zip(book_ids, previous):
+            if previous_members:
+                pipe.zrem(BOOK_SUGGESTIONS_KEY, *orjson.loads(previous_members))
+
+            if book_id in members:
+                pipe.zadd(BOOK_SUGGESTIONS_KEY, dict.fromkeys(members[book_id], 0))
+                pipe.hset(BOOK_SUGGESTIONS_MEMBERS_KEY, str(book_id), orjson.dumps(members[book_id]))
+            else:
+                pipe.hdel(BOOK_SUGGESTIONS_MEMBERS_KEY, str(book_id))
+
+    # retried when another write changed the members in between
+    await redis.transaction(replace_members, BOOK_SUGGESTIONS_MEMBERS_KEY)
+
+
+async def rebuild_book_suggestions(session: AsyncSession) -> None:
+    key, members_key = (
+        get_cache_key(BOOK_SUGGESTIONS_KEY, "rebuild"),
+        get_cache_key(BOOK_SUGGESTIONS_MEMBERS_KEY, "rebuild"),
+    )
+    await redis.delete(key, members_key)
+
+    stmt = select(Book.id, Book.title, Book.author).execution_options(yield_per=settings.suggestions_rebuild_batch_size)
+    async for rows in (await session.stream(stmt)).partitions():
+        async with redis.pipeline(transaction=False) as pipe:
+            for book_id, title, author in rows:
+                members = _get_book_members(book_id, title, author)
+                pipe.zadd(key, dict.fromkeys(members, 0))
+                pipe.hset(members_key, str(book_id), orjson.dumps(members))
+            await pipe.execute()
+
+    await _replace_keys({key: BOOK_SUGGESTIONS_KEY, members_key: BOOK_SUGGESTIONS_MEMBERS_KEY})
+
+
+async def rebuild_category_suggestions(session: AsyncSession) -> None:
+    key = get_cache_key(CATEGORY_SUGGESTIONS_KEY, "rebuild")
+    await redis.delete(key)
+
+    members = {}
+    for category in await session.scalars(select(Category)):
+        members.update(dict.fromkeys(_get_members([category.id, category.name, category.slug], category.name), 0))
+
+    if members:
+        await redis.zadd(key, members)
+
+    await _replace_keys({key: CATEGORY_SUGGESTIONS_KEY})
+
+
+async def _replace_keys(keys: dict[str, str]) -> None:
+    # readers switch to the rebuilt sets at once; an empty rebuild leaves no key to rename
+    existing = await redis.exists(*keys)
+
+    async with redis.pipeline() as pipe:
+        for key, target in keys.items():
+            if existing:
+                pipe.rename(key, target)
+            else:
+                pipe.delete(target)
+        await pipe.execute()
+
+
+async def build_suggestions() -> None:
+    # the first worker to start builds the sets when they are missing, e.g. after a Redis flush;
+    # the marker is checked instead of the sets, which are left out when there is nothing to suggest
+    if await redis.exists(SUGGESTIONS_BUILT_KEY):
+        return
+
+    if not await redis.set(SUGGESTIONS_REBUILD_LOCK_KEY, 1, nx=True, ex=settings.suggestions_rebuild_lock_timeout):
+        return
+
+    try:
+        async with session_maker() as session:
+            await rebuild_book_suggestions(session)
+            await rebuild_category_suggestions(session)
+        await redis.set(SUGGESTIONS_BUILT_KEY, 1)
+    finally:
+        await redis.delete(SUGGESTIONS_REBUILD_LOCK_KEY)
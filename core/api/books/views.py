@@ -1,7 +1,13 @@
-from core.api.books.schemas import BookCreateSchema, BookSchema, BookUpdateSchema
-from core.api.books.services import BooksCRUDService
+from fastapi import APIRouter, Depends, Query
+from fastapi.responses import Response
+
+from core.api.books.schemas import BookCardSchema, BookCreateSchema, BookSchema, BookUpdateSchema
+from core.api.books.services import BookCardsCRUDService, BooksCRUDService
+from core.api.books.suggestions import get_suggestions
 from core.api.routers import CRUDRouter, CRUDRouterConfig
 from core.api.users.dependencies import check_user_role
+from core.config import settings
+from core.database.models import User
 from core.database.models.user import UserRole
 
 config = CRUDRouterConfig(
@@ -18,7 +24,37 @@ config = CRUDRouterConfig(
         "update": check_user_role(UserRole.SELLER),
         "delete": check_user_role(UserRole.SELLER),
     },
+    enable_bulk=True,
+)
+
+cards_config = CRUDRouterConfig(
+    "/books/cards",
+    ["Books API"],
+    BookCreateSchema,
+    BookUpdateSchema,
+    BookCardSchema,
+    BookCardsCRUDService(),
+    {"list": check_user_role(UserRole.CUSTOMER, UserRole.SELLER)},
+    excluded_opts=["retrieve", "create", "update", "delete"],
 )
 
 crud_router = CRUDRouter(config)
-router = crud_router.router
+cards_router = CRUDRouter(cards_config)
+suggestions_router = APIRouter(prefix="/books", tags=["Books API"])
+
+
+@suggestions_router.get("/suggest")
+async def suggest_books(
+    prefix: str = Query(min_length=1),
+    limit: int = Query(default=settings.suggestions_limit, ge=1, le=settings.suggestions_max_limit),
+    user: User = Depends(check_user_role(UserRole.CUSTOMER, UserRole.SELLER)),  # noqa
+) -> Response:
+    # books are [id, title, author] and categories [id, name, slug], read straight from the index
+    return Response(await get_suggestions(prefix, limit), media_type="application/json")
+
+
+# registered before the CRUD routes, "/suggest" and "/cards" would otherwise match "/{id}"
+router = APIRouter()
+router.include_router(suggestions_router)
+router.include_router(cards_router.router)
+router.include_router(crud_router.router)
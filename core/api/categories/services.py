@@ -1,8 +1,12 @@
+import typing
+
 from fastapi import HTTPException, status
+from sqlalchemy.ext.asyncio import AsyncSession
 
+from core.api.books.suggestions import rebuild_category_suggestions
 from core.api.categories.schemas import CategoryCreateSchema, CategorySchema
-from core.api.services import CRUDService
-from core.database.models import Category
+from core.api.services import CRUDService, M, get_model_cache_tag
+from core.database.models import Book, Category
 
 
 class CategoriesCRUDService(CRUDService):
@@ -12,7 +16,16 @@ class CategoriesCRUDService(CRUDService):
 
     list_pagination = False
     use_cache = True
+    use_local_cache = True
 
     create_entity_error = HTTPException(
         status_code=status.HTTP_400_BAD_REQUEST, detail="This name and/or slug already exists"
     )
+
+    async def get_invalidated_cache_tags(self, entities: typing.Iterable[M], session: AsyncSession) -> list[str]:
+        # category names are part of the book responses
+        return [*await super().get_invalidated_cache_tags(entities, session), get_model_cache_tag(Book)]
+
+    async def _invalidate_cache(self, entities: typing.Iterable[M], session: AsyncSession) -> None:
+        await super()._invalidate_cache(entities, session)
+        await rebuild_category_suggestions(session)
@@ -0,0 +1,57 @@
+import hashlib
+import typing
+from datetime import UTC, datetime
+from email.utils import format_datetime, parsedate_to_datetime
+
+from starlette.requests import Request
+
+
+class ResponseValidators(typing.NamedTuple):
+    etag: str
+    last_modified: datetime | None = None
+
+
+def get_etag(*parts: object) -> str:
+    digest = hashlib.blake2b(digest_size=16)
+    for part in parts:
+        digest.update(part if isinstance(part, bytes) else str(part).encode())
+        digest.update(b"\0")
+
+    return f'"{digest.hexdigest()}"'
+
+
+def get_content_validators(content: bytes) -> ResponseValidators:
+    return ResponseValidators(get_etag(content))
+
+
+def _as_utc(value: datetime) -> datetime:
+    # naive timestamps are stored in UTC
+    return value.replace(tzinfo=UTC) if value.tzinfo is None else value.astimezone(UTC)
+
+
+def get_validators_headers(validators: ResponseValidators) -> dict[str, str]:
+    headers = {"ETag": validators.etag}
+    if validators.last_modified is not None:
+        headers["Last-Modified"] = format_datetime(_as_utc(validators.last_modified), usegmt=True)
+
+    return headers
+
+
+def is_not_modified(request: Request, validators: ResponseValidators) -> bool:
+    # If-None-Match takes precedence over If-Modified-Since, RFC 9110 13.2.2
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        etags = {etag.strip().removeprefix("W/") for etag in if_none_match.split(",")}
+        return "*" in etags or validators.etag in etags
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since is None or validators.last_modified is None:
+        return False
+
+    try:
+        since = parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+
+    # HTTP dates have a precision of one second
+    return _as_utc(validators.last_modified).replace(microsecond=0) <= _as_utc(since)
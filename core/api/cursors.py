@@ -0,0 +1,96 @@
+import base64
+import binascii
+import typing
+from datetime import date, datetime
+from decimal import Decimal
+
+import orjson
+from fastapi import HTTPException, status
+from sqlalchemy import ColumnElement, and_, or_, tuple_
+from sqlalchemy.orm import InstrumentedAttribute
+
+from core.database.models import Base
+
+CursorDirection = typing.Literal["next", "prev"]
+CursorValue = int | float | str | Decimal | datetime | date
+
+invalid_cursor_error = HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor.")
+
+
+class OrderingField(typing.NamedTuple):
+    name: str
+    column: InstrumentedAttribute | ColumnElement
+    descending: bool
+
+
+class Cursor(typing.NamedTuple):
+    values: tuple[CursorValue, ...]
+    direction: CursorDirection
+
+
+def get_ordering_fields(model: typing.Type[Base], ordering: typing.Sequence[str]) -> list[OrderingField]:
+    fields = []
+    for item in ordering:
+        name = item.removeprefix("-")
+        fields.append(OrderingField(name, getattr(model, name), item.startswith("-")))
+
+    # primary key is always the last sort key, so cursors stay unique
+    if "id" not in [field.name for field in fields]:
+        fields.append(OrderingField("id", model.id, fields[-1].descending if fields else True))
+
+    return fields
+
+
+def get_order_by_clauses(fields: list[OrderingField], reverse: bool = False) -> list[ColumnElement]:
+    return [field.column.desc() if field.descending != reverse else field.column.asc() for field in fields]
+
+
+def get_seek_predicate(
+    fields: list[OrderingField], values: tuple[CursorValue, ...], reverse: bool = False
+) -> ColumnElement:
+    def after(field: OrderingField, value: CursorValue) -> ColumnElement:
+        return field.column < value if field.descending != reverse else field.column > value
+
+    if len({field.descending for field in fields}) == 1:
+        # row value comparison can be served by a single composite index range scan
+        columns, bound = tuple_(*[field.column for field in fields]), tuple_(*values)
+        return columns < bound if fields[0].descending != reverse else columns > bound
+
+    predicates = []
+    for i, field in enumerate(fields):
+        equals = [fields[j].column == values[j] for j in range(i)]
+        predicates.append(and_(*equals, after(field, values[i])))
+
+    return or_(*predicates)
+
+
+def encode_cursor(entity: Base, fields: list[OrderingField], direction: CursorDirection) -> str:
+    payload = {"v": [getattr(entity, field.name) for field in fields], "d": direction}
+    return base64.urlsafe_b64encode(orjson.dumps(payload, default=str)).decode().rstrip("=")
+
+
+def _coerce_cursor_value(field: OrderingField, value: CursorValue) -> CursorValue:
+    if value is None:
+        raise invalid_cursor_error
+
+    python_type = field.column.type.python_type
+    if python_type is datetime:
+        return datetime.fromisoformat(value)
+    if python_type is date:
+        return date.fromisoformat(value)
+    if python_type is Decimal:
+        return Decimal(str(value))
+
+    return python_type(value)
+
+
+def decode_cursor(cursor: str, fields: list[OrderingField]) -> Cursor:
+    try:
+        payload = orjson.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        values, direction = payload["v"], payload["d"]
+        if direction not in ("next", "prev") or len(values) != len(fields):
+            raise invalid_cursor_error
+
+        return Cursor(tuple(_coerce_cursor_value(field, value) for field, value in zip(fields, values)), direction)
+    except (binascii.Error, orjson.JSONDecodeError, KeyError, TypeError, ValueError):
+        raise invalid_cursor_error
@@ -1,7 +1,10 @@
+import typing
+
 from fastapi import HTTPException, status
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from core.api.order_items.schemas import OrderItemsCreateSchema, OrderItemsSchema, OrderItemsUpdateSchema
+from core.api.orders.services import OrdersCRUDService, touch_order
 from core.api.services import C, CRUDService, M, U
 from core.database.models import Book, Order, OrderItem, User
 from core.database.models.order import OrderStatus
@@ -17,6 +20,8 @@ class OrderItemsCRUDService(CRUDService):
     create_entity_error = HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Order or book not found.")
     not_found_error = HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Order is cancelled.")
 
+    use_custom_remove = True
+
     async def _check_perms_to_order(self, order_id: int, user: User, session: AsyncSession) -> Order | None:  # noqa
         order = await session.get(Order, order_id)
         perms_check = user.role != UserRole.ADMIN and user.id != order.user_id
@@ -29,6 +34,16 @@ class OrderItemsCRUDService(CRUDService):
 
         return order
 
+    async def get_invalidated_cache_tags(self, entities: typing.Iterable[M], session: AsyncSession) -> list[str]:
+        tags = await super().get_invalidated_cache_tags(entities, session)
+
+        # orders embed their items; orders are in the identity map after the permissions check
+        for entity in entities:
+            order = await session.get(Order, entity.order_id)
+            tags.append(OrdersCRUDService.get_owner_cache_tag(order.user_id))
+
+        return tags
+
     async def check_permissions_to_edit_entity(self, entity: M, user: User, session: AsyncSession) -> M:
         await self._check_perms_to_order(entity.order_id, user, session)
 
@@ -43,6 +58,7 @@ class OrderItemsCRUDService(CRUDService):
 
         entity.order_id = order.id
         entity.price = book.price
+        touch_order(order)
 
         return entity
 
@@ -50,4 +66,17 @@ class OrderItemsCRUDService(CRUDService):
         if update_entity.price and user.role != UserRole.ADMIN:
             update_entity.price = None
 
+        # the order is in the identity map after the permissions check
+        touch_order(await session.get(Order, entity.order_id))
+
         return entity
+
+    async def custom_remove(self, entity: M, session: AsyncSession) -> None:
+        await self.bulk_custom_remove([entity], session)
+
+    async def bulk_custom_remove(self, entities: list[M], session: AsyncSession) -> None:
+        for entity in entities:
+            touch_order(await session.get(Order, entity.order_id))
+            await session.delete(entity)
+
+        await session.commit()
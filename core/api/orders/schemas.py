@@ -5,6 +5,7 @@ from pydantic import BaseModel, ConfigDict, Field
 
 from core.api.addresses.schemas import AddressSchema
 from core.api.order_items.schemas import OrderItemsCreateWithoutOrderIDSchema, OrderItemsSchema
+from core.api.payments.schemas import PaymentSchema
 from core.database.models.order import OrderStatus
 
 
@@ -22,7 +23,7 @@ class OrderSchema(OrderCreateSchema):
     tracking_number: str | None = None
     items: list[OrderItemsSchema] | None = None
     address: AddressSchema
-    payments: list | None = None
+    payments: list[PaymentSchema] | None = None
     id: int
 
 
@@ -1,9 +1,12 @@
 import typing
+from datetime import UTC, datetime
 
 from fastapi import HTTPException, status
-from sqlalchemy import Select, select
+from sqlalchemy import Select, select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import joinedload, selectinload
+from sqlalchemy.orm.attributes import set_committed_value
+from sqlalchemy.orm.interfaces import LoaderOption
 
 from core.api.orders.schemas import OrderCreateSchema, OrderSchema, OrderUpdateSchema
 from core.api.services import C, CRUDService, M, U
@@ -12,6 +15,17 @@ from core.database.models.order import OrderStatus
 from core.database.models.user import UserRole
 
 
+def touch_order(order: Order) -> None:
+    # items and payments are part of the order responses, their writes change the order validators
+    order.updated_at = datetime.now(UTC).replace(tzinfo=None)
+
+
+async def touch_address_orders(address_id: int, session: AsyncSession) -> None:
+    # the delivery address is embedded in the order responses as well
+    stmt = update(Order).where(Order.address_id == address_id).values(updated_at=datetime.now(UTC).replace(tzinfo=None))
+    await session.execute(stmt)
+
+
 class OrdersCRUDService(CRUDService):
     model = Order
     schema_class = OrderSchema
@@ -27,19 +41,29 @@ class OrdersCRUDService(CRUDService):
     use_custom_remove = True
     list_pagination = False
     use_cache = True
+    use_updated_at_validators = True
 
     create_model_dump_exclude = {"items"}
 
     create_entity_error = HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Address not found.")
 
+    def get_entities_load_options(self, query: typing.Optional[dict] = None) -> list[LoaderOption]:
+        fields = self.get_requested_fields(query)
+        loaders = {
+            "address": joinedload(self.model.address),
+            "payments": selectinload(self.model.payments),
+            "items": selectinload(self.model.items),
+        }
+
+        return [loader for field, loader in loaders.items() if fields is None or field in fields]
+
+    def get_entity_returning_load_options(self) -> list[LoaderOption]:
+        return [selectinload(self.model.address), selectinload(self.model.payments), selectinload(self.model.items)]
+
     def get_entities_default_query(self, query: typing.Optional[dict] = None) -> Select:
         return (
             select(self.model)
-            .options(
-                joinedload(self.model.address),
-                selectinload(self.model.payments),
-                selectinload(self.model.items),
-            )
+            .options(*self.get_entities_load_options(query))
             .filter(self.model.status != OrderStatus.CANCELLED)
             .order_by(self.model.id)
         )
@@ -57,28 +81,31 @@ class OrdersCRUDService(CRUDService):
         return entity
 
     async def after_entity_create(self, entity: M, create_entity: C, user: User, session: AsyncSession) -> M:
+        items = []
+
         if create_entity.model_dump(include={"items"}).get("items"):
-            items = create_entity.model_dump(include={"items"})["items"]
-            stmt = select(Book).where(Book.id.in_(item["book_id"] for item in items))
+            items_data = create_entity.model_dump(include={"items"})["items"]
+            stmt = select(Book).where(Book.id.in_(item["book_id"] for item in items_data))
             books = await session.scalars(stmt)
             book_dict = {book.id: book for book in books}
 
-            for order_item in items:
+            for order_item in items_data:
                 book = book_dict.get(order_item["book_id"])
-
                 if book:
-                    item = OrderItem(
-                        order_id=entity.id,  # noqa
-                        price=book.price,
-                        **order_item,
-                    )
-                    session.add(item)
+                    items.append(OrderItem(order_id=entity.id, price=book.price, **order_item))  # noqa
+
+            session.add_all(items)
 
-            await session.commit()
+        # address is already in the identity map after the permissions check, so no query is emitted
+        set_committed_value(entity, "address", await session.get(Address, entity.address_id))
+        set_committed_value(entity, "items", items)
+        set_committed_value(entity, "payments", [])
 
         return entity
 
-    async def before_entity_update(self, entity: M, update_entity: U, user: User, session: AsyncSession) -> M:
+    async def before_entity_update(
+        self, entity: typing.Optional[M], update_entity: U, user: User, session: AsyncSession
+    ) -> typing.Optional[M]:
         if update_entity.address_id and not await self._check_address_perms(update_entity.address_id, user, session):
             update_entity.address_id = None
 
@@ -6,13 +6,16 @@ from sqlalchemy import Select, func, select
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import joinedload, selectinload
 
+from core.api.orders.services import OrdersCRUDService, touch_order
 from core.api.payments.schemas import PaymentCreateResponseSchema, PaymentCreateSchema, PaymentSchema
-from core.api.services import C, CRUDService, M, S
+from core.api.serializers import get_response_serializer
+from core.api.services import C, CRUDService, M
 from core.config import settings
 from core.database.models import Order, OrderItem, Payment, User
 from core.database.models.order import OrderStatus
 from core.database.models.payment import PaymentStatus
 from core.database.models.user import UserRole
+from core.redis import RedisCache
 
 stripe.api_key = settings.stripe_secret_key
 
@@ -48,13 +51,25 @@ class PaymentsCRUDService(CRUDService):
 
         return entity, intent_data
 
-    async def create_entity(self, create_entity_data: C, session: AsyncSession, user: User) -> S:
+    async def create_entity(self, create_entity_data: C, session: AsyncSession, user: User) -> bytes:
         entity = self.model(**create_entity_data.model_dump())
         entity, intent_data = await self.before_entity_create(entity, create_entity_data, user, session)
         session.add(entity)
         await session.commit()
+        await self._invalidate_cache([entity], session)
 
-        return PaymentCreateResponseSchema(client_secret=intent_data.client_secret).model_dump()
+        response = PaymentCreateResponseSchema(client_secret=intent_data.client_secret)
+        return get_response_serializer(PaymentCreateResponseSchema).dump_entity(response)
+
+    async def get_invalidated_cache_tags(self, entities: typing.Iterable[M], session: AsyncSession) -> list[str]:
+        tags = await super().get_invalidated_cache_tags(entities, session)
+
+        # orders embed their payments; orders are in the identity map after the permissions check
+        for entity in entities:
+            order = await session.get(Order, entity.order_id)
+            tags.append(OrdersCRUDService.get_owner_cache_tag(order.user_id))
+
+        return tags
 
     async def _check_perms_to_create_payment(self, order_id: int, user: User, session: AsyncSession) -> None:
         order = await session.get(Order, order_id, options=(selectinload(Order.items),))
@@ -65,6 +80,8 @@ class PaymentsCRUDService(CRUDService):
         if not (order.status == OrderStatus.CREATED and len(order.items)):  # noqa
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Order is not ready to accept payments")
 
+        touch_order(order)
+
     async def _create_payment_intent(self, amount: int, currency: str = "usd") -> IntentData:  # noqa
         try:
             intent = stripe.PaymentIntent.create(
@@ -137,8 +154,12 @@ async def handle_stripe_webhook(payload: bytes, sig_header: str, session: AsyncS
         payment = await _get_and_validate_payment_by_transaction_id(event["data"]["object"]["id"], session)
 
         payment.status = PaymentStatus.PAID
+        touch_order(payment.order)
         session.add(payment)
         await session.commit()
         await _handle_payment_success_for_order(payment.order.id, session)
+        await RedisCache.invalidate_tags(
+            OrdersCRUDService.get_model_cache_tag(), OrdersCRUDService.get_owner_cache_tag(payment.order.user_id)
+        )
 
     return {"status": "success"}
@@ -0,0 +1,77 @@
+import typing
+from datetime import timedelta
+
+from fastapi import HTTPException, status
+from sqlalchemy import Integer, cast, func, or_, select, text, update
+from sqlalchemy.dialects.postgresql import array
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.api.services import get_entity_cache_tag, get_model_cache_tag
+from core.config import settings
+from core.database.models import Book, Review, User
+from core.database.models.rating import RATINGS
+from core.redis import RedisCache, get_cache_key
+
+book_not_found_error = HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Book not found.")
+
+
+def get_rating_histogram_cache_key(book_id: int) -> str:
+    return get_cache_key(get_model_cache_tag(Book), "ratings", str(book_id))
+
+
+async def _load_rating_histogram(book_id: int, session: AsyncSession) -> list[dict[str, int]]:
+    histogram = await session.scalar(select(Book.rating_histogram).where(Book.id == book_id))
+    if histogram is None:
+        raise book_not_found_error
+
+    return [{"rating": rating, "count": count} for rating, count in zip(RATINGS, histogram)]
+
+
+async def get_rating_histogram(book_id: int, session: AsyncSession) -> list[dict[str, int]]:
+    # one row of the book, dropped from the cache by the writes of its reviews
+    return await RedisCache.get_or_set(
+        get_rating_histogram_cache_key(book_id),
+        lambda: _load_rating_histogram(book_id, session),
+        timedelta(minutes=settings.rating_histogram_cache_exp),
+        [get_entity_cache_tag(Book, book_id)],
+    )
+
+
+async def repair_rating_aggregates(session: AsyncSession) -> int:
+    # recounts the aggregates the trigger keeps, e.g. after reviews were loaded with the triggers disabled
+    await session.execute(text("LOCK TABLE reviews IN SHARE MODE"))
+
+    count, total = func.count(Review.id).label("count"), func.sum(Review.rating).label("sum")
+    histogram = array([cast(func.count(Review.id).filter(Review.rating == rating), Integer) for rating in RATINGS])
+    ratings = {
+        Book: select(Review.book_id.label("id"), count, total, histogram.label("histogram"))
+        .group_by(Review.book_id)
+        .subquery(),
+        User: select(Book.seller_id.label("id"), count, total)
+        .select_from(Review)
+        .join(Review.book)
+        .group_by(Book.seller_id)
+        .subquery(),
+    }
+
+    tags = []
+    for model, subquery in ratings.items():
+        columns: dict[str, typing.Any] = {"rating_count": subquery.c.count, "rating_sum": subquery.c.sum}
+        empty: dict[str, typing.Any] = {"rating_count": 0, "rating_sum": 0}
+        if model is Book:
+            columns["rating_histogram"], empty["rating_histogram"] = subquery.c.histogram, [0] * len(RATINGS)
+
+        changed = or_(*[getattr(model, name) != value for name, value in columns.items()])
+        stmt = update(model).values(columns).where(model.id == subquery.c.id, changed).returning(model.id)
+        ids = list(await session.scalars(stmt))
+
+        # the ones left without reviews
+        changed = or_(*[getattr(model, name) != value for name, value in empty.items()])
+        stmt = update(model).values(empty).where(changed, model.id.not_in(select(subquery.c.id))).returning(model.id)
+        ids += await session.scalars(stmt)
+        tags += [get_entity_cache_tag(model, entity_id) for entity_id in ids]
+
+    await session.commit()
+    await RedisCache.invalidate_tags(get_model_cache_tag(Book), *tags)
+
+    return len(tags)
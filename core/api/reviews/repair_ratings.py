@@ -0,0 +1,18 @@
+# recounts the rating aggregates of books and sellers from their reviews
+# usage: python -m core.api.reviews.repair_ratings
+import asyncio
+
+from core.api.reviews.ratings import repair_rating_aggregates
+from core.database import engine, session
+
+
+async def main() -> None:
+    async with session() as db_session:
+        count = await repair_rating_aggregates(db_session)
+    await engine.dispose()
+
+    print(f"{count} rating aggregates repaired")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
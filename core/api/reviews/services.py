@@ -1,8 +1,14 @@
+import typing
+
 from fastapi import HTTPException, status
+from sqlalchemy import Select, select
+from sqlalchemy.ext.asyncio import AsyncSession
 
+from core.api.reviews.ratings import get_rating_histogram
 from core.api.reviews.schemas import ReviewCreateSchema, ReviewSchema, ReviewUpdateSchema
-from core.api.services import CRUDService
-from core.database.models import Review
+from core.api.services import CRUDService, M, get_entity_cache_tag, get_model_cache_tag
+from core.api.users.sellers.services import get_seller_cache_tag
+from core.database.models import Book, Review, User
 
 
 class ReviewsCRUDService(CRUDService):
@@ -20,3 +26,38 @@ class ReviewsCRUDService(CRUDService):
     create_entity_error = HTTPException(
         status_code=status.HTTP_400_BAD_REQUEST, detail="Book not found, or your review with this book exists."
     )
+
+    async def get_invalidated_cache_tags(self, entities: typing.Iterable[M], session: AsyncSession) -> list[str]:
+        entities = list(entities)
+        book_ids = {entity.book_id for entity in entities}
+        tags = await super().get_invalidated_cache_tags(entities, session)
+        # rating aggregates are part of the book responses and of the seller profiles
+        seller_ids = await session.scalars(select(Book.seller_id).where(Book.id.in_(book_ids)).distinct())
+
+        return (
+            tags
+            + [get_model_cache_tag(Book)]
+            + [get_entity_cache_tag(Book, book_id) for book_id in book_ids]
+            + [get_seller_cache_tag(seller_id) for seller_id in seller_ids]
+        )
+
+
+class BookReviewsCRUDService(ReviewsCRUDService):
+    list_owner_only = False
+    list_cursor_pagination = True
+    list_ordering = ("-created_at",)
+    list_filter_params = ("book_id",)
+
+    def _get_entities_list_statement(self, query: dict, user: typing.Optional[User] = None) -> Select:
+        return super()._get_entities_list_statement(query, user).where(Review.book_id == int(query["book_id"]))
+
+    async def get_book_reviews(self, book_id: int, session: AsyncSession, query: dict) -> bytes:
+        histogram = await get_rating_histogram(book_id, session)
+
+        # keyset pages only, each one is a range of the (book_id, created_at, id) index
+        query = {**query, "book_id": str(book_id), "cursor": query.get("cursor", ""), "count": "none"}
+        data = await self._get_entities_list_actual_data(session, query)
+
+        # the total is the sum of the histogram kept on the book, the reviews are not counted
+        data = data._replace(total=sum(item["count"] for item in histogram), facets={"rating": histogram})
+        return self._dump_entities_list(data, query)
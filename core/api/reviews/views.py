@@ -1,7 +1,13 @@
+from fastapi import APIRouter, Depends, Request
+from fastapi.responses import Response
+from sqlalchemy.ext.asyncio import AsyncSession
+
 from core.api.reviews.schemas import ReviewCreateSchema, ReviewSchema, ReviewUpdateSchema
-from core.api.reviews.services import ReviewsCRUDService
+from core.api.reviews.services import BookReviewsCRUDService, ReviewsCRUDService
 from core.api.routers import CRUDRouter, CRUDRouterConfig
 from core.api.users.dependencies import check_user_role
+from core.database import get_session
+from core.database.models import User
 from core.database.models.user import UserRole
 
 config = CRUDRouterConfig(
@@ -21,4 +27,22 @@ config = CRUDRouterConfig(
 )
 
 crud_router = CRUDRouter(config)
-router = crud_router.router
+book_reviews_service = BookReviewsCRUDService()
+book_reviews_router = APIRouter(prefix="/books", tags=["Reviews API"])
+
+
+@book_reviews_router.get("/{book_id}/reviews", response_model=list[ReviewSchema])
+async def get_book_reviews(
+    book_id: int,
+    request: Request,
+    session: AsyncSession = Depends(get_session),
+    user: User = Depends(check_user_role(UserRole.CUSTOMER, UserRole.SELLER)),  # noqa
+) -> Response:
+    # newest first, "cursor" of the response pages, "rating" facet is the 1-5 star histogram of the book
+    content = await book_reviews_service.get_book_reviews(book_id, session, dict(request.query_params))
+    return Response(content, media_type="application/json")
+
+
+router = APIRouter()
+router.include_router(crud_router.router)
+router.include_router(book_reviews_router)
@@ -1,13 +1,24 @@
 from __future__ import annotations
 
-from typing import TYPE_CHECKING, Callable, Literal, Optional, Sequence, Type
+from typing import TYPE_CHECKING, Awaitable, Callable, Literal, Optional, Sequence, Type
 
+import orjson
 from fastapi import APIRouter, Depends, HTTPException, status
-from fastapi.responses import ORJSONResponse, Response
-from pydantic import BaseModel, TypeAdapter
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import Response
+from pydantic import BaseModel, PositiveInt, TypeAdapter, ValidationError
 from sqlalchemy.ext.asyncio import AsyncSession
 from starlette.requests import Request
 
+from core.api.conditional import (
+    ResponseValidators,
+    get_content_validators,
+    get_validators_headers,
+    is_not_modified,
+)
+from core.api.schemas import BulkItemStatus, BulkResponse
+from core.api.serializers import get_response_serializer, get_type_adapter
+from core.config import settings
 from core.database import get_session
 from core.database.models.user import User
 
@@ -31,6 +42,7 @@ class CRUDRouterConfig:
         crud_service: CRUDService,
         user_dependencies_map: UserDependenciesMapType = None,
         excluded_opts: Optional[Sequence[UserDependenciesMethodsType]] = None,
+        enable_bulk: bool = False,
     ):
         self.prefix = prefix
         self.tags = tags
@@ -40,29 +52,119 @@ class CRUDRouterConfig:
         self.crud_service = crud_service
         self.user_dependencies_map = user_dependencies_map or {}
         self.excluded_opts = excluded_opts or tuple()
+        self.enable_bulk = enable_bulk
 
 
 class CRUDRouter:
     def __init__(self, config: CRUDRouterConfig):
         self.config = config
         self.router = APIRouter(prefix=config.prefix, tags=config.tags)
+        # response models and adapters are built once here instead of on the first requests
+        config.crud_service.get_response_serializer()
+        self.bulk_response_serializer = get_response_serializer(BulkResponse)
+        self.create_adapter = get_type_adapter(config.create_schema)
+        self.update_adapter = get_type_adapter(config.update_schema)
         self._setup_routes()
 
     def _get_user_dependency(self, method: UserDependenciesMethodsType) -> Callable:
         return self.config.user_dependencies_map.get(method)
 
-    async def _get_schema_validated_request_data(self, request: Request, schema_class: Type[BaseModel]) -> BaseModel:  # noqa
+    async def _get_schema_validated_request_data(self, request: Request, adapter: TypeAdapter) -> BaseModel:  # noqa
+        body = await request.body()
+
+        try:
+            # the raw body is parsed and validated in a single pass by pydantic-core
+            return adapter.validate_json(body)
+        except ValidationError as e:
+            if any(error["type"] == "json_invalid" for error in e.errors(include_url=False)):
+                raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid JSON")
+            raise
+
+    async def _get_bulk_request_data(self, request: Request) -> list:  # noqa
         try:
-            data = await request.json()
-        except Exception:
+            data = orjson.loads(await request.body())
+        except orjson.JSONDecodeError:
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid JSON")
 
-        adapter = TypeAdapter(schema_class)
-        return adapter.validate_python(data)
+        if not isinstance(data, list):
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Expected a JSON array")
+
+        if len(data) > settings.bulk_max_items:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"No more than {settings.bulk_max_items} items per request are allowed",
+            )
+
+        return data
+
+    def _get_bulk_validated_items(  # noqa
+        self, items: list, adapter: TypeAdapter, with_id: bool = False
+    ) -> tuple[dict[int, BaseModel | tuple[int, BaseModel]], list[BulkItemStatus]]:
+        id_adapter = get_type_adapter(PositiveInt)
+        validated, statuses = {}, []
+
+        for index, item in enumerate(items):
+            try:
+                if with_id:
+                    item = dict(item) if isinstance(item, dict) else {}
+                    entity_id = id_adapter.validate_python(item.pop("id", None))
+                    validated[index] = (entity_id, adapter.validate_python(item))
+                else:
+                    validated[index] = adapter.validate_python(item)
+            except ValidationError as e:
+                statuses.append(
+                    BulkItemStatus(
+                        index=index,
+                        status=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                        detail=jsonable_encoder(e.errors(include_url=False)),
+                    )
+                )
+
+        return validated, statuses
+
+    def _get_bulk_response(self, statuses: list[BulkItemStatus], sort: bool = True) -> Response:
+        items = sorted(statuses, key=lambda x: x.index) if sort else statuses
+        return Response(
+            self.bulk_response_serializer.dump_entity(BulkResponse(items=items)), media_type="application/json"
+        )
+
+    async def _get_conditional_response(  # noqa
+        self,
+        request: Request,
+        validators: Optional[ResponseValidators],
+        get_content: Callable[[], Awaitable[bytes]],
+    ) -> Response:
+        # validators probed up front answer 304 without loading the response, others are the hash of the content
+        if validators is None or not is_not_modified(request, validators):
+            content = await get_content()
+            validators = validators or get_content_validators(content)
+
+            if not is_not_modified(request, validators):
+                return Response(content, media_type="application/json", headers=get_validators_headers(validators))
+
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=get_validators_headers(validators))
 
     def get_query_params(self, request: Request) -> dict:  # noqa
         return dict(request.query_params)
 
+    def _get_requested_ids(self, query: dict) -> list[int] | None:  # noqa
+        if "ids" not in query:
+            return None
+
+        try:
+            ids = get_type_adapter(list[PositiveInt]).validate_python(query["ids"].split(","))
+        except ValidationError:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Expected comma separated ids")
+
+        # one listing page of entities at most
+        if len(set(ids)) > settings.pagination_page_size:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"No more than {settings.pagination_page_size} ids per request are allowed",
+            )
+
+        return ids
+
     def _setup_routes(self):
         list_user_dependency = self._get_user_dependency("list")
         retrieve_user_dependency = self._get_user_dependency("retrieve")
@@ -70,31 +172,51 @@ class CRUDRouter:
         update_user_dependency = self._get_user_dependency("update")
         delete_user_dependency = self._get_user_dependency("delete")
 
-        create_schema_class = self.config.create_schema
-        update_schema_class = self.config.update_schema
         response_schema_class = self.config.response_schema
 
+        if self.config.enable_bulk:
+            self._setup_bulk_routes()
+
         if "list" not in self.config.excluded_opts:
 
             @self.router.get("/", response_model=list[response_schema_class])
             async def get_entities(
+                request: Request,
                 session: AsyncSession = Depends(get_session),
                 user: User = Depends(list_user_dependency),
                 query: dict = Depends(self.get_query_params),
-            ) -> ORJSONResponse:
-                entities = await self.config.crud_service.get_entities_list(session, query, user)
-                return ORJSONResponse(entities)
+            ) -> Response:
+                service = self.config.crud_service
+
+                # ?ids= is the multi-get of retrieve, a single MGET of the cached entities
+                ids = self._get_requested_ids(query)
+                if ids is not None:
+                    return await self._get_conditional_response(
+                        request, None, lambda: service.retrieve_entities(ids, session, user, query)
+                    )
+
+                return await self._get_conditional_response(
+                    request,
+                    await service.get_list_validators(session, query, user),
+                    lambda: service.get_entities_list(session, query, user),
+                )
 
         if "retrieve" not in self.config.excluded_opts:
 
             @self.router.get("/{id}", response_model=list[response_schema_class])
             async def retrieve_entity(
+                request: Request,
                 id: int,  # noqa
                 session: AsyncSession = Depends(get_session),
                 user: User = Depends(retrieve_user_dependency),
-            ) -> ORJSONResponse:
-                entity = await self.config.crud_service.retrieve_entity(id, session, user)
-                return ORJSONResponse(entity)
+                query: dict = Depends(self.get_query_params),
+            ) -> Response:
+                service = self.config.crud_service
+                return await self._get_conditional_response(
+                    request,
+                    await service.get_entity_validators(id, session, user, query),
+                    lambda: service.retrieve_entity(id, session, user, query),
+                )
 
         if "create" not in self.config.excluded_opts:
 
@@ -103,10 +225,10 @@ class CRUDRouter:
                 request: Request,
                 session: AsyncSession = Depends(get_session),
                 user: User = Depends(create_user_dependency),
-            ) -> ORJSONResponse:
-                create_schema = await self._get_schema_validated_request_data(request, create_schema_class)
-                entity = await self.config.crud_service.create_entity(create_schema, session, user)
-                return ORJSONResponse(entity, status_code=status.HTTP_201_CREATED)
+            ) -> Response:
+                create_schema = await self._get_schema_validated_request_data(request, self.create_adapter)
+                content = await self.config.crud_service.create_entity(create_schema, session, user)
+                return Response(content, status_code=status.HTTP_201_CREATED, media_type="application/json")
 
         if "update" not in self.config.excluded_opts:
 
@@ -119,10 +241,10 @@ class CRUDRouter:
                 id: int,  # noqa
                 session: AsyncSession = Depends(get_session),
                 user: User = Depends(update_user_dependency),
-            ) -> ORJSONResponse:
-                update_schema = await self._get_schema_validated_request_data(request, update_schema_class)
-                entity = await self.config.crud_service.update_entity(id, update_schema, session, user)
-                return ORJSONResponse(entity)
+            ) -> Response:
+                update_schema = await self._get_schema_validated_request_data(request, self.update_adapter)
+                content = await self.config.crud_service.update_entity(id, update_schema, session, user)
+                return Response(content, media_type="application/json")
 
         if "delete" not in self.config.excluded_opts:
 
@@ -134,3 +256,55 @@ class CRUDRouter:
             ) -> Response:
                 await self.config.crud_service.remove_entity(id, session, user)
                 return Response(status_code=status.HTTP_204_NO_CONTENT)
+
+    def _setup_bulk_routes(self) -> None:
+        create_user_dependency = self._get_user_dependency("create")
+        update_user_dependency = self._get_user_dependency("update")
+        delete_user_dependency = self._get_user_dependency("delete")
+
+        # registered before "/{id}" so that "/bulk" is not matched as an entity id
+        if "create" not in self.config.excluded_opts:
+
+            @self.router.post("/bulk", response_model=BulkResponse)
+            async def bulk_create_entities(
+                request: Request,
+                session: AsyncSession = Depends(get_session),
+                user: User = Depends(create_user_dependency),
+            ) -> Response:
+                items = await self._get_bulk_request_data(request)
+                create_schemas, statuses = self._get_bulk_validated_items(items, self.create_adapter)
+                statuses += await self.config.crud_service.bulk_create_entities(create_schemas, session, user)
+                return self._get_bulk_response(statuses)
+
+        if "update" not in self.config.excluded_opts:
+
+            @self.router.patch("/bulk", response_model=BulkResponse)
+            async def bulk_update_entities(
+                request: Request,
+                session: AsyncSession = Depends(get_session),
+                user: User = Depends(update_user_dependency),
+            ) -> Response:
+                items = await self._get_bulk_request_data(request)
+                update_schemas, statuses = self._get_bulk_validated_items(items, self.update_adapter, with_id=True)
+                statuses += await self.config.crud_service.bulk_update_entities(update_schemas, session, user)
+                return self._get_bulk_response(statuses)
+
+        if "delete" not in self.config.excluded_opts:
+
+            @self.router.delete("/bulk", response_model=BulkResponse)
+            async def bulk_delete_entities(
+                request: Request,
+                session: AsyncSession = Depends(get_session),
+                user: User = Depends(delete_user_dependency),
+            ) -> Response:
+                items = await self._get_bulk_request_data(request)
+                try:
+                    entities_ids = get_type_adapter(list[PositiveInt]).validate_python(items)
+                except ValidationError as e:
+                    raise HTTPException(
+                        status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                        detail=jsonable_encoder(e.errors(include_url=False)),
+                    )
+
+                statuses = await self.config.crud_service.bulk_remove_entities(entities_ids, session, user)
+                return self._get_bulk_response(statuses, sort=False)
@@ -1,16 +1,40 @@
 from __future__ import annotations
 
+import functools
 import typing
 
-from pydantic import BaseModel
+from pydantic import BaseModel, create_model
 
 S = typing.TypeVar("S", bound=BaseModel)
 
 
 class ListPaginatedResponse(BaseModel, typing.Generic[S]):
     items: list[S]
-    total: int
+    total: int | None = None
     pages: int | None = None
+    next_cursor: str | None = None
+    prev_cursor: str | None = None
+    facets: dict[str, list[dict[str, typing.Any]]] | None = None
 
     class Config:
         arbitrary_types_allowed = True
+
+
+class BulkItemStatus(BaseModel):
+    index: int
+    status: int
+    id: int | None = None
+    detail: typing.Any = None
+
+
+class BulkResponse(BaseModel):
+    items: list[BulkItemStatus]
+
+
+@functools.lru_cache(maxsize=256)
+def get_fields_subset_schema(schema_class: typing.Type[S], fields: frozenset[str]) -> typing.Type[BaseModel]:
+    return create_model(
+        f"{schema_class.__name__}Subset",
+        __config__=schema_class.model_config,
+        **{name: (field.annotation, field) for name, field in schema_class.model_fields.items() if name in fields},
+    )
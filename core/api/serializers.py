@@ -0,0 +1,81 @@
+from __future__ import annotations
+
+import functools
+import typing
+
+from pydantic import BaseModel, TypeAdapter
+
+from core.api.schemas import ListPaginatedResponse
+
+S = typing.TypeVar("S", bound=BaseModel)
+
+
+class ResponseSerializer(typing.Generic[S]):
+    def __init__(self, schema_class: typing.Type[S]):
+        self.schema_class = schema_class
+        self.list_response_class = ListPaginatedResponse[schema_class]
+
+        self._item_adapter = TypeAdapter(schema_class)
+        self._items_adapter = TypeAdapter(list[schema_class])
+        self._list_response_adapter = TypeAdapter(self.list_response_class)
+
+    def validate_entity(self, entity: object) -> S:
+        return self._item_adapter.validate_python(entity, from_attributes=True)
+
+    def validate_entities(self, entities: typing.Iterable[object]) -> list[S]:
+        # the whole page is validated by a single pydantic-core call instead of a python loop
+        return self._items_adapter.validate_python(entities, from_attributes=True)
+
+    def dump_entities_python(self, entities: typing.Iterable[object]) -> list[dict[str, typing.Any]]:
+        # json mode leaves only plain types, which every cache codec can store
+        return self._items_adapter.dump_python(self.validate_entities(entities), mode="json")
+
+    def dump_entity_python(self, entity: object) -> dict[str, typing.Any]:
+        return self._item_adapter.dump_python(self.validate_entity(entity), mode="json")
+
+    def dump_entity(self, entity: object) -> bytes:
+        return self._item_adapter.dump_json(self.validate_entity(entity))
+
+    def dump_entities_list(
+        self,
+        entities: typing.Iterable[object],
+        total: int | None = None,
+        pages: int | None = None,
+        next_cursor: str | None = None,
+        prev_cursor: str | None = None,
+        facets: dict[str, list[dict[str, typing.Any]]] | None = None,
+    ) -> bytes:
+        # items are already validated, so the envelope is built without validating them again
+        response = self.list_response_class.model_construct(
+            items=self.validate_entities(entities),
+            total=total,
+            pages=pages,
+            next_cursor=next_cursor,
+            prev_cursor=prev_cursor,
+            facets=facets,
+        )
+        # facets are only part of the responses that requested them
+        return self._list_response_adapter.dump_json(response, exclude=None if facets is not None else {"facets"})
+
+    def dump_entities_list_json(
+        self,
+        items: bytes,
+        total: int | None = None,
+        pages: int | None = None,
+        next_cursor: str | None = None,
+        prev_cursor: str | None = None,
+        facets: dict[str, list[dict[str, typing.Any]]] | None = None,
+    ) -> bytes:
+        # items come first in the envelope, the empty list is replaced by the json array built elsewhere
+        envelope = self.dump_entities_list([], total, pages, next_cursor, prev_cursor, facets)
+        return b'{"items":' + items + envelope.removeprefix(b'{"items":[]')
+
+
+@functools.lru_cache(maxsize=256)
+def get_response_serializer(schema_class: typing.Type[S]) -> ResponseSerializer[S]:
+    return ResponseSerializer(schema_class)
+
+
+@functools.lru_cache(maxsize=256)
+def get_type_adapter(type_: typing.Any) -> TypeAdapter:  # noqa
+    return TypeAdapter(type_)
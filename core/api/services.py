@@ -1,27 +1,64 @@
+import functools
 import typing
 from datetime import timedelta
+from urllib.parse import quote
 
+import orjson
 from fastapi import HTTPException, status
 from pydantic import BaseModel
-from sqlalchemy import Select, func, select, update
+from sqlalchemy import ColumnElement, Select, delete, func, select, text, update
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
-
-from core.api.schemas import ListPaginatedResponse
+from sqlalchemy.orm import InstrumentedAttribute, load_only
+from sqlalchemy.orm.interfaces import LoaderOption
+
+from core.api.conditional import ResponseValidators, get_etag
+from core.api.cursors import (
+    OrderingField,
+    decode_cursor,
+    encode_cursor,
+    get_order_by_clauses,
+    get_ordering_fields,
+    get_seek_predicate,
+)
+from core.api.schemas import BulkItemStatus, get_fields_subset_schema
+from core.api.serializers import ResponseSerializer, get_response_serializer
 from core.config import settings
 from core.database.models import Base, User
 from core.database.models.user import UserRole
-from core.redis import RedisCache
+from core.redis import RedisCache, get_cache_key
 
 M = typing.TypeVar("M", bound=Base)
 S = typing.TypeVar("S", bound=BaseModel)
 C = typing.TypeVar("C", bound=BaseModel)
 U = typing.TypeVar("U", bound=BaseModel)
 
+CountMode = typing.Literal["none", "estimate", "exact"]
+COUNT_MODES: tuple[CountMode, ...] = typing.get_args(CountMode)
+
+
+class EntitiesListData(typing.NamedTuple):
+    entities: list[M]
+    total: int | None
+    pages: int | None = None
+    next_cursor: str | None = None
+    prev_cursor: str | None = None
+    facets: dict[str, list[dict[str, typing.Any]]] | None = None
+
+
+def get_model_cache_tag(model: typing.Type[Base]) -> str:
+    return model.__name__.lower()
+
+
+def get_entity_cache_tag(model: typing.Type[Base], entity_id: int) -> str:
+    return get_cache_key(get_model_cache_tag(model), id=entity_id)
+
 
 class CRUDService:
     model: typing.Type[M]
     schema_class: typing.Type[S]
+    # the schema of list items, when those differ from the retrieved entity
+    list_schema_class: typing.Optional[typing.Type[BaseModel]] = None
     create_schema_class: typing.Type[C]
     update_schema_class: typing.Type[U]
 
@@ -34,10 +71,25 @@ class CRUDService:
     use_custom_remove: bool = False
 
     list_pagination: bool = True
-    commit_before_after_create_hook: bool = True
+    list_cursor_pagination: bool = False
+    list_ordering: tuple[str, ...] = ("-id",)
+    list_sort_fields: tuple[str, ...] = ()
+    list_filter_params: tuple[str, ...] = ()
+    list_search_params: tuple[str, ...] = ()
+    list_count_mode: CountMode = "exact"
+    list_facets: tuple[str, ...] = ()
 
     use_cache: bool = False
+    use_local_cache: bool = False
     cache_exp: int = 60  # minutes
+    use_count_cache: bool = False
+    count_cache_exp: int = 30  # seconds
+    use_list_response_cache: bool = False
+    list_response_cache_exp: int = 30  # seconds
+    use_retrieve_cache: bool = False
+    retrieve_cache_exp: int = 10  # minutes
+    use_updated_at_validators: bool = False
+    facets_cache_exp: int = 60  # seconds
 
     create_model_dump_exclude: set[str] | None = None
 
@@ -46,6 +98,21 @@ class CRUDService:
     )
     not_found_error: HTTPException = HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not found.")
     create_entity_error: HTTPException = HTTPException(status_code=status.HTTP_400_BAD_REQUEST)
+    bulk_entities_error: HTTPException = HTTPException(
+        status_code=status.HTTP_400_BAD_REQUEST, detail="Bulk operation violates data constraints."
+    )
+    invalid_fields_error: HTTPException = HTTPException(
+        status_code=status.HTTP_400_BAD_REQUEST, detail="Unknown or empty fields requested."
+    )
+    invalid_facets_error: HTTPException = HTTPException(
+        status_code=status.HTTP_400_BAD_REQUEST, detail="Unknown or empty facets requested."
+    )
+    invalid_sort_error: HTTPException = HTTPException(
+        status_code=status.HTTP_400_BAD_REQUEST, detail="Unknown sort field."
+    )
+    invalid_count_mode_error: HTTPException = HTTPException(
+        status_code=status.HTTP_400_BAD_REQUEST, detail=f"Count mode must be one of: {', '.join(COUNT_MODES)}."
+    )
 
     def _get_cache_key(self, user: typing.Optional[User] = None) -> str:
         key = f"{self.model.__name__.lower()}"
@@ -55,12 +122,140 @@ class CRUDService:
 
         return key
 
-    async def _invalidate_cache(self, user: typing.Optional[User] = None) -> None:
-        key = self._get_cache_key(user)
-        await RedisCache.delete(key)
+    def _get_list_filters(self, query: dict, user: typing.Optional[User] = None) -> dict[str, str]:
+        filters = {param: query[param] for param in self.list_filter_params if query.get(param)}
+
+        sort_column = self._get_nullable_sort_column(query)
+        if sort_column is not None:
+            filters["sort"] = sort_column.key
+
+        if self.list_owner_only:
+            filters[self.user_field] = str(user.id)
+
+        return filters
+
+    def _get_count_cache_key(self, filters: dict[str, str]) -> str:
+        return get_cache_key(self.model.__name__.lower(), "count", **filters)
+
+    def get_list_query_params(self) -> tuple[str, ...]:
+        return *self.list_filter_params, "sort", "page", "cursor", "count", "fields", "facets"
+
+    def _get_list_cache_params(
+        self, query: dict, params: typing.Iterable[str], user: typing.Optional[User] = None
+    ) -> dict[str, typing.Any]:
+        cache_params = {}
+
+        for param in params:
+            value = query.get(param)
+            # an empty cursor still selects the first keyset page
+            if value is None or (not value.strip() and param != "cursor"):
+                continue
+
+            value = value.strip()
+            if param in self.list_search_params:
+                value = value.lower()
+            elif param == "fields":
+                value = ",".join(sorted(self.get_requested_fields(query)))
+            elif param == "facets":
+                value = ",".join(self.get_requested_facets(query))
+
+            cache_params[param] = quote(value, safe="")
+
+        if self.list_owner_only:
+            cache_params[self.user_field] = user.id
+
+        return cache_params
+
+    def _get_list_response_cache_key(self, query: dict, user: typing.Optional[User] = None) -> str:
+        params = self._get_list_cache_params(query, self.get_list_query_params(), user)
+        return get_cache_key(self.model.__name__.lower(), "list", **params)
+
+    def _get_facet_cache_key(self, facet: str, query: dict, user: typing.Optional[User] = None) -> str:
+        params = self._get_list_cache_params(query, (*self.list_filter_params, "sort"), user)
+        return get_cache_key(self.model.__name__.lower(), "facets", facet, **params)
+
+    @classmethod
+    def get_model_cache_tag(cls) -> str:
+        return get_model_cache_tag(cls.model)
+
+    @classmethod
+    def get_owner_cache_tag(cls, owner_id: int) -> str:
+        return get_cache_key(cls.get_model_cache_tag(), **{cls.user_field: owner_id})
+
+    def get_entity_cache_key(self, entity_id: int) -> str:
+        return get_cache_key(self.get_model_cache_tag(), "entity", str(entity_id))
+
+    def get_retrieve_cache_tags(self, entity_id: int) -> list[str]:
+        return [get_entity_cache_tag(self.model, entity_id)]
+
+    def _get_list_cache_tags(self, user: typing.Optional[User] = None) -> list[str]:
+        # owner-only lists are not invalidated by other users' writes
+        return [self.get_owner_cache_tag(user.id)] if self.list_owner_only else [self.get_model_cache_tag()]
+
+    async def get_invalidated_cache_tags(self, entities: typing.Iterable[M], session: AsyncSession) -> list[str]:  # noqa
+        tags = [self.get_model_cache_tag()]
+
+        if self.user_field:
+            tags += [self.get_owner_cache_tag(getattr(entity, self.user_field)) for entity in entities]
+        if self.use_retrieve_cache:
+            tags += [get_entity_cache_tag(self.model, entity.id) for entity in entities]
+
+        return tags
+
+    async def _invalidate_cache(self, entities: typing.Iterable[M], session: AsyncSession) -> None:
+        await RedisCache.invalidate_tags(*await self.get_invalidated_cache_tags(entities, session))
+
+    def get_requested_fields(self, query: typing.Optional[dict] = None) -> frozenset[str] | None:
+        if not query or "fields" not in query:
+            return None
+
+        fields = frozenset(field.strip() for field in query["fields"].split(",") if field.strip())
+        if not fields or not fields <= self.schema_class.model_fields.keys():
+            raise self.invalid_fields_error
+
+        return fields
+
+    def get_requested_facets(self, query: typing.Optional[dict] = None) -> tuple[str, ...]:
+        if not query or "facets" not in query:
+            return ()
+
+        facets = {facet.strip() for facet in query["facets"].split(",") if facet.strip()}
+        if not facets or not facets <= set(self.list_facets):
+            raise self.invalid_facets_error
+
+        return tuple(sorted(facets))
+
+    def get_response_schema_class(
+        self, fields: frozenset[str] | None = None, listing: bool = False
+    ) -> typing.Type[BaseModel]:
+        schema_class = (self.list_schema_class or self.schema_class) if listing else self.schema_class
+        return schema_class if fields is None else get_fields_subset_schema(schema_class, fields)
+
+    def get_response_serializer(
+        self, fields: frozenset[str] | None = None, listing: bool = False
+    ) -> ResponseSerializer:
+        return get_response_serializer(self.get_response_schema_class(fields, listing))
+
+    def get_entities_load_options(self, query: typing.Optional[dict] = None) -> list[LoaderOption]:  # noqa
+        return []
+
+    def _apply_requested_fields(self, stmt: Select, query: typing.Optional[dict] = None) -> Select:
+        fields = self.get_requested_fields(query)
+        if fields is None:
+            return stmt
+
+        # owner and ordering columns are always loaded for permission checks and cursors
+        names = {*fields, self.user_field, *(item.removeprefix("-") for item in self.get_list_ordering(query or {}))}
+        columns = [getattr(self.model, name) for name in names & set(self.model.__mapper__.column_attrs.keys())]
+
+        return stmt.options(load_only(*columns))
+
+    def get_entity_returning_load_options(self) -> list[LoaderOption]:  # noqa
+        # UPDATE ... RETURNING cannot join, so relationships of the response are selectin loaded
+        return []
 
     def get_entities_default_query(self, query: typing.Optional[dict] = None) -> Select:
-        return select(self.model).order_by(self.model.id.desc())
+        return select(self.model).options(*self.get_entities_load_options(query)).order_by(self.model.id.desc())
 
     async def get_entity_retrieve(self, query: Select, session: AsyncSession) -> M:
         result = await session.execute(query)
@@ -70,88 +265,383 @@ class CRUDService:
 
         return entity
 
-    async def _get_entities_list_actual_data(
-        self, session: AsyncSession, query: dict, user: typing.Optional[User] = None
-    ) -> tuple[list[M], int, int | None]:
+    def get_list_ordering(self, query: dict) -> tuple[str, ...]:
+        sort = query.get("sort", "").strip()
+        if not sort:
+            return self.list_ordering
+
+        if sort.removeprefix("-") not in self.list_sort_fields:
+            raise self.invalid_sort_error
+
+        return (sort,)
+
+    def get_list_ordering_fields(self, query: dict) -> list[OrderingField]:
+        return get_ordering_fields(self.model, self.get_list_ordering(query))
+
+    def _get_nullable_sort_column(self, query: dict) -> InstrumentedAttribute | None:
+        if not query.get("sort", "").strip():
+            return None
+
+        (field, *_) = self.get_list_ordering_fields(query)
+        return field.column if field.column.expression.nullable else None
+
+    def _get_entities_list_statement(self, query: dict, user: typing.Optional[User] = None) -> Select:
+        stmt = self._apply_requested_fields(self.get_entities_default_query(query), query)
+
+        if query.get("sort", "").strip():
+            # the id tie-breaker keeps the order stable and matches the (column, id) indexes
+            fields = self.get_list_ordering_fields(query)
+            stmt = stmt.order_by(None).order_by(*get_order_by_clauses(fields))
+
+        # keyset cursors cannot seek past NULLs, so rows without a sort value are left out of sorted lists
+        sort_column = self._get_nullable_sort_column(query)
+        if sort_column is not None:
+            stmt = stmt.where(sort_column.is_not(None))
+
         if self.list_owner_only:
-            stmt = (
-                self.get_entities_default_query(query).where(getattr(self.model, self.user_field) == user.id)  # noqa
-            )
-        else:
-            stmt = self.get_entities_default_query(query)
+            stmt = stmt.where(getattr(self.model, self.user_field) == user.id)  # noqa
+
+        return stmt
+
+    async def _get_page_entities(self, stmt: Select, query: dict, session: AsyncSession) -> list[M]:  # noqa
+        return list(await session.scalars(stmt))
+
+    async def _get_entities_cursor_page(
+        self, stmt: Select, query: dict, session: AsyncSession
+    ) -> tuple[list[M], str | None, str | None]:
+        fields = self.get_list_ordering_fields(query)
+        cursor = decode_cursor(query["cursor"], fields) if query["cursor"] else None
+        backwards = cursor is not None and cursor.direction == "prev"
+
+        stmt = stmt.order_by(None).order_by(*get_order_by_clauses(fields, reverse=backwards))
+        if cursor:
+            stmt = stmt.where(get_seek_predicate(fields, cursor.values, reverse=backwards))
+
+        entities = await self._get_page_entities(stmt.limit(settings.pagination_page_size + 1), query, session)
+        has_more = len(entities) > settings.pagination_page_size
+        entities = entities[: settings.pagination_page_size]
+
+        if backwards:
+            entities.reverse()
+
+        if not entities:
+            return entities, None, None
+
+        has_next, has_prev = (True, has_more) if backwards else (has_more, cursor is not None)
+        next_cursor = encode_cursor(entities[-1], fields, "next") if has_next else None
+        prev_cursor = encode_cursor(entities[0], fields, "prev") if has_prev else None
+
+        return entities, next_cursor, prev_cursor
+
+    def _get_count_mode(self, query: dict) -> CountMode:
+        count_mode = query.get("count", self.list_count_mode)
+        if count_mode not in COUNT_MODES:
+            raise self.invalid_count_mode_error
 
-        if self.list_pagination and query.get("page") and query["page"].isnumeric():
-            stmt = stmt.offset((int(query["page"]) - 1) * settings.pagination_page_size).limit(
+        return count_mode
+
+    async def _estimate_entities_count(self, session: AsyncSession) -> int | None:
+        # planner statistics, refreshed by autovacuum/ANALYZE; -1 means the table was never analyzed
+        stmt = text("SELECT reltuples::bigint FROM pg_class WHERE oid = CAST(:table_name AS regclass)")
+        estimate = await session.scalar(stmt, {"table_name": self.model.__tablename__})
+
+        return estimate if estimate is not None and estimate >= 0 else None
+
+    async def _count_entities(
+        self, stmt: Select, query: dict, session: AsyncSession, user: typing.Optional[User] = None
+    ) -> int | None:
+        count_mode = self._get_count_mode(query)
+        if count_mode == "none":
+            return None
+
+        filters = self._get_list_filters(query, user)
+        if count_mode == "estimate" and not filters:
+            estimate = await self._estimate_entities_count(session)
+            if estimate is not None:
+                return estimate
+
+        count_stmt = stmt.order_by(None).with_only_columns(func.count(self.model.id))
+        if not self.use_count_cache:
+            return await session.scalar(count_stmt)
+
+        return await RedisCache.get_or_set(
+            self._get_count_cache_key(filters),
+            lambda: session.scalar(count_stmt),
+            timedelta(seconds=self.count_cache_exp),
+            self._get_list_cache_tags(user),
+        )
+
+    async def _get_entities_list_actual_data(
+        self, session: AsyncSession, query: dict, user: typing.Optional[User] = None
+    ) -> EntitiesListData:
+        stmt = self._get_entities_list_statement(query, user)
+        next_cursor = prev_cursor = None
+
+        if self.list_cursor_pagination and "cursor" in query:
+            entities, next_cursor, prev_cursor = await self._get_entities_cursor_page(stmt, query, session)
+        elif self.list_pagination and query.get("page") and query["page"].isnumeric():
+            page_stmt = stmt.offset((int(query["page"]) - 1) * settings.pagination_page_size).limit(
                 settings.pagination_page_size
             )
+            entities = await self._get_page_entities(page_stmt, query, session)
+        else:
+            entities = await self._get_page_entities(stmt, query, session)
 
-        total = await session.scalar(func.count(self.model.id))
-        entities = list(await session.scalars(stmt))
+        total = await self._count_entities(stmt, query, session, user)
         pages = (
             (total + settings.pagination_page_size - 1) // settings.pagination_page_size
-            if self.list_pagination
+            if self.list_pagination and "cursor" not in query and total is not None
             else None
         )
 
-        await RedisCache.set(self._get_cache_key(user), entities, timedelta(minutes=self.cache_exp))
+        facets = await self._get_entities_facets(session, query, user)
+
+        return EntitiesListData(entities, total, pages, next_cursor, prev_cursor, facets)
 
-        return entities, total, pages
+    def get_facet_query(self, facet: str, query: dict) -> dict:  # noqa
+        return query
 
-    async def get_entities_list(
+    async def count_facet(self, facet: str, stmt: Select, session: AsyncSession) -> list[dict[str, typing.Any]]:
+        raise NotImplementedError
+
+    async def _get_entities_facets(
         self, session: AsyncSession, query: dict, user: typing.Optional[User] = None
-    ) -> dict[str, typing.Any]:
-        pages = None
+    ) -> dict[str, list[dict[str, typing.Any]]] | None:
+        facets = self.get_requested_facets(query)
+        if not facets:
+            return None
+
+        counts = {}
+        for facet in facets:
+            # one grouped query per facet over the ids of the filtered rows, shared by every page of a filter set
+            facet_query = self.get_facet_query(facet, query)
+            stmt = self._get_entities_list_statement(facet_query, user).order_by(None).with_only_columns(self.model.id)
+            counts[facet] = await RedisCache.get_or_set(
+                self._get_facet_cache_key(facet, facet_query, user),
+                functools.partial(self.count_facet, facet, stmt, session),
+                timedelta(seconds=self.facets_cache_exp),
+                self._get_list_cache_tags(user),
+            )
 
-        if not self.list_pagination and self.use_cache:
-            key = self._get_cache_key(user)
+        return counts
 
-            entities = await RedisCache.get(key)
+    async def get_entities_list(self, session: AsyncSession, query: dict, user: typing.Optional[User] = None) -> bytes:
+        if not self.list_pagination and self.use_cache and "fields" not in query:
 
-            if not entities:
-                entities, total, pages = await self._get_entities_list_actual_data(session, query, user)
-            else:
-                total = len(entities)
+            async def get_entities() -> list[dict[str, typing.Any]]:
+                data = await self._get_entities_list_actual_data(session, query, user)
+                return self.get_response_serializer(listing=True).dump_entities_python(data.entities)
 
+            entities = await RedisCache.get_or_set(
+                self._get_cache_key(user),
+                get_entities,
+                timedelta(minutes=self.cache_exp),
+                self._get_list_cache_tags(user),
+                local=self.use_local_cache,
+            )
+            data = EntitiesListData(entities, len(entities))
+        elif self.use_list_response_cache:
+            # whole responses of the same normalized query are shared, invalidated by the model or owner tag
+            return await RedisCache.get_or_set(
+                self._get_list_response_cache_key(query, user),
+                lambda: self._get_entities_list_response(session, query, user),
+                timedelta(seconds=self.list_response_cache_exp),
+                self._get_list_cache_tags(user),
+                local=self.use_local_cache,
+            )
         else:
-            entities, total, pages = await self._get_entities_list_actual_data(session, query, user)
+            data = await self._get_entities_list_actual_data(session, query, user)
 
-        return ListPaginatedResponse[self.schema_class](
-            items=[self.schema_class.model_validate(entity) for entity in entities], total=total, pages=pages
-        ).model_dump()
+        return self._dump_entities_list(data, query)
+
+    async def get_list_validators(
+        self, session: AsyncSession, query: dict, user: typing.Optional[User] = None
+    ) -> ResponseValidators | None:
+        if not self.use_updated_at_validators:
+            return None
+
+        # deletes and rows leaving the filters lower the count, every other write raises max(updated_at);
+        # a date alone misses the removals, so lists are only validated by the ETag
+        stmt = self._get_entities_list_statement(query, user).order_by(None)
+        stmt = stmt.with_only_columns(func.count(self.model.id), func.max(self.model.updated_at))
+        total, last_modified = (await session.execute(stmt)).one()
+
+        return ResponseValidators(get_etag(self._get_list_response_cache_key(query, user), total, last_modified))
+
+    async def _get_entities_list_response(
+        self, session: AsyncSession, query: dict, user: typing.Optional[User] = None
+    ) -> bytes:
+        return self._dump_entities_list(await self._get_entities_list_actual_data(session, query, user), query)
 
-    async def retrieve_entity(self, entity_id: int, session: AsyncSession, user: User) -> S:
-        entity = await self.get_entity_retrieve(
-            self.get_entities_default_query().filter(self.model.id == entity_id), session
+    def _dump_entities_list(self, data: EntitiesListData, query: dict) -> bytes:
+        return self.get_response_serializer(self.get_requested_fields(query), listing=True).dump_entities_list(
+            data.entities, data.total, data.pages, data.next_cursor, data.prev_cursor, data.facets
         )
+
+    async def retrieve_entity(
+        self, entity_id: int, session: AsyncSession, user: User, query: typing.Optional[dict] = None
+    ) -> bytes:
+        if self.use_retrieve_cache:
+            return await self._retrieve_cached_entity(entity_id, session, user, query)
+
+        stmt = self._apply_requested_fields(self.get_entities_default_query(query), query)
+        entity = await self.get_entity_retrieve(stmt.filter(self.model.id == entity_id), session)
         entity = self.check_permissions_to_retrieve_entity(entity, user)
 
-        return self.schema_class.model_validate(entity).model_dump()
+        return self.get_response_serializer(self.get_requested_fields(query)).dump_entity(entity)
+
+    async def get_entity_validators(
+        self, entity_id: int, session: AsyncSession, user: User, query: typing.Optional[dict] = None
+    ) -> ResponseValidators | None:
+        if not self.use_updated_at_validators:
+            return None
+
+        stmt = self.get_entities_default_query().where(self.model.id == entity_id).order_by(None)
+        stmt = stmt.with_only_columns(self.model.updated_at, getattr(self.model, self.user_field))
+        row = (await session.execute(stmt)).one_or_none()
+        if row is None:
+            return None
+
+        last_modified, owner_id = row
+        self.check_permissions_to_retrieve_owner(owner_id, user)
+        fields = self.get_requested_fields(query)
+
+        return ResponseValidators(get_etag(entity_id, last_modified, *sorted(fields or ())), last_modified)
+
+    async def _load_cached_entities(self, entity_ids: typing.Iterable[int], session: AsyncSession) -> dict[int, dict]:
+        # full responses are cached with their owner, sparse fieldsets are cut from them
+        stmt = self.get_entities_default_query().filter(self.model.id.in_(entity_ids))
+        serializer = self.get_response_serializer()
+
+        return {
+            entity.id: {
+                "owner": getattr(entity, self.user_field) if self.user_field else None,
+                "data": serializer.dump_entity_python(entity),
+            }
+            for entity in await session.scalars(stmt)
+        }
+
+    async def _load_cached_entity(self, entity_id: int, session: AsyncSession) -> dict:
+        cached = (await self._load_cached_entities([entity_id], session)).get(entity_id)
+        if cached is None:
+            raise self.not_found_error
 
-    def check_permissions_to_retrieve_entity(self, entity: M, user: User) -> M:
-        if self.retrieve_owner_only and user.role != UserRole.ADMIN and user.id != getattr(entity, self.user_field):
+        return cached
+
+    async def _retrieve_cached_entity(
+        self, entity_id: int, session: AsyncSession, user: User, query: typing.Optional[dict] = None
+    ) -> bytes:
+        fields = self.get_requested_fields(query)
+        cached = await RedisCache.get_or_set(
+            self.get_entity_cache_key(entity_id),
+            lambda: self._load_cached_entity(entity_id, session),
+            timedelta(minutes=self.retrieve_cache_exp),
+            self.get_retrieve_cache_tags(entity_id),
+        )
+        self.check_permissions_to_retrieve_owner(cached["owner"], user)
+
+        return orjson.dumps(self._get_cached_entity_fields(cached["data"], fields))
+
+    async def retrieve_entities(
+        self, entity_ids: typing.Iterable[int], session: AsyncSession, user: User, query: typing.Optional[dict] = None
+    ) -> bytes:
+        fields = self.get_requested_fields(query)
+        ids = {self.get_entity_cache_key(entity_id): entity_id for entity_id in dict.fromkeys(entity_ids)}
+
+        async def load(keys: list[str]) -> dict[str, dict]:
+            cached = await self._load_cached_entities([ids[key] for key in keys], session)
+            return {self.get_entity_cache_key(entity_id): value for entity_id, value in cached.items()}
+
+        if self.use_retrieve_cache:
+            tags = {key: self.get_retrieve_cache_tags(entity_id) for key, entity_id in ids.items()}
+            cached = await RedisCache.get_or_set_many(tags, load, timedelta(minutes=self.retrieve_cache_exp))
+        else:
+            cached = await load(list(ids))
+
+        # missing entities and the ones the user may not retrieve are left out
+        return orjson.dumps(
+            [
+                self._get_cached_entity_fields(cached[key]["data"], fields)
+                for key in ids
+                if key in cached and self.can_retrieve_owned_entity(cached[key]["owner"], user)
+            ]
+        )
+
+    @staticmethod
+    def _get_cached_entity_fields(data: dict, fields: frozenset[str] | None = None) -> dict:
+        return data if fields is None else {name: value for name, value in data.items() if name in fields}
+
+    def can_retrieve_owned_entity(self, owner_id: int | None, user: User) -> bool:
+        return not self.retrieve_owner_only or user.role == UserRole.ADMIN or user.id == owner_id
+
+    def check_permissions_to_retrieve_owner(self, owner_id: int | None, user: User) -> None:
+        if not self.can_retrieve_owned_entity(owner_id, user):
             raise self.permission_denied_error
 
+    def check_permissions_to_retrieve_entity(self, entity: M, user: User) -> M:
+        self.check_permissions_to_retrieve_owner(getattr(entity, self.user_field, None), user)
+
         return entity
 
-    async def create_entity(self, create_entity_data: C, session: AsyncSession, user: User) -> S:
+    async def create_entity(self, create_entity_data: C, session: AsyncSession, user: User) -> bytes:
         entity = self.model(**create_entity_data.model_dump(exclude=self.create_model_dump_exclude))
         entity = await self.before_entity_create(entity, create_entity_data, user, session)
         session.add(entity)
 
-        if self.commit_before_after_create_hook:
-            try:
-                await session.commit()
-            except IntegrityError:
-                await session.rollback()
-                raise self.create_entity_error
+        try:
+            # INSERT ... RETURNING fills the primary key, child rows join the same transaction
+            await session.flush()
+            entity = await self.after_entity_create(entity, create_entity_data, user, session)
+            await session.commit()
+        except IntegrityError:
+            await session.rollback()
+            raise self.create_entity_error
 
-        entity = await self.after_entity_create(entity, create_entity_data, user, session)
-        stmt = self.get_entities_default_query().where(self.model.id == entity.id)
-        await self._invalidate_cache(user)
-        entity = await session.scalar(stmt)
-        return self.schema_class.model_validate(entity).model_dump()
+        await self._invalidate_cache([entity], session)
+
+        return self.get_response_serializer().dump_entity(entity)
+
+    def _get_edit_entity_predicate(self, entity_id: int, user: User) -> ColumnElement[bool]:
+        predicate = self.model.id == entity_id
+
+        if user.role != UserRole.ADMIN:
+            predicate &= getattr(self.model, self.user_field) == user.id
+
+        return predicate
+
+    async def _raise_edit_entity_error(self, entity_id: int, session: AsyncSession) -> typing.NoReturn:
+        # only reached when the owner-checked statement matched no rows
+        await session.rollback()
+        exists = await session.scalar(select(self.model.id).where(self.model.id == entity_id))
+        raise self.permission_denied_error if exists else self.not_found_error
+
+    async def _update_owned_entity(self, entity_id: int, update_entity_data: U, session: AsyncSession, user: User) -> M:
+        await self.before_entity_update(None, update_entity_data, user, session)
+        await session.flush()
+
+        update_values = update_entity_data.model_dump(exclude_unset=True, exclude_none=True)
+        predicate = self._get_edit_entity_predicate(entity_id, user)
+
+        if update_values:
+            stmt = update(self.model).where(predicate).values(**update_values).returning(self.model)
+        else:
+            stmt = select(self.model).where(predicate)
+
+        stmt = stmt.options(*self.get_entity_returning_load_options())
+        entity = (await session.scalars(stmt, execution_options={"populate_existing": True})).one_or_none()
+        if entity is None:
+            await self._raise_edit_entity_error(entity_id, session)
+
+        await session.commit()
+        await self._invalidate_cache([entity], session)
+
+        return entity
+
+    async def update_entity(self, entity_id: int, update_entity_data: U, session: AsyncSession, user: User) -> bytes:
+        if self.admin_or_owner_to_edit and self.user_field:
+            entity = await self._update_owned_entity(entity_id, update_entity_data, session, user)
+            return self.get_response_serializer().dump_entity(entity)
 
-    async def update_entity(self, entity_id: int, update_entity_data: U, session: AsyncSession, user: User) -> S:
         entity = await self.get_entity_retrieve(select(self.model).filter(self.model.id == entity_id), session)
 
         entity = await self.check_permissions_to_edit_entity(entity, user, session)
@@ -162,26 +652,165 @@ class CRUDService:
         if update_values:
             await session.execute(update(self.model).where(self.model.id == entity_id).values(**update_values))
             await session.commit()
+            await self._invalidate_cache([entity], session)
 
         stmt = self.get_entities_default_query().where(self.model.id == entity.id)
         entity = await session.scalar(stmt)
 
-        return self.schema_class.model_validate(entity).model_dump()
+        return self.get_response_serializer().dump_entity(entity)
 
     async def remove_entity(self, entity_id: int, session: AsyncSession, user: User) -> None:
+        if self.admin_or_owner_to_edit and self.user_field and not self.use_custom_remove:
+            stmt = delete(self.model).where(self._get_edit_entity_predicate(entity_id, user)).returning(self.model)
+            entity = await session.scalar(stmt)
+            if entity is None:
+                await self._raise_edit_entity_error(entity_id, session)
+
+            await session.commit()
+            await self._invalidate_cache([entity], session)
+            return
+
         entity = await session.get(self.model, entity_id)
         if not entity:
             raise self.not_found_error
 
         entity = await self.check_permissions_to_edit_entity(entity, user, session)
 
-        await self._invalidate_cache(user)
-
         if self.use_custom_remove:
-            return await self.custom_remove(entity, session)
+            await self.custom_remove(entity, session)
+        else:
+            await session.delete(entity)
+            await session.commit()
 
-        await session.delete(entity)
-        await session.commit()
+        await self._invalidate_cache([entity], session)
+
+    @staticmethod
+    def _split_bulk_results(
+        indexes: typing.Iterable[int], results: typing.Iterable[M | HTTPException], status_code: int
+    ) -> tuple[list[BulkItemStatus], list[tuple[int, M]]]:
+        statuses, accepted = [], []
+
+        for index, result in zip(indexes, results):
+            if isinstance(result, HTTPException):
+                statuses.append(BulkItemStatus(index=index, status=result.status_code, detail=result.detail))
+            else:
+                accepted.append((index, result))
+                statuses.append(BulkItemStatus(index=index, status=status_code, id=result.id))
+
+        return statuses, accepted
+
+    async def bulk_create_entities(
+        self, create_entities_data: dict[int, C], session: AsyncSession, user: User
+    ) -> list[BulkItemStatus]:
+        create_entities = list(create_entities_data.values())
+        entities = [
+            self.model(**create_entity.model_dump(exclude=self.create_model_dump_exclude))
+            for create_entity in create_entities
+        ]
+        results = await self.before_entities_bulk_create(entities, create_entities, user, session)
+
+        accepted = [not isinstance(result, HTTPException) for result in results]
+        accepted_entities = [entity for entity, ok in zip(results, accepted) if ok]
+        accepted_create_entities = [create_entity for create_entity, ok in zip(create_entities, accepted) if ok]
+
+        if accepted_entities:
+            session.add_all(accepted_entities)
+
+            try:
+                # a single flush sends the rows as multi-row INSERT ... RETURNING id batches
+                await session.flush()
+                await self.after_entities_bulk_create(accepted_entities, accepted_create_entities, user, session)
+                await session.commit()
+            except IntegrityError:
+                await session.rollback()
+                raise self.create_entity_error
+
+            await self._invalidate_cache(accepted_entities, session)
+
+        statuses, _ = self._split_bulk_results(create_entities_data.keys(), results, status.HTTP_201_CREATED)
+        return statuses
+
+    async def bulk_update_entities(
+        self, update_entities_data: dict[int, tuple[int, U]], session: AsyncSession, user: User
+    ) -> list[BulkItemStatus]:
+        ids = {entity_id for entity_id, _ in update_entities_data.values()}
+        entities = {
+            entity.id: entity for entity in await session.scalars(select(self.model).where(self.model.id.in_(ids)))
+        }
+
+        checked = []
+        for entity_id, _ in update_entities_data.values():
+            try:
+                if entity_id not in entities:
+                    raise self.not_found_error
+
+                checked.append(await self.check_permissions_to_edit_entity(entities[entity_id], user, session))
+            except HTTPException as e:
+                checked.append(e)
+
+        update_entities = [update_entity for _, update_entity in update_entities_data.values()]
+        results = await self.before_entities_bulk_update(checked, update_entities, user, session)
+
+        update_values = []
+        for entity, update_entity in zip(results, update_entities):
+            values = update_entity.model_dump(exclude_unset=True, exclude_none=True)
+            if not isinstance(entity, HTTPException) and values:
+                update_values.append({"id": entity.id, **values})
+
+        if update_values:
+            try:
+                # executemany UPDATE ... WHERE id = :id, grouped by the set of updated columns
+                await session.execute(update(self.model), update_values)
+                await session.commit()
+            except IntegrityError:
+                await session.rollback()
+                raise self.bulk_entities_error
+
+            await self._invalidate_cache(
+                [entity for entity in results if not isinstance(entity, HTTPException)], session
+            )
+
+        statuses, _ = self._split_bulk_results(update_entities_data.keys(), results, status.HTTP_200_OK)
+        return statuses
+
+    async def bulk_remove_entities(
+        self, entities_ids: list[int], session: AsyncSession, user: User
+    ) -> list[BulkItemStatus]:
+        entities = {
+            entity.id: entity
+            for entity in await session.scalars(select(self.model).where(self.model.id.in_(set(entities_ids))))
+        }
+
+        results = []
+        for entity_id in entities_ids:
+            try:
+                if entity_id not in entities:
+                    raise self.not_found_error
+
+                results.append(await self.check_permissions_to_edit_entity(entities[entity_id], user, session))
+            except HTTPException as e:
+                results.append(e)
+
+        statuses, accepted = self._split_bulk_results(range(len(entities_ids)), results, status.HTTP_204_NO_CONTENT)
+
+        if accepted:
+            removed = list({entity.id: entity for _, entity in accepted}.values())
+
+            try:
+                if self.use_custom_remove:
+                    await self.bulk_custom_remove(removed, session)
+                else:
+                    await session.execute(
+                        delete(self.model).where(self.model.id.in_([entity.id for entity in removed]))
+                    )
+                    await session.commit()
+            except IntegrityError:
+                await session.rollback()
+                raise self.bulk_entities_error
+
+            await self._invalidate_cache(removed, session)
+
+        return statuses
 
     async def check_permissions_to_edit_entity(self, entity: M, user: User, session: AsyncSession) -> M:  # noqa
         if self.admin_or_owner_to_edit and user.role != UserRole.ADMIN and user.id != getattr(entity, self.user_field):
@@ -198,8 +827,50 @@ class CRUDService:
     async def after_entity_create(self, entity: M, create_entity: C, user: User, session: AsyncSession) -> M:
         return entity
 
-    async def before_entity_update(self, entity: M, update_entity: U, user: User, session: AsyncSession) -> M:  # noqa
+    async def before_entity_update(  # noqa
+        self, entity: typing.Optional[M], update_entity: U, user: User, session: AsyncSession
+    ) -> typing.Optional[M]:
         return entity
 
+    async def before_entities_bulk_create(
+        self, entities: list[M], create_entities: list[C], user: User, session: AsyncSession
+    ) -> list[M | HTTPException]:
+        results = []
+
+        for entity, create_entity in zip(entities, create_entities):
+            try:
+                results.append(await self.before_entity_create(entity, create_entity, user, session))
+            except HTTPException as e:
+                results.append(e)
+
+        return results
+
+    async def after_entities_bulk_create(
+        self, entities: list[M], create_entities: list[C], user: User, session: AsyncSession
+    ) -> list[M]:
+        return [
+            await self.after_entity_create(entity, create_entity, user, session)
+            for entity, create_entity in zip(entities, create_entities)
+        ]
+
+    async def before_entities_bulk_update(
+        self, entities: list[M | HTTPException], update_entities: list[U], user: User, session: AsyncSession
+    ) -> list[M | HTTPException]:
+        results = []
+
+        for entity, update_entity in zip(entities, update_entities):
+            try:
+                if isinstance(entity, HTTPException):
+                    raise entity
+
+                results.append(await self.before_entity_update(entity, update_entity, user, session))
+            except HTTPException as e:
+                results.append(e)
+
+        return results
+
     async def custom_remove(self, entity: M, session: AsyncSession) -> None:
         raise NotImplementedError()
+
+    async def bulk_custom_remove(self, entities: list[M], session: AsyncSession) -> None:
+        raise NotImplementedError()
@@ -1,48 +1,73 @@
+import typing
+from datetime import timedelta
+
 from fastapi import HTTPException, status
 from sqlalchemy import func, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from core.api.services import get_entity_cache_tag
 from core.api.users.sellers.schemas import SellerSchema
-from core.database.models import Book, Review, User
+from core.config import settings
+from core.database.models import Book, User
 from core.database.models.user import UserRole
+from core.redis import RedisCache, get_cache_key
 
+seller_not_found_error = HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Seller not found.")
+
+
+def get_seller_cache_key(seller_id: int) -> str:
+    return get_cache_key("seller", "profile", str(seller_id))
 
-async def get_seller_data(seller_id: int, session: AsyncSession) -> SellerSchema:
-    book_avg_subq = (
-        select(
-            Book.id.label("book_id"),
-            func.avg(Review.rating).label("book_avg_rating"),
-        )
-        .join(Review, Book.reviews)
-        .where(Book.seller_id == seller_id)
-        .group_by(Book.id)
-        .subquery("book_avg_subq")
-    )
 
+def get_seller_cache_tag(seller_id: int) -> str:
+    # invalidated by profile updates of the seller and by writes of their books and of reviews of those
+    return get_entity_cache_tag(User, seller_id)
+
+
+async def _load_sellers_data(seller_ids: typing.Iterable[int], session: AsyncSession) -> dict[int, dict]:
+    # one grouped query for all the sellers, the rating is kept on the user by the reviews trigger
     stmt = (
-        select(
-            User,
-            func.count(Book.id).label("books_count"),
-            func.avg(book_avg_subq.c.book_avg_rating).label("average_rating"),
-        )
+        select(User, func.count(Book.id).label("books_count"))
         .select_from(User)
         .outerjoin(Book, User.seller_books)
-        .outerjoin(book_avg_subq, Book.id == book_avg_subq.c.book_id)
-        .where(User.id == seller_id)
+        .where(User.id.in_(list(seller_ids)), User.role == UserRole.SELLER)
         .group_by(User.id)
     )
 
-    result = await session.execute(stmt)
-    row = result.mappings().first()
+    return {
+        user.id: SellerSchema.model_validate(
+            {**user.__dict__, "books_count": books_count, "average_rating": user.rating}
+        ).model_dump(mode="json")
+        for user, books_count in await session.execute(stmt)
+    }
 
-    if not row or row["User"].role != UserRole.SELLER:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Seller not found.")
 
-    seller = {
-        **row["User"].__dict__,
-        "registration_date": row["User"].registration_date,
-        "books_count": row["books_count"],
-        "average_rating": float(row["average_rating"]) if row["average_rating"] is not None else None,
-    }
+async def _load_seller_data(seller_id: int, session: AsyncSession) -> dict:
+    seller = (await _load_sellers_data([seller_id], session)).get(seller_id)
+    if seller is None:
+        raise seller_not_found_error
+
+    return seller
+
+
+async def get_seller_data(seller_id: int, session: AsyncSession) -> dict:
+    return await RedisCache.get_or_set(
+        get_seller_cache_key(seller_id),
+        lambda: _load_seller_data(seller_id, session),
+        timedelta(minutes=settings.seller_profile_cache_exp),
+        [get_seller_cache_tag(seller_id)],
+    )
+
+
+async def get_sellers_data(seller_ids: typing.Iterable[int], session: AsyncSession) -> list[dict]:
+    ids = {get_seller_cache_key(seller_id): seller_id for seller_id in dict.fromkeys(seller_ids)}
+
+    async def load(keys: list[str]) -> dict[str, dict]:
+        sellers = await _load_sellers_data([ids[key] for key in keys], session)
+        return {get_seller_cache_key(seller_id): seller for seller_id, seller in sellers.items()}
+
+    tags = {key: [get_seller_cache_tag(seller_id)] for key, seller_id in ids.items()}
+    sellers = await RedisCache.get_or_set_many(tags, load, timedelta(minutes=settings.seller_profile_cache_exp))
 
-    return SellerSchema.model_validate(seller).model_dump()
+    # in the order of the ids, unknown ids and users who are not sellers are left out
+    return [sellers[key] for key in ids if key in sellers]
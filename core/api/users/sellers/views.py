@@ -1,9 +1,12 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from fastapi.responses import ORJSONResponse
+from pydantic import PositiveInt, ValidationError
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from core.api.serializers import get_type_adapter
 from core.api.users.dependencies import check_user_role
-from core.api.users.sellers.services import get_seller_data
+from core.api.users.sellers.services import get_seller_data, get_sellers_data
+from core.config import settings
 from core.database import get_session
 from core.database.models import User
 from core.database.models.user import UserRole
@@ -11,6 +14,27 @@ from core.database.models.user import UserRole
 router = APIRouter(prefix="/sellers", tags=["Sellers API"])
 
 
+@router.get("/")
+async def get_sellers_info(
+    ids: str = Query(min_length=1, examples=["1,2,3"]),
+    session: AsyncSession = Depends(get_session),
+    user: User = Depends(check_user_role(UserRole.SELLER, UserRole.CUSTOMER)),  # noqa
+) -> ORJSONResponse:
+    try:
+        seller_ids = get_type_adapter(list[PositiveInt]).validate_python(ids.split(","))
+    except ValidationError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Expected comma separated seller ids")
+
+    # one listing page of sellers at most
+    if len(set(seller_ids)) > settings.pagination_page_size:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"No more than {settings.pagination_page_size} sellers per request are allowed",
+        )
+
+    return ORJSONResponse(await get_sellers_data(seller_ids, session))
+
+
 @router.get("/{seller_id}")
 async def get_seller_info(
     seller_id: int,
@@ -8,6 +8,7 @@ celery = Celery(
     broker=settings.celery_broker_url,
     backend=settings.celery_result_backend,
     broker_connection_retry_on_startup=True,
+    include=["core.api.book_images.tasks"],
 )
 
 
@@ -1,4 +1,5 @@
 from pathlib import Path
+from typing import Literal
 
 from pydantic_settings import BaseSettings
 
@@ -16,8 +17,28 @@ class Settings(BaseSettings):
 
     upload_book_images_dir: str = "uploads"
     upload_book_images_url: str = "/uploads"
+    upload_book_images_chunk_size: int = 1024 * 1024
+    upload_book_images_max_size: int = 10 * 1024 * 1024
+    book_image_thumbnail_size: tuple[int, int] = (240, 360)
+    book_image_large_size: tuple[int, int] = (1200, 1800)
+    book_image_jpeg_quality: int = 85
+    book_image_webp_quality: int = 80
 
     pagination_page_size: int = 50
+    bulk_max_items: int = 1000
+    books_json_read_path: bool = False
+
+    suggestions_limit: int = 10
+    suggestions_max_limit: int = 50
+    suggestions_rebuild_batch_size: int = 5000
+    suggestions_rebuild_lock_timeout: int = 600  # seconds
+
+    seller_profile_cache_exp: int = 10  # minutes
+    rating_histogram_cache_exp: int = 10  # minutes
+
+    book_cards_refresh_interval: float = 1  # seconds
+    book_cards_refresh_batch_size: int = 1000
+    book_cards_rebuild_batch_size: int = 5000
 
     celery_broker_url: str
     celery_result_backend: str
@@ -46,6 +67,15 @@ class Settings(BaseSettings):
 
     redis_url: str = "redis://localhost:6379/0"
     redis_cache_names_sep: str = ":"
+    cache_lock_timeout: int = 10  # seconds
+    cache_stale_ttl: int = 60  # seconds
+    cache_rebuild_poll_interval: float = 0.05  # seconds
+    cache_invalidation_channel: str = "cache:invalidate"
+    cache_codec: Literal["json", "msgpack"] = "json"
+    cache_compression: Literal["none", "zlib", "zstd", "lz4"] = "none"
+    cache_compression_threshold: int = 1024  # bytes
+    local_cache_max_entries: int = 1024
+    local_cache_ttl: int = 30  # seconds
 
     sentry_dsn: str
 
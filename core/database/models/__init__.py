@@ -1,6 +1,7 @@
 from core.database.models.address import Address
 from core.database.models.base import Base
 from core.database.models.book import Book
+from core.database.models.book_card import BookCard, BookCardRefresh
 from core.database.models.book_category import BookCategory
 from core.database.models.book_image import BookImage
 from core.database.models.category import Category
@@ -14,6 +15,8 @@ from core.database.models.user import User
 __all__ = [
     "Base",
     "Book",
+    "BookCard",
+    "BookCardRefresh",
     "Address",
     "BookImage",
     "BookCategory",
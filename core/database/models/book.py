@@ -3,16 +3,25 @@ from __future__ import annotations
 from datetime import UTC, datetime
 from typing import TYPE_CHECKING
 
-from sqlalchemy import ForeignKey, Numeric, String, Text, func
-from sqlalchemy.orm import Mapped, mapped_column, relationship
+from sqlalchemy import Computed, ForeignKey, Index, Integer, Numeric, String, Text, func
+from sqlalchemy.dialects.postgresql import ARRAY, TSVECTOR
+from sqlalchemy.orm import Mapped, mapped_column, query_expression, relationship
 
 from core.database.models.base import Base
+from core.database.models.rating import RATINGS, RatingAggregates
 
 if TYPE_CHECKING:
     from core.database.models import BookCategory, BookImage, OrderItem, Review, User
 
+BOOK_SEARCH_CONFIG = "english"
+BOOK_SEARCH_VECTOR = (
+    f"setweight(to_tsvector('{BOOK_SEARCH_CONFIG}', coalesce(title, '')), 'A') || "
+    f"setweight(to_tsvector('{BOOK_SEARCH_CONFIG}', coalesce(author, '')), 'B') || "
+    f"setweight(to_tsvector('{BOOK_SEARCH_CONFIG}', coalesce(description, '')), 'C')"
+)
 
-class Book(Base):
+
+class Book(Base, RatingAggregates):
     seller_id: Mapped[int] = mapped_column(ForeignKey("users.id"))
     title: Mapped[str] = mapped_column(String(200))
     author: Mapped[str] = mapped_column(String(100))
@@ -29,9 +38,26 @@ class Book(Base):
         server_onupdate=func.now(),
         onupdate=lambda: datetime.now(UTC).replace(tzinfo=None),
     )
+    search_vector: Mapped[str] = mapped_column(TSVECTOR, Computed(BOOK_SEARCH_VECTOR, persisted=True), deferred=True)
+    # reviews count per rating, kept by the update_rating_aggregates() trigger on reviews
+    rating_histogram: Mapped[list[int]] = mapped_column(
+        ARRAY(Integer), default=lambda: [0] * len(RATINGS), server_default="{0,0,0,0,0}", deferred=True
+    )
+    # the rank of a search result, loaded only with the results of a search for the cursors
+    search_rank: Mapped[float] = query_expression()
 
     seller: Mapped["User"] = relationship(back_populates="seller_books")
-    categories: Mapped[list["BookCategory"]] = relationship(back_populates="book")
+    categories: Mapped[list["BookCategory"]] = relationship(back_populates="book", passive_deletes=True)
     reviews: Mapped[list["Review"]] = relationship(back_populates="book")
     order_items: Mapped[list["OrderItem"]] = relationship(back_populates="book")
-    images: Mapped[list["BookImage"]] = relationship(back_populates="book")
+    images: Mapped[list["BookImage"]] = relationship(back_populates="book", passive_deletes=True)
+
+    __table_args__ = (
+        Index("ix_books_search_vector", search_vector, postgresql_using="gin"),
+        Index("ix_books_title_trgm", title, postgresql_using="gin", postgresql_ops={"title": "gin_trgm_ops"}),
+        Index("ix_books_author_trgm", author, postgresql_using="gin", postgresql_ops={"author": "gin_trgm_ops"}),
+        Index("ix_books_seller_id_id", seller_id, "id"),
+        Index("ix_books_price_id", price, "id"),
+        Index("ix_books_publication_year_id", publication_year, "id"),
+        Index("ix_books_created_at_id", created_at, "id"),
+    )
@@ -0,0 +1,53 @@
+from __future__ import annotations
+
+from datetime import datetime
+
+from sqlalchemy import ForeignKey, Index, Numeric, String, func
+from sqlalchemy.dialects.postgresql import ARRAY, TSVECTOR
+from sqlalchemy.orm import Mapped, mapped_column, query_expression
+
+from core.database.models.base import Base
+
+
+class BookCard(Base):
+    # a denormalized read model of the storefront listing, written only by the refresh_book_cards() database function
+    __tablename__ = "book_cards"
+
+    id: Mapped[int] = mapped_column(ForeignKey("books.id", ondelete="CASCADE"), primary_key=True)
+    seller_id: Mapped[int] = mapped_column()
+    title: Mapped[str] = mapped_column(String(200))
+    author: Mapped[str] = mapped_column(String(100))
+    price: Mapped[float] = mapped_column(Numeric(10, 2))
+    publication_year: Mapped[int] = mapped_column(nullable=True)
+    created_at: Mapped[datetime] = mapped_column()
+    updated_at: Mapped[datetime] = mapped_column()
+    search_vector: Mapped[str] = mapped_column(TSVECTOR, nullable=True, deferred=True)
+    seller_name: Mapped[str] = mapped_column(String(101))
+    main_image_url: Mapped[str] = mapped_column(String(255), nullable=True)
+    categories: Mapped[list[str]] = mapped_column(ARRAY(String(100)), server_default="{}")
+    category_slugs: Mapped[list[str]] = mapped_column(ARRAY(String(100)), server_default="{}", deferred=True)
+    rating: Mapped[float] = mapped_column(Numeric(3, 2), nullable=True)
+    rating_count: Mapped[int] = mapped_column(server_default="0")
+    refreshed_at: Mapped[datetime] = mapped_column(server_default=func.now())
+    search_rank: Mapped[float] = query_expression()
+
+    __table_args__ = (
+        Index("ix_book_cards_search_vector", search_vector, postgresql_using="gin"),
+        Index("ix_book_cards_title_trgm", title, postgresql_using="gin", postgresql_ops={"title": "gin_trgm_ops"}),
+        Index("ix_book_cards_author_trgm", author, postgresql_using="gin", postgresql_ops={"author": "gin_trgm_ops"}),
+        Index("ix_book_cards_category_slugs", category_slugs, postgresql_using="gin"),
+        Index("ix_book_cards_seller_id_id", seller_id, "id"),
+        Index("ix_book_cards_price_id", price, "id"),
+        Index("ix_book_cards_publication_year_id", publication_year, "id"),
+        Index("ix_book_cards_created_at_id", created_at, "id"),
+    )
+
+
+class BookCardRefresh(Base):
+    # the outbox of cards to rebuild, filled by triggers on every table a card is built from; id is the book id
+    __tablename__ = "book_card_refreshes"
+
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=False)
+    queued_at: Mapped[datetime] = mapped_column(server_default=func.now())
+
+    __table_args__ = (Index("ix_book_card_refreshes_queued_at", queued_at),)
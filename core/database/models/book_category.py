@@ -2,7 +2,7 @@ from __future__ import annotations
 
 from typing import TYPE_CHECKING
 
-from sqlalchemy import ForeignKey, UniqueConstraint
+from sqlalchemy import ForeignKey, Index, UniqueConstraint
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from core.database.models.base import Base
@@ -15,10 +15,13 @@ class BookCategory(Base):
     __tablename__ = "book_categories"
 
     id: Mapped[int] = mapped_column(primary_key=True, nullable=False, autoincrement=True)
-    book_id: Mapped[int] = mapped_column(ForeignKey("books.id"))
+    book_id: Mapped[int] = mapped_column(ForeignKey("books.id", ondelete="CASCADE"))
     category_id: Mapped[int] = mapped_column(ForeignKey("categories.id"))
 
     book: Mapped["Book"] = relationship(back_populates="categories")
     category: Mapped["Category"] = relationship(back_populates="books")
 
-    __table_args__ = (UniqueConstraint("category_id", "book_id", name="uix_book_category"),)
+    __table_args__ = (
+        UniqueConstraint("category_id", "book_id", name="uix_book_category"),
+        Index("ix_book_categories_book_id", "book_id", "category_id"),
+    )
@@ -2,7 +2,8 @@ from __future__ import annotations
 
 from typing import TYPE_CHECKING
 
-from sqlalchemy import ForeignKey, Index, String
+from sqlalchemy import ForeignKey, Index, String, Text
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from core.database.models.base import Base
@@ -14,10 +15,18 @@ if TYPE_CHECKING:
 class BookImage(Base):
     __tablename__ = "book_images"
 
-    book_id: Mapped[int] = mapped_column(ForeignKey("books.id"))
+    book_id: Mapped[int] = mapped_column(ForeignKey("books.id", ondelete="CASCADE"))
     url: Mapped[str] = mapped_column(String(255))
     is_main: Mapped[bool] = mapped_column(default=False)
+    # file names of the thumbnails and webp copies of the image, written by the variants task
+    variants: Mapped[dict[str, str]] = mapped_column(JSONB, default=dict, server_default="{}")
+    # why the variants task gave up on a file that cannot be decoded, kept out of the responses
+    variants_error: Mapped[str] = mapped_column(Text, nullable=True)
 
     book: Mapped["Book"] = relationship(back_populates="images")
 
-    __table_args__ = (Index("uq_book_main_image", book_id, unique=True, postgresql_where=(is_main == True)),)
+    __table_args__ = (
+        Index("uq_book_main_image", book_id, unique=True, postgresql_where=(is_main == True)),
+        # uploads are content addressed, the rows of one file are looked up by its name
+        Index("ix_book_images_url", url),
+    )
@@ -0,0 +1,20 @@
+from sqlalchemy import ColumnElement, Float, cast, func
+from sqlalchemy.ext.hybrid import hybrid_property
+from sqlalchemy.orm import Mapped, mapped_column
+
+RATINGS = range(1, 6)
+
+
+class RatingAggregates:
+    # kept by the update_rating_aggregates() trigger on reviews, of the book or of every book of the seller
+    rating_count: Mapped[int] = mapped_column(default=0, server_default="0")
+    rating_sum: Mapped[int] = mapped_column(default=0, server_default="0")
+
+    @hybrid_property
+    def rating(self) -> float | None:
+        return self.rating_sum / self.rating_count if self.rating_count else None
+
+    @rating.inplace.expression
+    @classmethod
+    def _rating_expression(cls) -> ColumnElement[float | None]:
+        return cast(cls.rating_sum, Float) / func.nullif(cls.rating_count, 0, type_=Float)
@@ -11,6 +11,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from core.database.models.base import Base
+from core.database.models.rating import RatingAggregates
 
 if TYPE_CHECKING:
     from core.database.models import Address, Book, Order, Review
@@ -22,7 +23,7 @@ class UserRole(str, Enum):
     CUSTOMER = "CUSTOMER"
 
 
-class User(Base, SQLAlchemyBaseUserTable[int]):
+class User(Base, SQLAlchemyBaseUserTable[int], RatingAggregates):
     first_name: Mapped[str] = mapped_column(String(50))
     last_name: Mapped[str] = mapped_column(String(50), nullable=True)
     phone: Mapped[str] = mapped_column(String(20))
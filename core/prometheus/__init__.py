@@ -1,5 +1,15 @@
-from prometheus_client import Counter, Histogram
+from prometheus_client import Counter, Gauge, Histogram
 
 REQUEST_COUNT = Counter("fastapi_request_count", "Total number of requests", ["method", "endpoint", "http_status"])
 
 REQUEST_LATENCY = Histogram("fastapi_request_latency_seconds", "Request latency in seconds", ["method", "endpoint"])
+
+LOCAL_CACHE_HITS = Counter("local_cache_hits", "In-process cache hits", ["namespace"])
+
+LOCAL_CACHE_MISSES = Counter("local_cache_misses", "In-process cache misses", ["namespace"])
+
+LOCAL_CACHE_EVICTIONS = Counter("local_cache_evictions", "In-process cache evictions", ["namespace", "reason"])
+
+BOOK_CARDS_PENDING_REFRESHES = Gauge("book_cards_pending_refreshes", "Book cards queued for a refresh")
+
+BOOK_CARDS_STALENESS = Gauge("book_cards_staleness_seconds", "Age of the oldest queued book card refresh")
@@ -1,29 +1,223 @@
-import json
+import asyncio
+import struct
+import time
+import uuid
 from datetime import timedelta
-from typing import Any, Optional
+from typing import Any, Awaitable, Callable, Optional, Sequence
 
+import orjson
 from fastapi.encoders import jsonable_encoder
 from redis.asyncio import Redis
+from redis.exceptions import ConnectionError, WatchError
 
 from core.config import settings
+from core.redis.codecs import CacheCodec, CacheFormatError
+from core.redis.local import LocalCache
 
-redis = Redis.from_url(settings.redis_url, decode_responses=True)
+redis = Redis.from_url(settings.redis_url)
+codec = CacheCodec(settings.cache_codec, settings.cache_compression, settings.cache_compression_threshold)
+local_cache = LocalCache(settings.local_cache_max_entries, settings.local_cache_ttl, settings.redis_cache_names_sep)
+
+
+def get_cache_key(*parts: str, **params: Any) -> str:  # noqa
+    sep = settings.redis_cache_names_sep
+    return sep.join([*parts, *(f"{name}={value}" for name, value in sorted(params.items()))])
+
+
+def _get_tag_version_key(tag: str) -> str:
+    return get_cache_key("tag", tag)
+
+
+def _get_lock_key(key: str) -> str:
+    return get_cache_key("lock", key)
+
+
+# entry: size of the metadata, metadata (tag versions and expiry) and the value, each encoded by the codec
+ENTRY_META_SIZE = struct.Struct(">I")
+
+
+def _decode(data: Optional[bytes]) -> Optional[Any]:  # noqa
+    try:
+        return codec.decode(data) if data else None
+    except CacheFormatError:
+        return None
+
+
+def _encode_entry(value: Any, versions: list[int], expires_at: float) -> bytes:  # noqa
+    meta = codec.encode({"t": versions, "e": expires_at})
+    return ENTRY_META_SIZE.pack(len(meta)) + meta + codec.encode(value)
+
+
+def _decode_entry(data: Optional[bytes]) -> Optional[dict]:
+    if not data or len(data) < ENTRY_META_SIZE.size:
+        return None
+
+    (size,) = ENTRY_META_SIZE.unpack_from(data)
+    meta = _decode(data[ENTRY_META_SIZE.size : ENTRY_META_SIZE.size + size])
+    if not isinstance(meta, dict) or "t" not in meta:
+        return None
+
+    value = data[ENTRY_META_SIZE.size + size :]
+    try:
+        return {**meta, "v": codec.decode(value)}
+    except CacheFormatError:
+        return None
 
 
 class RedisCache:
     @staticmethod
     async def get(key: str) -> Optional[Any]:
-        data = await redis.get(key)
-        return json.loads(data) if data else None
+        return _decode(await redis.get(key))
 
     @staticmethod
     async def set(key: str, value: Any, expire: Optional[timedelta] = None) -> None:
-        json_value = json.dumps(jsonable_encoder(value))
-        if expire:
-            await redis.setex(key, expire, json_value)
-        else:
-            await redis.set(key, json_value)
+        await redis.set(key, codec.encode(jsonable_encoder(value)), ex=expire)
 
     @staticmethod
     async def delete(key: str) -> None:
         await redis.delete(key)
+
+    @staticmethod
+    async def invalidate_tags(*tags: str) -> None:
+        tags = list(dict.fromkeys(tags))
+        local_cache.invalidate_tags(tags)
+
+        # entries are never deleted on writes, bumping the generation makes every entry built before stale
+        async with redis.pipeline(transaction=False) as pipe:
+            for tag in tags:
+                pipe.incr(_get_tag_version_key(tag))
+            pipe.publish(settings.cache_invalidation_channel, orjson.dumps(tags))
+            await pipe.execute()
+
+    @staticmethod
+    async def _get_entry(key: str, tags: Sequence[str]) -> tuple[Optional[dict], bool, list[int]]:
+        data, lock, *versions = await redis.mget(key, _get_lock_key(key), *map(_get_tag_version_key, tags))
+        entry = _decode_entry(data)
+
+        return entry, lock is not None, [int(version or 0) for version in versions]
+
+    @staticmethod
+    async def _set_entry(key: str, value: Any, versions: list[int], expire: timedelta) -> None:  # noqa
+        entry = _encode_entry(value, versions, time.time() + expire.total_seconds())
+        await redis.set(key, entry, ex=expire + timedelta(seconds=settings.cache_stale_ttl))
+
+    @staticmethod
+    async def get_or_set_many(
+        keys: dict[str, Sequence[str]],
+        loader: Callable[[list[str]], Awaitable[dict[str, Any]]],
+        expire: timedelta,
+    ) -> dict[str, Any]:
+        # entries and the versions of all their tags are read by one MGET, the misses are loaded together
+        tags = list(dict.fromkeys(tag for key_tags in keys.values() for tag in key_tags))
+        data = await redis.mget(*keys, *map(_get_tag_version_key, tags))
+        tag_versions = dict(zip(tags, (int(version or 0) for version in data[len(keys) :])))
+
+        values, missing = {}, {}
+        for key, entry in zip(keys, map(_decode_entry, data)):
+            versions = [tag_versions[tag] for tag in keys[key]]
+            if entry is not None and entry["t"] == versions and entry["e"] > time.time():
+                values[key] = entry["v"]
+            else:
+                missing[key] = versions
+
+        if not missing:
+            return values
+
+        loaded = await loader(list(missing))
+        expires_at = time.time() + expire.total_seconds()
+        async with redis.pipeline(transaction=False) as pipe:
+            for key, value in loaded.items():
+                entry = _encode_entry(value, missing[key], expires_at)
+                pipe.set(key, entry, ex=expire + timedelta(seconds=settings.cache_stale_ttl))
+            await pipe.execute()
+
+        return {**values, **loaded}
+
+    @staticmethod
+    async def _release_lock(lock_key: str, token: str) -> None:
+        async with redis.pipeline() as pipe:
+            try:
+                await pipe.watch(lock_key)
+                if await pipe.get(lock_key) == token.encode():
+                    pipe.multi()
+                    pipe.delete(lock_key)
+                    await pipe.execute()
+            except WatchError:
+                pass
+
+    @staticmethod
+    async def get_or_set(
+        key: str,
+        loader: Callable[[], Awaitable[Any]],
+        expire: timedelta,
+        tags: Sequence[str] = (),
+        local: bool = False,
+    ) -> Any:  # noqa
+        if not local:
+            return await RedisCache._get_or_set(key, loader, expire, tags)
+
+        local_entry = local_cache.get(key)
+        if local_entry is not None:
+            return local_entry.value
+
+        generation = local_cache.generation
+        value = await RedisCache._get_or_set(key, loader, expire, tags)
+        local_cache.set(key, value, tags, expire.total_seconds(), generation)
+
+        return value
+
+    @staticmethod
+    async def _get_or_set(
+        key: str, loader: Callable[[], Awaitable[Any]], expire: timedelta, tags: Sequence[str] = ()
+    ) -> Any:  # noqa
+        entry, _, versions = await RedisCache._get_entry(key, tags)
+        if entry is not None and entry["t"] == versions and entry["e"] > time.time():
+            return entry["v"]
+
+        # single flight: only the lock holder rebuilds the entry, cluster-wide
+        lock_key, token = _get_lock_key(key), uuid.uuid4().hex
+        if await redis.set(lock_key, token, nx=True, ex=settings.cache_lock_timeout):
+            try:
+                # versions are read before the query, so a write during the rebuild leaves the entry stale
+                # loaders return plain data, the lock holder returns what the other workers decode from the entry
+                value = await loader()
+                await RedisCache._set_entry(key, value, versions, expire)
+                return value
+            finally:
+                await RedisCache._release_lock(lock_key, token)
+
+        # stale while revalidate: an expired entry of the current generation is served during the rebuild,
+        # an entry invalidated by a write is not
+        if entry is not None and entry["t"] == versions:
+            return entry["v"]
+
+        deadline = time.monotonic() + settings.cache_lock_timeout
+        while time.monotonic() < deadline:
+            await asyncio.sleep(settings.cache_rebuild_poll_interval)
+            entry, locked, versions = await RedisCache._get_entry(key, tags)
+
+            if entry is not None and entry["t"] == versions:
+                return entry["v"]
+            if not locked:
+                break
+
+        return await loader()
+
+
+async def listen_cache_invalidations() -> None:
+    # keeps the in-process tier of this worker in sync with writes made by other workers and nodes
+    while True:
+        try:
+            async with redis.pubsub() as pubsub:
+                await pubsub.subscribe(settings.cache_invalidation_channel)
+                local_cache.active = True
+
+                async for message in pubsub.listen():
+                    if message["type"] == "message":
+                        local_cache.invalidate_tags(orjson.loads(message["data"]))
+        except ConnectionError:
+            await asyncio.sleep(1)
+        finally:
+            # messages may have been missed while disconnected
+            local_cache.active = False
+            local_cache.clear()
@@ -0,0 +1,96 @@
+import functools
+import zlib
+from typing import Any, Callable, NamedTuple
+
+import orjson
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover
+    msgpack = None
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover
+    zstandard = None
+
+try:
+    import lz4.frame
+except ImportError:  # pragma: no cover
+    lz4 = None
+
+# never the first byte of the plain JSON entries written before the header was introduced
+HEADER_MAGIC = 0xC1
+FORMAT_VERSION = 1
+HEADER_SIZE = 4
+
+
+class CacheFormatError(ValueError):
+    pass
+
+
+class Codec(NamedTuple):
+    id: int
+    dumps: Callable[[Any], bytes]
+    loads: Callable[[bytes], Any]
+
+
+def _identity(data: bytes) -> bytes:
+    return data
+
+
+# bytes values, e.g. ready-to-send responses, are stored as they are
+RAW = Codec(0, _identity, _identity)
+
+CODECS: dict[str, Codec] = {"json": Codec(1, orjson.dumps, orjson.loads)}
+COMPRESSIONS: dict[str, Codec] = {
+    "none": Codec(0, _identity, _identity),
+    "zlib": Codec(1, zlib.compress, zlib.decompress),
+}
+
+if msgpack is not None:
+    CODECS["msgpack"] = Codec(2, msgpack.packb, functools.partial(msgpack.unpackb, raw=False))
+
+if zstandard is not None:
+    COMPRESSIONS["zstd"] = Codec(2, zstandard.ZstdCompressor().compress, zstandard.ZstdDecompressor().decompress)
+
+if lz4 is not None:
+    COMPRESSIONS["lz4"] = Codec(3, lz4.frame.compress, lz4.frame.decompress)
+
+
+class CacheCodec:
+    def __init__(self, codec: str = "json", compression: str = "none", compression_threshold: int = 1024):
+        if codec not in CODECS or compression not in COMPRESSIONS:
+            raise CacheFormatError(f"Cache codec {codec!r} or compression {compression!r} is not available")
+
+        self.codec = CODECS[codec]
+        self.compression = COMPRESSIONS[compression]
+        self.compression_threshold = compression_threshold
+
+        # every known format stays readable, so workers with different settings can share entries
+        self._codecs = {codec.id: codec for codec in (RAW, *CODECS.values())}
+        self._compressions = {compression.id: compression for compression in COMPRESSIONS.values()}
+
+    def encode(self, value: Any) -> bytes:  # noqa
+        codec = RAW if isinstance(value, bytes) else self.codec
+        data = codec.dumps(value)
+        compression = self.compression if len(data) >= self.compression_threshold else COMPRESSIONS["none"]
+
+        return bytes((HEADER_MAGIC, FORMAT_VERSION, codec.id, compression.id)) + compression.dumps(data)
+
+    def decode(self, data: bytes) -> Any:  # noqa
+        if data[:1] != bytes((HEADER_MAGIC,)):
+            codec, compression = CODECS["json"], COMPRESSIONS["none"]
+        elif len(data) >= HEADER_SIZE and data[1] == FORMAT_VERSION:
+            codec, compression = self._codecs.get(data[2]), self._compressions.get(data[3])
+            data = data[HEADER_SIZE:]
+        else:
+            codec = compression = None
+
+        if codec is None or compression is None:
+            raise CacheFormatError("Unknown cache entry format")
+
+        try:
+            return codec.loads(compression.loads(data))
+        except Exception as e:
+            raise CacheFormatError("Corrupted cache entry") from e
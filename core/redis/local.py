@@ -0,0 +1,83 @@
+import time
+from collections import OrderedDict
+from typing import Any, Iterable, NamedTuple, Optional
+
+from core.prometheus import LOCAL_CACHE_EVICTIONS, LOCAL_CACHE_HITS, LOCAL_CACHE_MISSES
+
+
+class LocalCacheEntry(NamedTuple):
+    value: Any
+    tags: tuple[str, ...]
+    expires_at: float
+
+
+class LocalCache:
+    def __init__(self, max_entries: int, ttl: float, names_sep: str):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.names_sep = names_sep
+        # entries are only served while invalidation messages are being received
+        self.active = False
+        self.generation = 0
+
+        self._entries: OrderedDict[str, LocalCacheEntry] = OrderedDict()
+        self._tags: dict[str, set[str]] = {}
+
+    def _get_namespace(self, key: str) -> str:
+        return key.split(self.names_sep, 1)[0]
+
+    def _remove(self, key: str, reason: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+
+        for tag in entry.tags:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+
+        LOCAL_CACHE_EVICTIONS.labels(self._get_namespace(key), reason).inc()
+
+    def get(self, key: str) -> Optional[LocalCacheEntry]:
+        entry = self._entries.get(key) if self.active else None
+
+        if entry is not None and entry.expires_at <= time.monotonic():
+            self._remove(key, "expired")
+            entry = None
+
+        if entry is None:
+            LOCAL_CACHE_MISSES.labels(self._get_namespace(key)).inc()
+            return None
+
+        self._entries.move_to_end(key)
+        LOCAL_CACHE_HITS.labels(self._get_namespace(key)).inc()
+        return entry
+
+    def set(self, key: str, value: Any, tags: Iterable[str], ttl: float, generation: int) -> None:  # noqa
+        # an invalidation received while the value was being read may already cover it
+        if not self.active or generation != self.generation:
+            return
+
+        self._remove(key, "replaced")
+        entry = LocalCacheEntry(value, tuple(tags), time.monotonic() + min(ttl, self.ttl))
+        self._entries[key] = entry
+        for tag in entry.tags:
+            self._tags.setdefault(tag, set()).add(key)
+
+        while len(self._entries) > self.max_entries:
+            self._remove(next(iter(self._entries)), "size")
+
+    def invalidate_tags(self, tags: Iterable[str]) -> None:
+        self.generation += 1
+
+        for tag in tags:
+            for key in list(self._tags.get(tag, ())):
+                self._remove(key, "invalidated")
+
+    def clear(self) -> None:
+        self.generation += 1
+
+        for key in list(self._entries):
+            self._remove(key, "invalidated")
@@ -1,3 +1,7 @@
+import asyncio
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+
 import sentry_sdk
 import uvicorn
 from fastapi import FastAPI
@@ -7,15 +11,30 @@ from prometheus_client import make_asgi_app
 from sentry_sdk.integrations.asgi import SentryAsgiMiddleware
 
 from core.api import router
+from core.api.books.cards import process_book_card_refreshes
+from core.api.books.suggestions import build_suggestions
 from core.config import settings
 from core.middleware.metrics import metrics
+from core.redis import listen_cache_invalidations
 
 sentry_sdk.init(
     dsn=settings.sentry_dsn,
     traces_sample_rate=1.0,
 )
 
-app = FastAPI()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:  # noqa
+    cache_invalidations_task = asyncio.create_task(listen_cache_invalidations())
+    suggestions_task = asyncio.create_task(build_suggestions())
+    book_cards_task = asyncio.create_task(process_book_card_refreshes())
+    yield
+    cache_invalidations_task.cancel()
+    suggestions_task.cancel()
+    book_cards_task.cancel()
+
+
+app = FastAPI(lifespan=lifespan)
 app.include_router(router)
 
 app.add_middleware(SentryAsgiMiddleware)  # noqa
@@ -44,3 +44,9 @@ async def customer(user_factory: typing.Type[UserFactory]):
 async def seller(user_factory: typing.Type[UserFactory]):
     async with AsyncClient(base_url=settings.test_base_app_url) as client:
         yield await client_factory(client, user_factory, role=UserRole.SELLER)
+
+
+@pytest.fixture
+async def other_seller(user_factory: typing.Type[UserFactory]) -> typing.AsyncIterator[AsyncClient]:
+    async with AsyncClient(base_url=settings.test_base_app_url) as client:
+        yield await client_factory(client, user_factory, role=UserRole.SELLER)
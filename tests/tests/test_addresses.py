@@ -1,6 +1,7 @@
 from typing import Any, Optional
 
 import pytest
+from httpx import AsyncClient
 
 from core.api.addresses.schemas import AddressCreateSchema, AddressUpdateSchema
 from core.database.models import Address
@@ -30,3 +31,20 @@ class TestAddressCRUD(CRUDTest):
     @pytest.fixture
     def sample_update_data(self):
         return {"street": "Shibuya", "house": "683A", "is_primary": False}
+
+    @pytest.mark.asyncio
+    async def test_list_items_after_update_and_delete(self, seller: AsyncClient, customer: AsyncClient) -> None:
+        response, _ = await self.create_entity(seller, customer)
+        item_id = response.json()["id"]
+
+        # warms the cached list
+        response = await customer.get(self.endpoint)
+        assert item_id in [item["id"] for item in self.check_response_status(response)["items"]]
+
+        await customer.patch(f"{self.endpoint}{item_id}", json={"street": "Ginza"})
+        items = self.check_response_status(await customer.get(self.endpoint))["items"]
+        assert next(item for item in items if item["id"] == item_id)["street"] == "Ginza"
+
+        await customer.delete(f"{self.endpoint}{item_id}")
+        items = self.check_response_status(await customer.get(self.endpoint))["items"]
+        assert item_id not in [item["id"] for item in items]
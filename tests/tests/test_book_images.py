@@ -0,0 +1,181 @@
+import asyncio
+import hashlib
+import io
+import threading
+from pathlib import Path
+
+import orjson
+import pytest
+from fastapi import HTTPException, UploadFile, status
+from httpx import AsyncClient
+from PIL import Image
+from sqlalchemy import select
+
+from core.api.book_images import services
+from core.api.book_images.tasks import create_book_image_variants_task
+from core.api.book_images.variants import create_image_variants, get_images_without_variants, save_book_image_variants
+from core.api.books.services import BooksCRUDService
+from core.config import settings
+from core.database import engine, session
+from core.database.models import BookImage
+from core.redis import redis
+
+
+@pytest.mark.asyncio
+async def test_book_image_uploads(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(services, "UPLOAD_DIR", tmp_path)
+    monkeypatch.setattr(settings, "upload_book_images_chunk_size", 1000)
+    queued = []
+    monkeypatch.setattr(
+        services.create_book_image_variants_task,
+        "apply_async",
+        lambda args, **kwargs: queued.append((args, threading.get_ident())),
+    )
+    content = b"image" * 1000
+    digest = hashlib.sha256(content).hexdigest()
+
+    async with session() as db:
+        images = [
+            await services.save_uploaded_book_image(UploadFile(io.BytesIO(content), filename=name), 1, False, db)
+            for name in ("cover.JPG", "back.jpg")
+        ]
+        # the same image is stored once, and only after the commit
+        assert images[0].url == images[1].url == f"{digest[:2]}/{digest[2:4]}/{digest}.jpg"
+        assert not (tmp_path / images[0].url).exists()
+        await db.commit()
+    assert (tmp_path / images[0].url).read_bytes() == content
+    assert not any((tmp_path / ".tmp").iterdir())
+
+    # the variants are queued once per file, off the event loop
+    for _ in range(50):
+        if queued:
+            break
+        await asyncio.sleep(0.01)
+    assert queued == [((images[0].url,), queued[0][1])]
+    assert queued[0][1] != threading.get_ident()
+
+    async with session() as db:
+        # only a plain extension is kept from the client file name
+        file = UploadFile(io.BytesIO(b"other"), filename="../../cover.p?g")
+        image = await services.save_uploaded_book_image(file, 1, False, db)
+        digest = hashlib.sha256(b"other").hexdigest()
+        assert image.url == f"{digest[:2]}/{digest[2:4]}/{digest}"
+        await db.rollback()
+    assert not (tmp_path / image.url).exists()
+    assert not any((tmp_path / ".tmp").iterdir())
+
+    monkeypatch.setattr(settings, "upload_book_images_max_size", len(content) - 1)
+    async with session() as db:
+        with pytest.raises(HTTPException) as error:
+            await services.save_uploaded_book_image(UploadFile(io.BytesIO(content), filename="cover.jpg"), 1, False, db)
+    assert error.value.status_code == status.HTTP_413_CONTENT_TOO_LARGE
+    assert not any((tmp_path / ".tmp").iterdir())
+
+    await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_book_image_variants(tmp_path: Path, monkeypatch: pytest.MonkeyPatch, seller: AsyncClient) -> None:
+    monkeypatch.setattr(services, "UPLOAD_DIR", tmp_path)
+    content = io.BytesIO()
+    Image.new("RGBA", (900, 600), (200, 30, 30, 255)).save(content, "PNG")
+
+    book_ids = []
+    for _ in range(2):
+        response = await seller.post(
+            "/api/books/", json={"title": "Margin", "author": "Me", "price": 30, "categories": []}
+        )
+        book_ids.append(response.json()["id"])
+
+    async with session() as db:
+        images = []
+        for book_id in book_ids:
+            file = UploadFile(io.BytesIO(content.getvalue()), filename="cover.png")
+            images.append(await services.save_uploaded_book_image(file, book_id, True, db))
+        db.add_all(images)
+        await db.commit()
+
+        # one file of both books gets one set of variants
+        (filename,) = {image.url for image in images}
+        variants = await asyncio.to_thread(create_image_variants, tmp_path, filename)
+        assert await save_book_image_variants(filename, variants, db) == 2
+        assert await save_book_image_variants(filename, variants, db) == 0
+    await engine.dispose()
+    await redis.connection_pool.disconnect()
+
+    with Image.open(tmp_path / variants["thumbnail"]) as image:
+        assert (image.format, image.size) == ("JPEG", settings.book_image_thumbnail_size)
+    with Image.open(tmp_path / variants["thumbnail_webp"]) as image:
+        assert (image.format, image.size) == ("WEBP", settings.book_image_thumbnail_size)
+    with Image.open(tmp_path / variants["large_webp"]) as image:
+        assert (image.format, image.size) == ("WEBP", (900, 600))
+
+    response = await seller.get(f"/api/books/{book_ids[0]}")
+    (image,) = response.json()["images"]
+    assert (image["url"], image["variants"]) == (filename, variants)
+    seller_id = response.json()["seller"]["id"]
+
+    # lists link the thumbnail instead of the original, through both read paths
+    response = await seller.get("/api/books/", params={"seller_id": seller_id, "page": 1})
+    assert [image["url"] for book in response.json()["items"] for image in book["images"]] == [
+        variants["thumbnail"]
+    ] * 2
+    async with session() as db:
+        for use_json_read_path in (False, True):
+            service = BooksCRUDService()
+            service.use_json_read_path = use_json_read_path
+            query = {"seller_id": str(seller_id), "page": "1", "count": "none"}
+            items = orjson.loads(await service._get_entities_list_response(db, query))["items"]
+            assert [(image["url"], image["variants"]) for book in items for image in book["images"]] == [
+                (variants["thumbnail"], variants)
+            ] * 2
+    await engine.dispose()
+
+    # the storefront listing links the thumbnail, once the app has refreshed the card
+    params = {"seller_id": seller_id, "cursor": ""}
+    for _ in range(50):
+        cards = (await seller.get("/api/books/cards/", params=params)).json()["items"]
+        if {card["main_image_url"] for card in cards} == {variants["thumbnail"]}:
+            break
+        await asyncio.sleep(settings.book_cards_refresh_interval / 5)
+    assert [card["main_image_url"] for card in cards] == [variants["thumbnail"]] * 2
+
+
+@pytest.mark.asyncio
+async def test_undecodable_book_image_variants(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch, seller: AsyncClient
+) -> None:
+    monkeypatch.setattr(services, "UPLOAD_DIR", tmp_path)
+    monkeypatch.setattr(settings, "upload_book_images_dir", str(tmp_path))
+    response = await seller.post("/api/books/", json={"title": "Margin", "author": "Me", "price": 30, "categories": []})
+    book_id, seller_id = response.json()["id"], response.json()["seller"]["id"]
+
+    async with session() as db:
+        file = UploadFile(io.BytesIO(b"not an image"), filename="cover.png")
+        image = await services.save_uploaded_book_image(file, book_id, True, db)
+        db.add(image)
+        await db.commit()
+        filename = image.url
+    await engine.dispose()
+    await redis.connection_pool.disconnect()
+
+    # the task runs its own event loop, as in a worker
+    await asyncio.to_thread(create_book_image_variants_task, filename)
+
+    # the error is recorded, so the backfill does not queue the file again
+    async with session() as db:
+        assert filename not in await get_images_without_variants(db)
+        error = await db.scalar(select(BookImage.variants_error).where(BookImage.id == image.id))
+        assert error.startswith("UnidentifiedImageError")
+
+        # the responses keep the original url and no variants, through both read paths of the lists
+        for use_json_read_path in (False, True):
+            service = BooksCRUDService()
+            service.use_json_read_path = use_json_read_path
+            query = {"seller_id": str(seller_id), "page": "1", "count": "none"}
+            (book,) = orjson.loads(await service._get_entities_list_response(db, query))["items"]
+            assert [(image["url"], image["variants"]) for image in book["images"]] == [(filename, {})]
+    await engine.dispose()
+
+    response = await seller.get(f"/api/books/{book_id}")
+    assert [(image["url"], image["variants"]) for image in response.json()["images"]] == [(filename, {})]
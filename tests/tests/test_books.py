@@ -1,10 +1,21 @@
+import asyncio
+import uuid
 from typing import Any, Optional
 
+import orjson
 import pytest
+from fastapi import status
+from httpx import AsyncClient
+from sqlalchemy.ext.asyncio import AsyncSession
 
+from core.api.books import suggestions
 from core.api.books.schemas import BookCreateSchema, BookUpdateSchema
+from core.api.books.services import BooksCRUDService
+from core.config import settings
+from core.database import engine, session
 from core.database.models import Book
 from core.database.models.user import UserRole
+from core.redis import redis
 from tests.base.crud import CRUDTest
 
 
@@ -30,3 +41,407 @@ class TestBookCRUD(CRUDTest):
     @pytest.fixture
     def sample_update_data(self):
         return {"price": 99.99}
+
+    @pytest.mark.asyncio
+    async def test_create_item_response_matches_retrieve(self, seller: AsyncClient, customer: AsyncClient) -> None:
+        response, _ = await self.create_entity(seller, customer)
+        data = self.check_response_status(response, status.HTTP_201_CREATED)
+
+        response = await customer.get(f"{self.endpoint}{data['id']}")
+        assert self.check_response_status(response) == data
+
+    @pytest.mark.asyncio
+    async def test_create_item_invalid_body(self, seller: AsyncClient) -> None:
+        response = await seller.post(self.endpoint, content=b'{"title": "Margin",')
+        assert self.check_response_status(response, status.HTTP_400_BAD_REQUEST) == {"detail": "Invalid JSON"}
+
+        response = await seller.post(self.endpoint, json={"title": "Margin", "price": -1})
+        errors = self.check_response_status(response, status.HTTP_422_UNPROCESSABLE_ENTITY)
+        assert {error["loc"][0] for error in errors} == {"author", "price", "categories"}
+
+    @pytest.mark.asyncio
+    async def test_list_items_cursor_pagination(self, seller: AsyncClient, customer: AsyncClient) -> None:
+        created_ids = []
+        for _ in range(settings.pagination_page_size + 1):
+            response, _ = await self.create_entity(seller, customer)
+            created_ids.append(response.json()["id"])
+
+        seller_id = (await seller.get(f"{self.endpoint}{created_ids[0]}")).json()["seller"]["id"]
+        params = {"seller_id": seller_id, "cursor": ""}
+
+        first_page = self.check_response_status(await customer.get(self.endpoint, params=params))
+        assert [item["id"] for item in first_page["items"]] == created_ids[:0:-1]
+        assert first_page["prev_cursor"] is None
+
+        params["cursor"] = first_page["next_cursor"]
+        second_page = self.check_response_status(await customer.get(self.endpoint, params=params))
+        assert [item["id"] for item in second_page["items"]] == created_ids[:1]
+        assert second_page["next_cursor"] is None
+
+        params["cursor"] = second_page["prev_cursor"]
+        previous_page = self.check_response_status(await customer.get(self.endpoint, params=params))
+        assert previous_page["items"] == first_page["items"]
+        assert previous_page["prev_cursor"] is None
+
+        response = await customer.get(self.endpoint, params={"cursor": "broken"})
+        self.check_response_status(response, status.HTTP_400_BAD_REQUEST)
+
+    @pytest.mark.asyncio
+    async def test_list_items_count_modes(self, seller: AsyncClient, customer: AsyncClient) -> None:
+        for _ in range(3):
+            response, _ = await self.create_entity(seller, customer)
+
+        seller_id = response.json()["seller"]["id"]
+
+        response = await customer.get(self.endpoint, params={"seller_id": seller_id, "count": "exact"})
+        data = self.check_response_status(response)
+        assert data["total"] == 3
+
+        response = await customer.get(self.endpoint, params={"seller_id": seller_id, "count": "none", "page": 1})
+        data = self.check_response_status(response)
+        assert data["total"] is None
+        assert data["pages"] is None
+        assert len(data["items"]) == 3
+
+        response = await customer.get(self.endpoint, params={"count": "estimate"})
+        data = self.check_response_status(response)
+        assert isinstance(data["total"], int)
+
+        response = await customer.get(self.endpoint, params={"count": "everything"})
+        self.check_response_status(response, status.HTTP_400_BAD_REQUEST)
+
+    @pytest.mark.asyncio
+    async def test_list_items_response_cache(self, seller: AsyncClient, customer: AsyncClient) -> None:
+        title = f"Cached {uuid.uuid4().hex}"
+        response = await seller.post(self.endpoint, json={**self.get_create_data(), "title": title, "categories": []})
+        item_id = response.json()["id"]
+
+        service = BooksCRUDService()
+        assert service._get_list_response_cache_key(
+            {"title": f" {title.upper()} ", "page": "1", "author": "", "fields": "title,id"}
+        ) == service._get_list_response_cache_key({"fields": "id, title", "page": "1", "title": title.lower()})
+
+        for params in ({"title": title.upper(), "page": 1}, {"title": f" {title} ", "page": 1}):
+            response = await customer.get(self.endpoint, params=params)
+            assert [item["id"] for item in self.check_response_status(response)["items"]] == [item_id]
+
+        # writes invalidate the cached pages
+        await seller.patch(f"{self.endpoint}{item_id}", json={"price": 1})
+        response = await customer.get(self.endpoint, params={"title": title, "page": 1})
+        assert self.check_response_status(response)["items"][0]["price"] == 1
+
+        await seller.delete(f"{self.endpoint}{item_id}")
+        response = await customer.get(self.endpoint, params={"title": title, "page": 1})
+        assert self.check_response_status(response)["items"] == []
+
+    @pytest.mark.asyncio
+    async def test_retrieve_item_cache(self, seller: AsyncClient, customer: AsyncClient) -> None:
+        response = await seller.post(self.endpoint, json={**self.get_create_data(), "categories": []})
+        item_id = response.json()["id"]
+
+        response = await customer.get(f"{self.endpoint}{item_id}")
+        assert self.check_response_status(response)["price"] == 199.99
+        response = await customer.get(f"{self.endpoint}{item_id}", params={"fields": "id,price"})
+        assert self.check_response_status(response) == {"id": item_id, "price": 199.99}
+
+        await seller.patch(f"{self.endpoint}{item_id}", json={"price": 1})
+        response = await customer.get(f"{self.endpoint}{item_id}")
+        assert self.check_response_status(response)["price"] == 1
+
+        await seller.delete(f"{self.endpoint}{item_id}")
+        response = await customer.get(f"{self.endpoint}{item_id}")
+        self.check_response_status(response, status.HTTP_404_NOT_FOUND)
+
+    @pytest.mark.asyncio
+    async def test_retrieve_items_by_ids(self, seller: AsyncClient, customer: AsyncClient) -> None:
+        ids = []
+        for _ in range(2):
+            response = await seller.post(self.endpoint, json={**self.get_create_data(), "categories": []})
+            ids.append(response.json()["id"])
+
+        # in the order of the ids, repeated and unknown ones are left out
+        params = {"ids": f"{ids[1]},{ids[0]},{ids[1]},999999999"}
+        response = await customer.get(self.endpoint, params=params)
+        items = self.check_response_status(response)
+        assert [item["id"] for item in items] == [ids[1], ids[0]]
+        assert items[0] == (await customer.get(f"{self.endpoint}{ids[1]}")).json()
+
+        # the entities are cached, the next request reads them all from one MGET
+        service = BooksCRUDService()
+        assert await redis.exists(*[service.get_entity_cache_key(item_id) for item_id in ids]) == 2
+        response = await customer.get(self.endpoint, params={**params, "fields": "id,price"})
+        assert self.check_response_status(response) == [
+            {"id": ids[1], "price": 199.99},
+            {"id": ids[0], "price": 199.99},
+        ]
+
+        await seller.patch(f"{self.endpoint}{ids[0]}", json={"price": 1})
+        await seller.delete(f"{self.endpoint}{ids[1]}")
+        response = await customer.get(self.endpoint, params=params)
+        assert [(item["id"], item["price"]) for item in self.check_response_status(response)] == [(ids[0], 1)]
+
+        for ids_param in ("1,a", "0", ",".join(map(str, range(1, 1000)))):
+            response = await customer.get(self.endpoint, params={"ids": ids_param})
+            self.check_response_status(response, status.HTTP_400_BAD_REQUEST)
+        await redis.connection_pool.disconnect()
+
+    @pytest.mark.asyncio
+    async def test_search_items(self, seller: AsyncClient, customer: AsyncClient) -> None:
+        word = "lexicon" + "".join(chr(ord("a") + int(char, 16)) for char in uuid.uuid4().hex[:8])
+        data = {**self.get_create_data(), "categories": []}
+        response = await seller.post(self.endpoint, json={**data, "title": "Margin", "description": f"On {word}s"})
+        description_match = response.json()["id"]
+        response = await seller.post(self.endpoint, json={**data, "title": f"The {word.upper()}"})
+        title_match = response.json()["id"]
+
+        # title matches rank above description matches, stemming matches the plural
+        response = await customer.get(self.endpoint, params={"q": word, "page": 1})
+        data = self.check_response_status(response)
+        assert [item["id"] for item in data["items"]] == [title_match, description_match]
+        assert data["total"] == 2
+
+        # a dropped inner letter matches no stem, the search falls back to trigram similarity
+        response = await customer.get(self.endpoint, params={"q": word[:3] + word[4:], "page": 1})
+        assert [item["id"] for item in self.check_response_status(response)["items"]] == [title_match]
+
+    @pytest.mark.asyncio
+    async def test_search_items_cursor(self, seller: AsyncClient, monkeypatch: pytest.MonkeyPatch) -> None:
+        word = "ranked" + "".join(chr(ord("a") + int(char, 16)) for char in uuid.uuid4().hex[:8])
+        data = {**self.get_create_data(), "categories": []}
+        ids = []
+        for title, description in (("Margin", f"On {word}s"), (f"The {word}", None), ("Notes", f"On {word}s")):
+            response = await seller.post(self.endpoint, json={**data, "title": title, "description": description})
+            ids.append(response.json()["id"])
+        # by rank, then the newest first among the equally ranked description matches
+        expected = [ids[1], ids[2], ids[0]]
+
+        monkeypatch.setattr(settings, "pagination_page_size", 1)
+        orm_service, json_service = BooksCRUDService(), BooksCRUDService()
+        json_service.use_json_read_path = True
+
+        async with session() as db:
+            for service in (orm_service, json_service):
+                pages, query = [], {"q": word, "cursor": "", "count": "none"}
+                while True:
+                    page = orjson.loads(await service._get_entities_list_response(db, query))
+                    pages.append(page)
+                    if not page["next_cursor"]:
+                        break
+                    query = {**query, "cursor": page["next_cursor"]}
+                assert [item["id"] for page in pages for item in page["items"]] == expected
+
+                page = orjson.loads(
+                    await service._get_entities_list_response(db, {**query, "cursor": pages[-1]["prev_cursor"]})
+                )
+                assert [item["id"] for item in page["items"]] == expected[1:2]
+        await engine.dispose()
+
+    @pytest.mark.asyncio
+    async def test_sort_and_range_filter_items(self, seller: AsyncClient, customer: AsyncClient) -> None:
+        ids = {}
+        for price, year in ((30, 2001), (10, None), (20, 1999)):
+            data = {**self.get_create_data(), "price": price, "publication_year": year, "categories": []}
+            ids[price] = (await seller.post(self.endpoint, json=data)).json()["id"]
+
+        seller_id = (await seller.get(f"{self.endpoint}{ids[30]}")).json()["seller"]["id"]
+
+        async def get_ids(**params: str | int) -> list[int]:
+            response = await customer.get(self.endpoint, params={"seller_id": seller_id, **params})
+            return [item["id"] for item in self.check_response_status(response)["items"]]
+
+        assert await get_ids(sort="price", page=1) == [ids[10], ids[20], ids[30]]
+        assert await get_ids(sort="-price", cursor="") == [ids[30], ids[20], ids[10]]
+        # books without a year are left out of lists sorted by year
+        assert await get_ids(sort="-publication_year", page=1) == [ids[30], ids[20]]
+        assert await get_ids(min_price="15", max_price="25.5", page=1) == [ids[20]]
+        assert await get_ids(year_from="2000", sort="created_at", page=1) == [ids[30]]
+
+        response = await customer.get(self.endpoint, params={"sort": "title"})
+        self.check_response_status(response, status.HTTP_400_BAD_REQUEST)
+
+    @pytest.mark.asyncio
+    async def test_filter_items_by_category(self, seller: AsyncClient, customer: AsyncClient) -> None:
+        word = "shelf" + "".join(chr(ord("a") + int(char, 16)) for char in uuid.uuid4().hex[:8])
+        response = await seller.post(self.endpoint, json={**self.get_create_data(), "title": f"The {word}"})
+        in_category = response.json()["id"]
+        data = {**self.get_create_data(), "title": f"A {word}", "categories": []}
+        response = await seller.post(self.endpoint, json=data)
+        not_in_category = response.json()["id"]
+
+        response = await customer.get(self.endpoint, params={"q": word, "facets": "categories", "page": 1})
+        data = self.check_response_status(response)
+        assert {item["id"] for item in data["items"]} == {in_category, not_in_category}
+        ((facet,),) = data["facets"].values()
+        assert (facet["name"], facet["count"]) == ("Bestsellers", 1)
+
+        params = {"q": word, "category": f"{facet['slug']},unknown", "facets": "categories", "page": 1}
+        response = await customer.get(self.endpoint, params=params)
+        data = self.check_response_status(response)
+        assert [item["id"] for item in data["items"]] == [in_category]
+        assert data["total"] == 1
+        assert data["facets"]["categories"] == [facet]
+
+        response = await customer.get(self.endpoint, params={"q": word, "page": 1})
+        assert "facets" not in self.check_response_status(response)
+        response = await customer.get(self.endpoint, params={"facets": "sellers"})
+        self.check_response_status(response, status.HTTP_400_BAD_REQUEST)
+
+        # category links are removed with the book
+        response = await seller.delete(f"{self.endpoint}{in_category}")
+        assert response.status_code == status.HTTP_204_NO_CONTENT
+
+    @pytest.mark.asyncio
+    async def test_list_book_cards(self, seller: AsyncClient, customer: AsyncClient) -> None:
+        word = "card" + "".join(chr(ord("a") + int(char, 16)) for char in uuid.uuid4().hex[:8])
+        response = await seller.post(self.endpoint, json={**self.get_create_data(), "title": f"The {word}"})
+        book = response.json()
+        url, params = f"{self.endpoint}cards/", {"q": word, "cursor": ""}
+
+        # writes through the books API are in the cards of the response
+        response = await customer.get(url, params={**params, "category": "bestsellers"})
+        (card,) = self.check_response_status(response)["items"]
+        seller_name = " ".join(filter(None, (book["seller"]["first_name"], book["seller"]["last_name"])))
+        assert card["id"] == book["id"] and card["seller_name"] == seller_name
+        assert (card["categories"], card["rating"], card["rating_count"]) == (["Bestsellers"], None, 0)
+
+        await seller.patch(f"{self.endpoint}{book['id']}", json={"price": 10})
+        response = await customer.get(url, params=params)
+        assert [card["price"] for card in self.check_response_status(response)["items"]] == [10]
+
+        # reviews are picked up by the refresher of the app
+        await customer.post("/api/reviews/", json={"book_id": book["id"], "rating": 4})
+        for _ in range(50):
+            await asyncio.sleep(settings.book_cards_refresh_interval / 5)
+            (card,) = self.check_response_status(await customer.get(url, params=params))["items"]
+            if card["rating_count"]:
+                break
+        assert (card["rating"], card["rating_count"]) == (4, 1)
+
+    @pytest.mark.asyncio
+    async def test_json_read_path_matches_orm(self, seller: AsyncClient) -> None:
+        for price in (30, 199.99):
+            response = await seller.post(self.endpoint, json={**self.get_create_data(), "price": price})
+        book_id, seller_id = response.json()["id"], str(response.json()["seller"]["id"])
+
+        orm_service, json_service = BooksCRUDService(), BooksCRUDService()
+        json_service.use_json_read_path = True
+        queries = [
+            {"seller_id": seller_id, "page": "1", "count": "none"},
+            {"seller_id": seller_id, "cursor": "", "sort": "-price", "count": "none"},
+            {"seller_id": seller_id, "fields": "categories,id,seller", "page": "1", "count": "none"},
+        ]
+
+        async with session() as db:
+            for query in queries:
+                orm_response = await orm_service._get_entities_list_response(db, query)
+                assert orjson.loads(await json_service._get_entities_list_response(db, query)) == orjson.loads(
+                    orm_response
+                )
+
+            orm_entities = await orm_service._load_cached_entities([book_id], db)
+            assert await json_service._load_cached_entities([book_id], db) == orm_entities
+        await engine.dispose()
+
+    @pytest.mark.asyncio
+    async def test_suggest_items(self, seller: AsyncClient, customer: AsyncClient) -> None:
+        word = "typeahead" + "".join(chr(ord("a") + int(char, 16)) for char in uuid.uuid4().hex[:8])
+        data = {**self.get_create_data(), "title": f"Notes On {word}", "author": f"{word} Smith", "categories": []}
+        response = await seller.post(self.endpoint, json=data)
+        book_id = response.json()["id"]
+        url = f"{self.endpoint}suggest"
+
+        response = await customer.get(url, params={"prefix": word[:-2].upper()})
+        assert self.check_response_status(response)["books"] == [[book_id, data["title"], data["author"]]]
+        response = await customer.get(url, params={"prefix": " \t "})
+        assert self.check_response_status(response) == {"books": [], "categories": []}
+
+        await seller.patch(f"{self.endpoint}{book_id}", json={"title": "Renamed"})
+        response = await customer.get(url, params={"prefix": f"notes on {word}"})
+        assert self.check_response_status(response)["books"] == []
+        response = await customer.get(url, params={"prefix": f"{word} sm"})
+        assert self.check_response_status(response)["books"] == [[book_id, "Renamed", data["author"]]]
+
+        await seller.delete(f"{self.endpoint}{book_id}")
+        response = await customer.get(url, params={"prefix": word})
+        assert self.check_response_status(response)["books"] == []
+
+    @pytest.mark.asyncio
+    async def test_build_suggestions(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        await redis.delete(suggestions.SUGGESTIONS_BUILT_KEY)
+        await suggestions.build_suggestions()
+        assert await redis.exists(suggestions.SUGGESTIONS_BUILT_KEY)
+        assert await redis.zcard(suggestions.CATEGORY_SUGGESTIONS_KEY) > 0
+
+        # built sets are not rebuilt on the next start, even when they are empty
+        async def rebuild(session: AsyncSession) -> None:
+            raise AssertionError("rebuilt")
+
+        monkeypatch.setattr(suggestions, "rebuild_book_suggestions", rebuild)
+        await suggestions.build_suggestions()
+        await engine.dispose()
+        await redis.connection_pool.disconnect()
+
+    @pytest.mark.asyncio
+    async def test_bulk_items(self, seller: AsyncClient, customer: AsyncClient) -> None:
+        create_data = [self.get_create_data() for _ in range(3)]
+        create_data.insert(2, {**self.get_create_data(), "price": -1})
+
+        response = await seller.post(f"{self.endpoint}bulk", json=create_data)
+        data = self.check_response_status(response)
+        assert [item["status"] for item in data["items"]] == [201, 201, 422, 201]
+        created_ids = [item["id"] for item in data["items"] if item["status"] == status.HTTP_201_CREATED]
+
+        update_data = [{"id": created_ids[0], "price": 10.5}, {"id": created_ids[1], "title": "Bulk"}, {"id": 0}]
+        response = await seller.patch(f"{self.endpoint}bulk", json=update_data)
+        data = self.check_response_status(response)
+        assert [item["status"] for item in data["items"]] == [200, 200, 422]
+        assert (await customer.get(f"{self.endpoint}{created_ids[0]}")).json()["price"] == 10.5
+        assert (await customer.get(f"{self.endpoint}{created_ids[1]}")).json()["title"] == "Bulk"
+
+        response = await seller.request("DELETE", f"{self.endpoint}bulk", json=[*created_ids, 2**31 - 1])
+        data = self.check_response_status(response)
+        assert [item["status"] for item in data["items"]] == [204, 204, 204, 404]
+        response = await customer.get(f"{self.endpoint}{created_ids[0]}")
+        self.check_response_status(response, status.HTTP_404_NOT_FOUND)
+
+        response = await customer.post(f"{self.endpoint}bulk", json=create_data)
+        self.check_response_status(response, status.HTTP_403_FORBIDDEN)
+
+    @pytest.mark.asyncio
+    async def test_sparse_fieldsets(self, seller: AsyncClient, customer: AsyncClient) -> None:
+        response, _ = await self.create_entity(seller, customer)
+        item_id = response.json()["id"]
+
+        response = await customer.get(self.endpoint, params={"fields": "id,title,price", "cursor": ""})
+        data = self.check_response_status(response)
+        assert all(item.keys() == {"id", "title", "price"} for item in data["items"])
+
+        response = await customer.get(f"{self.endpoint}{item_id}", params={"fields": "id,seller,categories"})
+        data = self.check_response_status(response)
+        assert data.keys() == {"id", "seller", "categories"}
+        assert data["categories"] == self.get_create_data()["categories"]
+
+        response = await customer.get(self.endpoint, params={"fields": "id,password"})
+        self.check_response_status(response, status.HTTP_400_BAD_REQUEST)
+
+    @pytest.mark.asyncio
+    async def test_update_and_delete_item_ownership(
+        self, seller: AsyncClient, customer: AsyncClient, other_seller: AsyncClient
+    ) -> None:
+        response = await seller.post(self.endpoint, json={**self.get_create_data(), "categories": []})
+        item_id = response.json()["id"]
+
+        response = await other_seller.patch(f"{self.endpoint}{item_id}", json={"price": 1})
+        self.check_response_status(response, status.HTTP_403_FORBIDDEN)
+        response = await other_seller.delete(f"{self.endpoint}{item_id}")
+        self.check_response_status(response, status.HTTP_403_FORBIDDEN)
+
+        response = await seller.patch(f"{self.endpoint}{item_id}", json={})
+        assert self.check_response_status(response)["price"] == 199.99
+
+        response = await seller.delete(f"{self.endpoint}{item_id}")
+        assert response.status_code == status.HTTP_204_NO_CONTENT
+        response = await seller.patch(f"{self.endpoint}{item_id}", json={"price": 1})
+        self.check_response_status(response, status.HTTP_404_NOT_FOUND)
+        response = await seller.delete(f"{self.endpoint}{item_id}")
+        self.check_response_status(response, status.HTTP_404_NOT_FOUND)
@@ -0,0 +1,77 @@
+import pytest
+from fastapi import status
+from httpx import AsyncClient
+
+
+@pytest.mark.asyncio
+async def test_orders_conditional_requests(seller: AsyncClient, customer: AsyncClient) -> None:
+    response = await seller.post("/api/books/", json={"title": "Margin", "author": "Me", "price": 30, "categories": []})
+    book_id = response.json()["id"]
+    response = await customer.post(
+        "/api/addresses/",
+        json={"city": "Tokyo", "street": "Shibuya", "house": "683A", "postal_code": "456753", "is_primary": True},
+    )
+    address_id = response.json()["id"]
+    response = await customer.post("/api/orders/", json={"address_id": address_id, "items": [{"book_id": book_id}]})
+    order_id = response.json()["id"]
+
+    for url in ("/api/orders/", f"/api/orders/{order_id}"):
+        response = await customer.get(url)
+        assert response.status_code == status.HTTP_200_OK
+        etag = response.headers["etag"]
+
+        response = await customer.get(url, headers={"If-None-Match": etag})
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+        assert response.headers["etag"] == etag
+        assert not response.content
+
+        # items are part of the order, adding one changes its validators
+        await customer.post("/api/order-items/", json={"order_id": order_id, "book_id": book_id})
+        response = await customer.get(url, headers={"If-None-Match": etag})
+        assert response.status_code == status.HTTP_200_OK
+        assert response.headers["etag"] != etag
+
+        # and so is the delivery address
+        etag = response.headers["etag"]
+        await customer.patch(f"/api/addresses/{address_id}", json={"street": f"Ginza {url}"})
+        response = await customer.get(url, headers={"If-None-Match": etag})
+        assert response.status_code == status.HTTP_200_OK
+        assert response.headers["etag"] != etag
+
+    # item edits and removals touch the order as well
+    url = f"/api/orders/{order_id}"
+    response = await customer.post("/api/order-items/", json={"order_id": order_id, "book_id": book_id})
+    item_url = f"/api/order-items/{response.json()['id']}"
+    for method, kwargs in (("PATCH", {"json": {"quantity": 3}}), ("DELETE", {})):
+        etag = (await customer.get(url)).headers["etag"]
+        response = await customer.request(method, item_url, **kwargs)
+        assert response.status_code in (status.HTTP_200_OK, status.HTTP_204_NO_CONTENT)
+        assert (await customer.get(url)).headers["etag"] != etag
+
+    # only a single order is validated by its date, a list also changes when its rows are filtered out
+    last_modified = (await customer.get(url)).headers["last-modified"]
+    response = await customer.get(url, headers={"If-Modified-Since": last_modified})
+    assert response.status_code == status.HTTP_304_NOT_MODIFIED
+
+    response = await customer.get("/api/orders/")
+    assert "last-modified" not in response.headers
+    etag = response.headers["etag"]
+    await customer.delete(url)
+    response = await customer.get("/api/orders/", headers={"If-None-Match": etag, "If-Modified-Since": last_modified})
+    assert response.status_code == status.HTTP_200_OK
+    assert order_id not in [order["id"] for order in response.json()["items"]]
+
+
+@pytest.mark.asyncio
+async def test_retrieve_book_etag(seller: AsyncClient, customer: AsyncClient) -> None:
+    response = await seller.post("/api/books/", json={"title": "Margin", "author": "Me", "price": 30, "categories": []})
+    url = f"/api/books/{response.json()['id']}"
+
+    etag = (await customer.get(url)).headers["etag"]
+    response = await customer.get(url, headers={"If-None-Match": f'W/"other", {etag}'})
+    assert response.status_code == status.HTTP_304_NOT_MODIFIED
+
+    await seller.patch(url, json={"price": 1})
+    response = await customer.get(url, headers={"If-None-Match": etag})
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["price"] == 1
@@ -0,0 +1,102 @@
+import asyncio
+import typing
+import uuid
+from datetime import timedelta
+
+import orjson
+import pytest
+
+from core.redis import RedisCache, redis
+from core.redis.codecs import CODECS, COMPRESSIONS, FORMAT_VERSION, HEADER_MAGIC, CacheCodec, CacheFormatError
+from core.redis.local import LocalCache
+
+
+@pytest.fixture(autouse=True)
+async def redis_connections() -> typing.AsyncIterator[None]:
+    yield
+    # pooled connections are bound to the event loop of the test
+    await redis.connection_pool.disconnect()
+
+
+@pytest.mark.asyncio
+async def test_get_or_set_rebuilds_once_per_generation() -> None:
+    key, tag = f"test:{uuid.uuid4().hex}", f"test:{uuid.uuid4().hex}"
+    calls = 0
+
+    async def loader() -> int:
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.2)
+        return calls
+
+    results = await asyncio.gather(
+        *(RedisCache.get_or_set(key, loader, timedelta(minutes=1), [tag]) for _ in range(10))
+    )
+    assert results == [1] * 10
+    assert calls == 1
+
+    await RedisCache.invalidate_tags(tag)
+    results = await asyncio.gather(
+        *(RedisCache.get_or_set(key, loader, timedelta(minutes=1), [tag]) for _ in range(10))
+    )
+    assert results == [2] * 10
+    assert calls == 2
+
+
+@pytest.mark.asyncio
+async def test_get_or_set_many_loads_only_misses() -> None:
+    prefix, tag = f"test:{uuid.uuid4().hex}", f"test:{uuid.uuid4().hex}"
+    keys = {f"{prefix}:{i}": [tag, f"{tag}:{i}"] for i in range(3)}
+    loaded = []
+
+    async def loader(missing: list[str]) -> dict[str, str]:
+        loaded.append(missing)
+        return {key: key.upper() for key in missing if not key.endswith(":2")}
+
+    expected = {key: key.upper() for key in list(keys)[:2]}
+    assert await RedisCache.get_or_set_many(keys, loader, timedelta(minutes=1)) == expected
+    assert await RedisCache.get_or_set_many(keys, loader, timedelta(minutes=1)) == expected
+    assert loaded == [list(keys), [f"{prefix}:2"]]
+
+    await RedisCache.invalidate_tags(f"{tag}:1")
+    assert await RedisCache.get_or_set_many(keys, loader, timedelta(minutes=1)) == expected
+    assert loaded[-1] == [f"{prefix}:1", f"{prefix}:2"]
+
+
+def test_local_cache_eviction_and_invalidation() -> None:
+    cache = LocalCache(max_entries=2, ttl=60, names_sep=":")
+    cache.active = True
+
+    cache.set("category", [1], ["category"], 60, cache.generation)
+    cache.set("address:1", [2], ["address:user_id=1"], 60, cache.generation)
+    assert cache.get("category").value == [1]
+
+    # least recently used entry is evicted first
+    cache.set("address:2", [3], ["address:user_id=2"], 60, cache.generation)
+    assert cache.get("address:1") is None
+    assert cache.get("category").value == [1]
+
+    generation = cache.generation
+    cache.invalidate_tags(["category"])
+    assert cache.get("category") is None
+    assert cache.get("address:2").value == [3]
+
+    # values read before an invalidation are not stored
+    cache.set("category", [1], ["category"], 60, generation)
+    assert cache.get("category") is None
+
+
+def test_cache_codecs_round_trip() -> None:
+    value = {"t": [1, 2], "e": 1.5, "v": [{"id": 1, "title": "Clean Code " * 200, "price": 29.99, "images": []}]}
+
+    for codec_name in CODECS:
+        for compression_name in COMPRESSIONS:
+            codec = CacheCodec(codec_name, compression_name, compression_threshold=64)
+            assert codec.decode(codec.encode(value)) == value
+
+            # entries written with other settings and plain JSON from before the header stay readable
+            assert CacheCodec().decode(codec.encode(value)) == value
+            assert codec.decode(orjson.dumps(value)) == value
+
+    with pytest.raises(CacheFormatError):
+        CacheCodec().decode(bytes((HEADER_MAGIC, FORMAT_VERSION + 1, 1, 0)) + orjson.dumps(value))
@@ -1,10 +1,17 @@
+import uuid
+from datetime import datetime, timedelta
 from typing import Any, Optional
 
 import pytest
+from fastapi import status
 from httpx import AsyncClient
+from sqlalchemy import update
 
+from core.api.reviews.ratings import repair_rating_aggregates
 from core.api.reviews.schemas import ReviewCreateSchema, ReviewUpdateSchema
-from core.database.models import Review
+from core.config import settings
+from core.database import engine, session
+from core.database.models import Book, Review, User
 from core.database.models.user import UserRole
 from tests.base.crud import CRUDTest
 
@@ -36,3 +43,81 @@ class TestReviewCRUD(CRUDTest):
             "/api/books/", json={"title": "Margin", "author": "Me", "price": 199.99, "categories": ["Bestsellers"]}
         )
         return {"book_id": create_response.json()["id"]}
+
+    @pytest.mark.asyncio
+    async def test_rating_aggregates(self, seller: AsyncClient, customer: AsyncClient) -> None:
+        book_id = (await self.before_create_entity(seller, customer))["book_id"]
+        book_url = f"/api/books/{book_id}"
+
+        response = await customer.post(self.endpoint, json={"book_id": book_id, "rating": 4})
+        review_id = self.check_response_status(response, status.HTTP_201_CREATED)["id"]
+        book = self.check_response_status(await customer.get(book_url))
+        assert (book["rating"], book["rating_count"]) == (4, 1)
+
+        await customer.patch(f"{self.endpoint}{review_id}", json={"rating": 1})
+        book = self.check_response_status(await customer.get(book_url))
+        assert (book["rating"], book["rating_count"]) == (1, 1)
+        seller_data = self.check_response_status(await customer.get(f"/api/sellers/{book['seller']['id']}"))
+        assert (seller_data["books_count"], seller_data["average_rating"]) == (1, 1)
+
+        # counts broken outside the API are recounted from the reviews
+        async with session() as db:
+            await db.execute(update(Book).where(Book.id == book_id).values(rating_count=7, rating_sum=3))
+            await db.commit()
+            assert await repair_rating_aggregates(db) == 1
+        await engine.dispose()
+        assert self.check_response_status(await customer.get(book_url))["rating_count"] == 1
+
+        await customer.delete(f"{self.endpoint}{review_id}")
+        book = self.check_response_status(await customer.get(book_url))
+        assert (book["rating"], book["rating_count"]) == (None, 0)
+
+    @pytest.mark.asyncio
+    async def test_book_reviews(self, seller: AsyncClient, customer: AsyncClient) -> None:
+        book_id = (await self.before_create_entity(seller, customer))["book_id"]
+        url = f"/api/books/{book_id}/reviews"
+
+        response = self.check_response_status(await customer.get(url))
+        assert (response["items"], response["total"], response["next_cursor"]) == ([], 0, None)
+        assert response["facets"]["rating"] == [{"rating": rating, "count": 0} for rating in range(1, 6)]
+
+        # more reviews than a page, some of them written at the same time
+        count = settings.pagination_page_size + 10
+        created_at = datetime(2026, 1, 1)
+        async with session() as db:
+            users = [
+                User(email=f"{uuid.uuid4().hex}@example.com", hashed_password="-", first_name="R", phone="1")
+                for _ in range(count)
+            ]
+            db.add_all(users)
+            await db.flush()
+            db.add_all(
+                Review(user_id=user.id, book_id=book_id, rating=i % 5 + 1, created_at=created_at + timedelta(i // 3))
+                for i, user in enumerate(users)
+            )
+            await db.commit()
+        await engine.dispose()
+
+        # the histogram cached by the first request was dropped by the writes of the API only
+        await customer.post(self.endpoint, json={"book_id": book_id, "rating": 5})
+        response = self.check_response_status(await customer.get(url))
+        assert response["total"] == count + 1
+        assert response["facets"]["rating"] == [
+            {"rating": rating, "count": count // 5 + (rating == 5)} for rating in range(1, 6)
+        ]
+
+        reviews = response["items"]
+        assert len(reviews) == settings.pagination_page_size
+        response = self.check_response_status(await customer.get(url, params={"cursor": response["next_cursor"]}))
+        reviews += response["items"]
+        assert response["next_cursor"] is None
+        assert [(review["created_at"], review["id"]) for review in reviews] == sorted(
+            ((review["created_at"], review["id"]) for review in reviews), reverse=True
+        )
+        assert len({review["id"] for review in reviews}) == count + 1
+
+        response = await customer.get(url, params={"cursor": response["prev_cursor"]})
+        assert self.check_response_status(response)["items"] == reviews[: settings.pagination_page_size]
+
+        response = await customer.get("/api/books/999999999/reviews")
+        self.check_response_status(response, status.HTTP_404_NOT_FOUND)
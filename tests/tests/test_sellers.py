@@ -0,0 +1,39 @@
+import pytest
+from fastapi import status
+from httpx import AsyncClient
+
+endpoint = "/api/sellers/"
+book_data = {"title": "Margin", "author": "Me", "price": 30, "categories": []}
+
+
+@pytest.mark.asyncio
+async def test_seller_profiles(seller: AsyncClient, other_seller: AsyncClient, customer: AsyncClient) -> None:
+    response = await seller.post("/api/books/", json=book_data)
+    book = response.json()
+    seller_id = book["seller"]["id"]
+    response = await other_seller.post("/api/books/", json=book_data)
+    other_seller_id = response.json()["seller"]["id"]
+
+    response = await customer.get(f"{endpoint}{seller_id}")
+    assert response.status_code == status.HTTP_200_OK
+    assert (response.json()["books_count"], response.json()["average_rating"]) == (1, None)
+
+    # the cached profile is dropped by the writes of the books and of their reviews
+    await seller.post("/api/books/", json=book_data)
+    await customer.post("/api/reviews/", json={"book_id": book["id"], "rating": 5})
+    response = await customer.get(f"{endpoint}{seller_id}")
+    assert (response.json()["books_count"], response.json()["average_rating"]) == (2, 5)
+
+    response = await customer.get(
+        endpoint, params={"ids": f"{other_seller_id},{seller_id},{other_seller_id},999999999"}
+    )
+    assert response.status_code == status.HTTP_200_OK
+    assert [data["id"] for data in response.json()] == [other_seller_id, seller_id]
+    assert response.json()[1] == (await customer.get(f"{endpoint}{seller_id}")).json()
+
+    for ids in ("1,a", "0", ",".join(map(str, range(1, 1000)))):
+        response = await customer.get(endpoint, params={"ids": ids})
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    response = await customer.get(f"{endpoint}999999999")
+    assert response.status_code == status.HTTP_404_NOT_FOUND